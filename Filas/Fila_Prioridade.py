@@ -1,21 +1,110 @@
-import heapq
-
-class FilaPrioridade:
-    def __init__(self):
-        self.fila = []
-    
-    def inserir(self, prioridade, item):
-     
-        heapq.heappush(self.fila, (prioridade, item))
-    
-    def remover(self):
-      
-        if self.fila:
-            return heapq.heappop(self.fila)[1]
-        else:
-            return None
-    
-    def tamanho(self):
-        return len(self.fila)
-
-
+class FilaPrioridade:
+    """
+    Heap d-ário indexado (min-heap) com diminuição de chave.
+
+    Os itens ficam num array (lista) e um mapa item -> posição permite achar
+    cada item em O(1). Cada item aparece no máximo uma vez: inserir um item
+    que já está na fila só atualiza a prioridade se ela for menor, então o
+    tamanho fica limitado ao número de itens distintos (em Dijkstra, V e
+    não E). Com d = 4 a árvore é mais rasa que a binária e as trocas na
+    descida ficam mais baratas.
+
+    Os itens precisam ser hasháveis.
+    """
+
+    def __init__(self, d=4):
+        self.d = d
+        self.prioridades = []
+        self.itens = []
+        self.posicao = {}
+
+    def inserir(self, prioridade, item):
+        pos = self.posicao.get(item)
+        if pos is not None:
+            self.diminuir_chave(item, prioridade)
+            return
+        self.prioridades.append(prioridade)
+        self.itens.append(item)
+        self.posicao[item] = len(self.itens) - 1
+        self._subir(len(self.itens) - 1)
+
+    def diminuir_chave(self, item, prioridade):
+        """Reduz a prioridade de um item já na fila (ignora se não for menor)"""
+        pos = self.posicao[item]
+        if prioridade < self.prioridades[pos]:
+            self.prioridades[pos] = prioridade
+            self._subir(pos)
+
+    def remover(self):
+        if not self.itens:
+            return None
+        return self.remover_com_prioridade()[1]
+
+    def remover_com_prioridade(self):
+        """Remove e devolve (prioridade, item) do topo"""
+        prioridades, itens = self.prioridades, self.itens
+        topo = (prioridades[0], itens[0])
+        del self.posicao[itens[0]]
+        ultima_prioridade = prioridades.pop()
+        ultimo_item = itens.pop()
+        if itens:
+            prioridades[0] = ultima_prioridade
+            itens[0] = ultimo_item
+            self.posicao[ultimo_item] = 0
+            self._descer(0)
+        return topo
+
+    def topo(self):
+        """(prioridade, item) do topo sem remover, ou None se vazia"""
+        if not self.itens:
+            return None
+        return self.prioridades[0], self.itens[0]
+
+    def contem(self, item):
+        return item in self.posicao
+
+    def prioridade(self, item):
+        return self.prioridades[self.posicao[item]]
+
+    def tamanho(self):
+        return len(self.itens)
+
+    def _subir(self, pos):
+        prioridades, itens, posicao, d = self.prioridades, self.itens, self.posicao, self.d
+        prioridade, item = prioridades[pos], itens[pos]
+        while pos > 0:
+            pai = (pos - 1) // d
+            if prioridades[pai] <= prioridade:
+                break
+            # Desce o pai em vez de trocar a cada nível
+            prioridades[pos] = prioridades[pai]
+            itens[pos] = itens[pai]
+            posicao[itens[pos]] = pos
+            pos = pai
+        prioridades[pos] = prioridade
+        itens[pos] = item
+        posicao[item] = pos
+
+    def _descer(self, pos):
+        prioridades, itens, posicao, d = self.prioridades, self.itens, self.posicao, self.d
+        n = len(itens)
+        prioridade, item = prioridades[pos], itens[pos]
+        while True:
+            primeiro = d * pos + 1
+            if primeiro >= n:
+                break
+            # Menor entre os até d filhos
+            menor = primeiro
+            menor_prioridade = prioridades[primeiro]
+            for filho in range(primeiro + 1, min(primeiro + d, n)):
+                if prioridades[filho] < menor_prioridade:
+                    menor, menor_prioridade = filho, prioridades[filho]
+            if menor_prioridade >= prioridade:
+                break
+            prioridades[pos] = menor_prioridade
+            itens[pos] = itens[menor]
+            posicao[itens[pos]] = pos
+            pos = menor
+        prioridades[pos] = prioridade
+        itens[pos] = item
+        posicao[item] = pos
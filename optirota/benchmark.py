@@ -0,0 +1,241 @@
+"""
+Benchmarks de construção, rotas e desenho sobre as fixtures OSM JSON
+versionadas em optirota/fixtures (sem rede): mede o tempo (mediana de N
+amostras) e o pico de memória (tracemalloc, numa execução à parte) de cada
+etapa e compara com a linha de base gravada em benchmark_baseline.json.
+
+As fixtures não são dados reais do OSM: bairro, cidade e grade são saídas
+sintéticas e determinísticas de cidade_sintetica (optirota/fixtures/gerar.py),
+no formato da resposta da Overpass API. bairro e cidade imitam quadras
+irregulares, mãos únicas, vias de várias classes e restrições de conversão;
+grade é uma malha regular de mão dupla.
+
+Etapas curtas são repetidas dentro de cada amostra até ela durar
+AMOSTRA_MINIMA; o tempo registrado é por execução. Assim a comparação com a
+linha de base é só relativa, sem um piso absoluto que esconda regressões em
+etapas de poucos milissegundos.
+
+Uso (na raiz do projeto):
+    python -m optirota.benchmark                      # compara com a linha de base
+    python -m optirota.benchmark --save-baseline      # grava a linha de base
+    python -m optirota.benchmark --fixtures bairro grade --repeat 5
+
+Sai com código 1 se alguma etapa regrediu além das tolerâncias.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from src.Grafo.build import build_graph
+from src.Grafo.visualizar import plot_graph_with_names, plot_path_only
+from src.Algoritimos.dijkstra import dijkstra
+from src.OSM.consultaOSM import get_node_street_name, get_street_index, print_crossings
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(DIRETORIO, "fixtures")
+FIXTURES = ("bairro", "grade", "cidade")
+BASELINE = os.path.join(DIRETORIO, "benchmark_baseline.json")
+CONSULTAS = 20
+REPETICOES = 5
+AMOSTRA_MINIMA = 0.02           # cada amostra de tempo dura pelo menos 20 ms
+TOLERANCIA_TEMPO = 0.5          # +50% do tempo da linha de base
+TOLERANCIA_MEMORIA = 0.2        # +20% do pico de memória
+PISO_MEMORIA = 0.1              # diferenças de memória abaixo de 0,1 MB são ruído
+
+
+def load_fixture(nome):
+    """Dados OSM (como get_osm_data) de optirota/fixtures/<nome>.json"""
+    with open(os.path.join(FIXTURES_DIR, f"{nome}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _etapas(data, consultas, graficos):
+    """
+    [(nome, função)] das etapas de uma fixture. Cada função roda a etapa
+    inteira uma vez; as que dependem do grafo usam um grafo montado antes
+    (fora da medição).
+    """
+    grafo = build_graph(data)
+    G, nodes, vertices, ways, node_id_to_index, index_to_node_id = grafo
+    rng = random.Random(0)
+    ids = sorted(node_id_to_index)
+    pares = [(rng.choice(ids), rng.choice(ids)) for _ in range(consultas)]
+    street_index = get_street_index(G)
+    amostra = rng.sample(sorted(vertices), min(50, len(vertices)))
+    caminho = max((dijkstra(G, s, t, node_id_to_index, index_to_node_id)[0] or [] for s, t in pares), key=len)
+
+    def rotas():
+        for s, t in pares:
+            dijkstra(G, s, t, node_id_to_index, index_to_node_id)
+
+    def nomes_indexados():
+        for nid in vertices:
+            get_node_street_name(nid, ways, street_index)
+
+    def nomes_sem_indice():
+        for nid in amostra:
+            get_node_street_name(nid, ways)
+
+    def cruzamentos():
+        with contextlib.redirect_stdout(io.StringIO()):
+            print_crossings(G, nodes, vertices, ways, node_id_to_index, index_to_node_id)
+
+    etapas = [
+        ("build_graph", lambda: build_graph(data)),
+        ("dijkstra", rotas),
+        ("get_node_street_name", nomes_indexados),
+        ("get_node_street_name_sem_indice", nomes_sem_indice),
+        ("print_crossings", cruzamentos),
+    ]
+    if graficos:
+        def grafo_html():
+            with contextlib.redirect_stdout(io.StringIO()):
+                plot_graph_with_names(G, nodes, ways, node_id_to_index, index_to_node_id)
+
+        def caminho_html():
+            with contextlib.redirect_stdout(io.StringIO()):
+                plot_path_only(caminho, nodes, ways, street_index)
+
+        etapas += [("plot_graph_with_names", grafo_html), ("plot_path_only", caminho_html)]
+    return etapas
+
+
+def _amostra(funcao, chamadas):
+    """Tempo médio (s) de uma execução de funcao, rodando-a chamadas vezes"""
+    inicio = time.perf_counter()
+    for _ in range(chamadas):
+        funcao()
+    return (time.perf_counter() - inicio) / chamadas
+
+
+def _medir(funcao, repeticoes, amostra_minima=AMOSTRA_MINIMA):
+    """
+    (mediana dos tempos por execução em s, pico de memória em MB). Como em
+    timeit.autorange, o número de execuções por amostra dobra até a amostra
+    durar amostra_minima; essa calibração também serve de aquecimento.
+    """
+    chamadas = 1
+    while _amostra(funcao, chamadas) * chamadas < amostra_minima:
+        chamadas *= 2
+    tempos = [_amostra(funcao, chamadas) for _ in range(repeticoes)]
+
+    # tracemalloc deixa o código mais lento: memória numa execução separada
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return statistics.median(tempos), pico / (1024 * 1024)
+
+
+def run_benchmarks(fixtures=FIXTURES, repeat=REPETICOES, queries=CONSULTAS, plots=True, verbose=True):
+    """
+    {fixture: {etapa: {"time_s": ..., "peak_mb": ...}}}. Os gráficos são
+    gravados num diretório temporário (plot_path_only escreve no diretório
+    atual).
+    """
+    resultados = {}
+    diretorio_atual = os.getcwd()
+    with tempfile.TemporaryDirectory() as temporario:
+        os.chdir(temporario)
+        try:
+            for nome in fixtures:
+                data = load_fixture(nome)
+                resultados[nome] = {}
+                for etapa, funcao in _etapas(data, queries, plots):
+                    tempo, pico = _medir(funcao, repeat)
+                    resultados[nome][etapa] = {"time_s": tempo, "peak_mb": pico}
+                    if verbose:
+                        print(f"{nome:>8} {etapa:>32} {tempo * 1000:>10.2f} ms {pico:>9.2f} MB")
+                        sys.stdout.flush()
+        finally:
+            os.chdir(diretorio_atual)
+    return resultados
+
+
+def compare_with_baseline(resultados, baseline, time_tolerance=TOLERANCIA_TEMPO,
+                          memory_tolerance=TOLERANCIA_MEMORIA, memory_floor=PISO_MEMORIA):
+    """
+    Regressões em relação à linha de base: lista de (fixture, etapa, métrica,
+    valor da base, valor atual). Etapas ausentes da base são ignoradas. O
+    tempo é comparado só em termos relativos (ver AMOSTRA_MINIMA); a memória
+    também precisa crescer mais que memory_floor.
+    """
+    regressoes = []
+    for nome, etapas in resultados.items():
+        for etapa, medidas in etapas.items():
+            base = baseline.get(nome, {}).get(etapa)
+            if base is None:
+                continue
+            tempo, tempo_base = medidas["time_s"], base["time_s"]
+            if tempo > tempo_base * (1 + time_tolerance):
+                regressoes.append((nome, etapa, "time_s", tempo_base, tempo))
+            pico, pico_base = medidas["peak_mb"], base["peak_mb"]
+            if pico > pico_base * (1 + memory_tolerance) and pico - pico_base > memory_floor:
+                regressoes.append((nome, etapa, "peak_mb", pico_base, pico))
+    return regressoes
+
+
+def save_baseline(resultados, path=BASELINE):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"python": platform.python_version(), "platform": platform.platform(),
+                   "results": resultados}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_baseline(path=BASELINE):
+    """Resultados da linha de base ({} se ainda não houver uma)"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do OptiRota sobre fixtures OSM locais")
+    parser.add_argument("--fixtures", nargs="+", default=list(FIXTURES), choices=FIXTURES)
+    parser.add_argument("--repeat", type=int, default=REPETICOES)
+    parser.add_argument("--queries", type=int, default=CONSULTAS)
+    parser.add_argument("--no-plots", action="store_true", help="pula as etapas de desenho")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--time-tolerance", type=float, default=TOLERANCIA_TEMPO)
+    parser.add_argument("--memory-tolerance", type=float, default=TOLERANCIA_MEMORIA)
+    args = parser.parse_args(argv)
+
+    print(f"{'fixture':>8} {'etapa':>32} {'tempo':>13} {'pico':>12}")
+    resultados = run_benchmarks(args.fixtures, args.repeat, args.queries, plots=not args.no_plots)
+
+    if args.save_baseline:
+        # Mantém na base as fixtures que não rodaram agora
+        base = load_baseline(args.baseline)
+        base.update(resultados)
+        save_baseline(base, args.baseline)
+        print(f"\nLinha de base gravada em {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if not baseline:
+        print(f"\nSem linha de base em {args.baseline}; rode com --save-baseline")
+        return 0
+    regressoes = compare_with_baseline(resultados, baseline, args.time_tolerance, args.memory_tolerance)
+    if not regressoes:
+        print("\nNenhuma regressão em relação à linha de base")
+        return 0
+    print("\nRegressões:")
+    for nome, etapa, metrica, antes, depois in regressoes:
+        print(f"  {nome}/{etapa} {metrica}: {antes:.4f} -> {depois:.4f} ({depois / antes:.2f}x)")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Micro-benchmark: Dijkstra com heapq + remoção preguiçosa (padrão) contra
+FilaPrioridade (heap d-ário indexado com diminuição de chave), em malhas
+regulares de tamanhos crescentes (receita "grade" de optirota/fixtures/gerar.py).
+
+Mostra o tempo médio por consulta, o maior tamanho que a fila atingiu e o
+total de inserções na fila (churn).
+
+Uso (na raiz do projeto):  python -m optirota.benchmark_fila
+"""
+import heapq
+import random
+import sys
+import time
+from src.Grafo.build import build_graph
+from src.Algoritimos.dijkstra import dijkstra, edge_iterator
+from Filas.Fila_Prioridade import FilaPrioridade
+from optirota.fixtures.gerar import cidade_sintetica
+
+TAMANHOS = (20, 40, 80, 120)
+CONSULTAS = 20
+
+
+def contar_preguicosa(saida, origem, destino):
+    distancias = {origem: 0}
+    fila = [(0, origem)]
+    maior, insercoes = 1, 1
+    while fila:
+        dist, u = heapq.heappop(fila)
+        if u == destino:
+            break
+        if dist > distancias[u]:
+            continue
+        for v, peso in saida(u):
+            nova = dist + peso
+            if nova < distancias.get(v, float('inf')):
+                distancias[v] = nova
+                heapq.heappush(fila, (nova, v))
+                insercoes += 1
+                maior = max(maior, len(fila))
+    return maior, insercoes
+
+
+def contar_indexada(saida, origem, destino):
+    distancias = {origem: 0}
+    fila = FilaPrioridade()
+    fila.inserir(0, origem)
+    maior, insercoes = 1, 1
+    while fila.tamanho():
+        dist, u = fila.remover_com_prioridade()
+        if u == destino:
+            break
+        for v, peso in saida(u):
+            nova = dist + peso
+            if nova < distancias.get(v, float('inf')):
+                distancias[v] = nova
+                if not fila.contem(v):
+                    insercoes += 1
+                fila.inserir(nova, v)
+                maior = max(maior, fila.tamanho())
+    return maior, insercoes
+
+
+def main():
+    random.seed(0)
+    print(f"{'malha':>8} {'fila':>10} {'ms/consulta':>12} {'maior fila':>11} {'inserções':>10}")
+    for n in TAMANHOS:
+        # Malha regular de mão dupla: os cruzamentos são os nós 1..n*n
+        G, _, _, _, a, b = build_graph(cidade_sintetica(n, n, semente=3, irregular=False))
+        pares = [(random.randint(1, n * n), random.randint(1, n * n)) for _ in range(CONSULTAS)]
+        saida = edge_iterator(G)
+
+        for nome, indexada, contar in (("heapq", False, contar_preguicosa),
+                                       ("indexada", True, contar_indexada)):
+            inicio = time.perf_counter()
+            for s, t in pares:
+                dijkstra(G, s, t, a, b, indexed_heap=indexada)
+            ms = (time.perf_counter() - inicio) / len(pares) * 1000
+
+            contagens = [contar(saida, a[s], a[t]) for s, t in pares]
+            maior = max(c[0] for c in contagens)
+            insercoes = sum(c[1] for c in contagens) / len(contagens)
+            print(f"{n:>4}x{n:<3} {nome:>10} {ms:>12.2f} {maior:>11} {insercoes:>10.0f}")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Gera as fixtures OSM JSON dos benchmarks (mesmo formato da resposta da
+Overpass API), de forma determinística: a mesma semente gera sempre o mesmo
+arquivo, então os JSON versionados podem ser refeitos e comparados.
+
+    bairro.json  ~ um bairro: quadras irregulares, ruas em vários ways,
+                   mãos únicas, vias coletoras e restrições de conversão
+    cidade.json  ~ uma cidade pequena, com a mesma receita em escala maior
+                   e uma avenida diagonal cruzando a malha
+    grade.json   malha regular de ruas de mão dupla (pior caso do Dijkstra:
+                   sem atalhos nem becos)
+
+Uso (na raiz do projeto):  python -m optirota.fixtures.gerar
+"""
+import json
+import os
+import random
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+LAT0, LON0 = -9.68, -35.76      # canto sudoeste (Maceió)
+PASSO = 0.0012                  # ~130 m entre cruzamentos
+
+FIXTURES = {
+    # nome: (linhas, colunas, semente, irregular)
+    "bairro": (14, 14, 1, True),
+    "cidade": (48, 48, 2, True),
+    "grade": (50, 50, 3, False),
+}
+
+VIA_COLETORA = {"highway": "secondary", "maxspeed": "50"}
+VIA_ARTERIAL = {"highway": "primary", "maxspeed": "60"}
+
+
+class _Gerador:
+    def __init__(self, semente):
+        self.rng = random.Random(semente)
+        self.elements = []
+        self.proximo_no = 1
+        self.proximo_way = 1000000
+        self.proxima_relacao = 5000000
+
+    def no(self, lat, lon):
+        nid = self.proximo_no
+        self.proximo_no += 1
+        self.elements.append({"type": "node", "id": nid, "lat": round(lat, 7), "lon": round(lon, 7)})
+        return nid
+
+    def way(self, refs, tags):
+        wid = self.proximo_way
+        self.proximo_way += 1
+        self.elements.append({"type": "way", "id": wid, "nodes": refs, "tags": tags})
+        return wid
+
+    def restricao(self, de, via, para, tipo):
+        self.elements.append({
+            "type": "relation", "id": self.proxima_relacao,
+            "members": [{"type": "way", "ref": de, "role": "from"},
+                        {"type": "node", "ref": via, "role": "via"},
+                        {"type": "way", "ref": para, "role": "to"}],
+            "tags": {"type": "restriction", "restriction": tipo},
+        })
+        self.proxima_relacao += 1
+
+
+def _tags_da_rua(k, nome, irregular, rng):
+    if k % 8 == 4:
+        tags = dict(VIA_ARTERIAL)
+    elif k % 4 == 2:
+        tags = dict(VIA_COLETORA)
+    else:
+        tags = {"highway": "residential"}
+        if irregular and rng.random() < 0.3:
+            tags["oneway"] = "yes"
+        if irregular and rng.random() < 0.1:
+            tags["maxspeed"] = "30"
+    if nome:
+        tags["name"] = nome
+    return tags
+
+
+def _rua(g, cruzamentos, nome, tags, irregular, inverter):
+    """
+    Uma rua passando pelos cruzamentos dados, dividida em ways de 2 a 6
+    quadras; com irregular, alguns trechos somem (a rua é interrompida) e
+    cada quadra ganha até dois nós de forma (curvas suaves).
+    Devolve [(way_id, refs)].
+    """
+    rng = g.rng
+    ways = []
+    atual = [cruzamentos[0]]
+    limite = rng.randint(2, 6)
+    for (a, lat_a, lon_a), (b, lat_b, lon_b) in zip(cruzamentos, cruzamentos[1:]):
+        if irregular and rng.random() < 0.07:
+            if len(atual) > 1:
+                ways.append(atual)
+            atual = [(b, lat_b, lon_b)]
+            continue
+        if irregular:
+            for t in sorted(rng.random() for _ in range(rng.randint(0, 2))):
+                desvio = rng.uniform(-0.08, 0.08) * PASSO
+                atual.append((g.no(lat_a + (lat_b - lat_a) * t + desvio, lon_a + (lon_b - lon_a) * t - desvio),
+                              None, None))
+        atual.append((b, lat_b, lon_b))
+        if sum(1 for _, lat, _ in atual if lat is not None) > limite:
+            ways.append(atual)
+            atual = [(b, lat_b, lon_b)]
+            limite = rng.randint(2, 6)
+    if len(atual) > 1:
+        ways.append(atual)
+
+    resultado = []
+    for pontos in ways:
+        refs = [nid for nid, _, _ in pontos]
+        if inverter:
+            refs.reverse()
+        resultado.append((g.way(refs, dict(tags)), refs))
+    return resultado
+
+
+def cidade_sintetica(linhas, colunas, semente, irregular=True):
+    """Dados OSM (dict com "elements") de uma malha de linhas x colunas cruzamentos"""
+    g = _Gerador(semente)
+    rng = g.rng
+    jitter = 0.25 * PASSO if irregular else 0.0
+    grade = [[None] * colunas for _ in range(linhas)]
+    for i in range(linhas):
+        for j in range(colunas):
+            lat = LAT0 + i * PASSO + rng.uniform(-jitter, jitter)
+            lon = LON0 + j * PASSO + rng.uniform(-jitter, jitter)
+            grade[i][j] = (g.no(lat, lon), lat, lon)
+
+    ways_em = {}  # (id do cruzamento) -> [(way_id, orientação)]
+    for orientacao, total, celulas in (("H", linhas, lambda k: grade[k]),
+                                       ("V", colunas, lambda k: [grade[i][k] for i in range(linhas)])):
+        for k in range(total):
+            sem_nome = irregular and rng.random() < 0.05
+            tags = _tags_da_rua(k, None if sem_nome else f"Rua {orientacao}{k}", irregular, rng)
+            if sem_nome:
+                tags["highway"] = "service"
+            inverter = tags.get("oneway") == "yes" and k % 2 == 1
+            for wid, refs in _rua(g, celulas(k), tags.get("name"), tags, irregular, inverter):
+                for nid in refs:
+                    ways_em.setdefault(nid, []).append((wid, orientacao))
+
+    if irregular and linhas >= 20:
+        # Avenida diagonal passando pelos cruzamentos (i, i)
+        diagonal = [grade[i][i] for i in range(min(linhas, colunas))]
+        tags = {"highway": "trunk", "maxspeed": "80", "name": "Avenida Diagonal"}
+        for wid, refs in _rua(g, diagonal, tags["name"], tags, False, False):
+            for nid in refs:
+                ways_em.setdefault(nid, []).append((wid, "D"))
+
+    if irregular:
+        # Proibições de conversão em parte dos cruzamentos entre ruas H e V
+        cruzamentos = [nid for linha in grade for nid, _, _ in linha]
+        for via in rng.sample(cruzamentos, max(1, len(cruzamentos) // 40)):
+            horizontais = [w for w, o in ways_em.get(via, []) if o == "H"]
+            verticais = [w for w, o in ways_em.get(via, []) if o == "V"]
+            if horizontais and verticais:
+                g.restricao(rng.choice(horizontais), via, rng.choice(verticais),
+                            rng.choice(("no_left_turn", "no_right_turn")))
+
+    return {"version": 0.6, "generator": "optirota.fixtures.gerar", "elements": g.elements}
+
+
+def main():
+    for nome, (linhas, colunas, semente, irregular) in FIXTURES.items():
+        data = cidade_sintetica(linhas, colunas, semente, irregular)
+        caminho = os.path.join(DIRETORIO, f"{nome}.json")
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        nos = sum(1 for el in data["elements"] if el["type"] == "node")
+        ways = sum(1 for el in data["elements"] if el["type"] == "way")
+        print(f"{nome}: {nos} nós, {ways} ways -> {caminho}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import json
+from benchmark import FIXTURES, load_fixture, run_benchmarks, compare_with_baseline, save_baseline, load_baseline
+from fixtures.gerar import FIXTURES as RECEITAS, cidade_sintetica
+
+def test_fixtures_versionadas_sao_reprodutiveis():
+    for nome in FIXTURES:
+        linhas, colunas, semente, irregular = RECEITAS[nome]
+        assert load_fixture(nome) == json.loads(json.dumps(cidade_sintetica(linhas, colunas, semente, irregular)))
+
+def test_comparacao_com_linha_de_base(tmp_path):
+    resultados = run_benchmarks(["bairro"], repeat=1, queries=2, plots=False, verbose=False)
+    etapas = resultados["bairro"]
+    assert {"build_graph", "dijkstra", "get_node_street_name", "print_crossings"} <= set(etapas)
+    assert all(m["time_s"] > 0 and m["peak_mb"] >= 0 for m in etapas.values())
+
+    caminho = str(tmp_path / "base.json")
+    save_baseline(resultados, caminho)
+    assert load_baseline(caminho) == resultados
+    assert load_baseline(str(tmp_path / "inexistente.json")) == {}
+    assert compare_with_baseline(resultados, resultados) == []
+
+    # Tempo 3x maior acusa regressão mesmo em etapas de 1 ms; memória só
+    # acima do piso de ruído; dentro da tolerância, nada
+    base = {"bairro": {"build_graph": {"time_s": 0.010, "peak_mb": 1.0},
+                       "dijkstra": {"time_s": 0.001, "peak_mb": 0.01},
+                       "print_crossings": {"time_s": 0.001, "peak_mb": 1.0}}}
+    atual = {"bairro": {"build_graph": {"time_s": 0.030, "peak_mb": 2.0},
+                        "dijkstra": {"time_s": 0.003, "peak_mb": 0.05},
+                        "print_crossings": {"time_s": 0.0014, "peak_mb": 1.1},
+                        "nova_etapa": {"time_s": 1.0, "peak_mb": 1.0}}}
+    assert sorted(compare_with_baseline(atual, base)) == [
+        ("bairro", "build_graph", "peak_mb", 1.0, 2.0),
+        ("bairro", "build_graph", "time_s", 0.010, 0.030),
+        ("bairro", "dijkstra", "time_s", 0.001, 0.003),
+    ]
+
+def test_etapas_curtas_repetem_na_amostra():
+    from benchmark import _medir
+    chamadas = []
+    tempo, _ = _medir(lambda: chamadas.append(1), repeticoes=3, amostra_minima=0.001)
+    # Calibração + 3 amostras com o mesmo número (> 1) de execuções
+    assert len(chamadas) > 4 and 0 < tempo < 0.001
@@ -0,0 +1,47 @@
+import os
+import time
+import pytest
+from src.OSM.cache import OverpassCache, cache_key
+from src.OSM import consultaOSM
+
+bbox = [-9.67, -35.74, -9.65, -35.72]
+resposta = {"elements": [{"type": "node", "id": 1, "lat": -9.66, "lon": -35.73}]}
+
+def test_chave_normalizada():
+    q = consultaOSM.build_query(bbox)
+    assert cache_key(bbox, q) == cache_key(["-9.670", -35.74, -9.65, -35.720000001], q + "\n  ")
+    assert cache_key(bbox, q) != cache_key([-9.68, -35.74, -9.65, -35.72], q)
+
+def test_ttl_expira(tmp_path):
+    cache = OverpassCache(str(tmp_path), ttl=60)
+    cache.put("a", resposta)
+    assert cache.get("a") == resposta
+    caminho = os.path.join(str(tmp_path), "a.json.gz")
+    antigo = time.time() - 120
+    os.utime(caminho, (antigo, antigo))
+    assert cache.get("a", ignorar_ttl=True) == resposta
+    assert cache.get("a") is None
+
+def test_despejo_lru(tmp_path):
+    cache = OverpassCache(str(tmp_path), ttl=None, max_bytes=10**9)
+    for i, chave in enumerate("abc"):
+        cache.put(chave, resposta)
+        caminho = os.path.join(str(tmp_path), f"{chave}.json.gz")
+        os.utime(caminho, (1000 + i, 1000 + i))
+    cache.get("a")  # "a" passa a ser o mais recente
+    cache.max_bytes = 2 * os.path.getsize(os.path.join(str(tmp_path), "a.json.gz"))
+    cache._despejar()
+    assert cache.get("b") is None
+    assert cache.get("a") == resposta and cache.get("c") == resposta
+
+def test_offline_nao_acessa_rede(tmp_path, monkeypatch):
+    def falhar(*args, **kwargs):
+        raise AssertionError("rede acessada em modo offline")
+    monkeypatch.setattr(consultaOSM.requests, "get", falhar)
+    cache = OverpassCache(str(tmp_path))
+
+    with pytest.raises(ConnectionError):
+        consultaOSM.get_osm_data(bbox, cache=cache, offline=True)
+
+    cache.put(cache_key(bbox, consultaOSM.build_query(bbox)), resposta)
+    assert consultaOSM.get_osm_data(bbox, cache=cache, offline=True) == resposta
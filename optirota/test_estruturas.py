@@ -1,4 +1,4 @@
-import timeit 
+import random
 from Filas.Fila_Simples import FilaSimples
 from Filas.Fila_Prioridade import FilaPrioridade
 from Filas.Pilha import Pilha
@@ -35,15 +35,28 @@ def testar_pilha():
     print("Pilha após desempilhar:", pilha.exibir_pilha())
     print("Está vazia?", pilha.esta_vazia())
 
-def meu_codigo():
-    for i in range(1000000):
-        pass
+def test_fila_prioridade_indexada():
+    random.seed(7)
+    fila = FilaPrioridade(d=3)
+    esperado = {}
+    for _ in range(500):
+        item = random.randrange(100)
+        prioridade = random.random()
+        fila.inserir(prioridade, item)
+        # Reinserir só diminui a chave; o item não se repete
+        esperado[item] = min(prioridade, esperado.get(item, prioridade))
+    assert fila.tamanho() == len(esperado)
+    assert fila.contem(3) == (3 in esperado) and not fila.contem(100)
 
+    fila.diminuir_chave(fila.topo()[1], -1.0)
+    esperado[fila.topo()[1]] = -1.0
+    saida = []
+    while fila.tamanho():
+        saida.append(fila.remover_com_prioridade())
+    assert saida == sorted((p, i) for i, p in esperado.items())
+    assert fila.remover() is None and fila.topo() is None
 
 if __name__ == "__main__":
     testar_fila_simples()
     testar_fila_prioridade()
     testar_pilha()
-
-tempo = timeit.timeit(meu_codigo, number=1)
-print(f"Tempo de execução: {tempo:.5f} segundos")
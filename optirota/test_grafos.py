@@ -1,41 +1,41 @@
-import time
-from src.OSM.consultaOSM import get_osm_data, print_crossings
+import contextlib
+import io
+import tempfile
+from pathlib import Path
+from src.OSM.consultaOSM import print_crossings
 from src.Grafo.build import build_graph
 from src.Grafo.visualizar import plot_graph_with_names
+from benchmark import load_fixture
 
-# --- Defina um bounding box de teste (exemplo: centro de Maceió) ---
-# formato: [lat_min, lon_min, lat_max, lon_max]
-bbox = [-9.67, -35.74, -9.65, -35.72]
+# Fixture local (optirota/fixtures/bairro.json), no formato da Overpass API:
+# o teste não depende de rede
+FIXTURE = "bairro"
 
-def testar_grafo():
+def testar_grafo(tmp_path):
     print("\n=== Teste Grafo OSM ===")
-    print("Baixando dados OSM...")
-    data = get_osm_data(bbox)
+    print(f"Carregando fixture '{FIXTURE}'...")
+    data = load_fixture(FIXTURE)
 
     print("Construindo grafo...")
-    G, nodes, vertices, ways = build_graph(data)
+    G, nodes, vertices, ways, node_id_to_index, index_to_node_id = build_graph(data)
 
     print(f"Nós totais: {len(nodes)}")
     print(f"Cruzamentos (vértices): {len(vertices)}")
-    print(f"Arestas no grafo: {G.number_of_edges()}")
+    print(f"Arestas no grafo: {G.num_edges()}")
+    assert G.num_nodes() == len(node_id_to_index) and G.num_edges() > G.num_nodes()
 
     # Mostrar alguns cruzamentos
-    print_crossings(G, nodes, vertices, ways, limit=3)
+    saida = io.StringIO()
+    with contextlib.redirect_stdout(saida):
+        print_crossings(G, nodes, vertices, ways, node_id_to_index, index_to_node_id, limit=3)
+    print(saida.getvalue())
+    assert saida.getvalue().count("Cruzamento:") == 3
 
     # Desenhar grafo
-    print("Exibindo grafo...")
-    plot_graph_with_names(G, nodes, ways)
+    print("Gerando mapa...")
+    caminho = tmp_path / "street_map.html"
+    plot_graph_with_names(G, nodes, ways, node_id_to_index, index_to_node_id, file_path=str(caminho))
+    assert caminho.stat().st_size > 0
 
 if __name__ == "__main__":
-    testar_grafo()
-
-inicio = time.time()
-
-# --- seu código aqui ---
-for i in range(1000000):
-    pass
-
-fim = time.time()
-
-print(f"Tempo de execução: {fim - inicio:.5f} segundos")
-
+    testar_grafo(Path(tempfile.mkdtemp()))
@@ -0,0 +1,71 @@
+import bz2
+from src.OSM.importarOSM import iter_extract_elements, load_osm_extract
+from src.Grafo.build import build_graph
+
+XML = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="-10.00" lon="-48.00"/>
+  <node id="2" lat="-10.01" lon="-48.00"/>
+  <node id="3" lat="-10.02" lon="-48.00"/>
+  <node id="4" lat="-11.00" lon="-48.00"/>
+  <node id="5" lat="-10.03" lon="-48.00"/>
+  <node id="6" lat="-10.04" lon="-48.00"/>
+  <node id="7" lat="-10.01" lon="-48.01"/>
+  <way id="10">
+    <nd ref="1"/><nd ref="2"/><nd ref="3"/><nd ref="4"/><nd ref="5"/><nd ref="6"/>
+    <tag k="highway" v="residential"/><tag k="name" v="Rua A"/>
+  </way>
+  <way id="11">
+    <nd ref="2"/><nd ref="7"/>
+    <tag k="highway" v="residential"/>
+  </way>
+  <way id="12">
+    <nd ref="2"/><nd ref="7"/>
+    <tag k="waterway" v="river"/><tag k="name" v="Rio"/>
+  </way>
+  <relation id="20"><member type="way" ref="10" role=""/></relation>
+</osm>
+"""
+
+BBOX = [-10.5, -48.5, -9.5, -47.5]
+
+
+def test_recorte_e_filtro(tmp_path):
+    caminho = tmp_path / "extrato.osm"
+    caminho.write_text(XML, encoding="utf-8")
+    elementos = list(iter_extract_elements(str(caminho), BBOX))
+
+    ways = [e for e in elementos if e["type"] == "way"]
+    # Só a rua com nome, dividida onde sai da bbox (nó 4)
+    assert [(w["id"], w["nodes"], w.get("part")) for w in ways] == [
+        (10, [1, 2, 3], None), (10, [5, 6], 1)
+    ]
+    # Só os nós usados pelas ruas (o 7 fica de fora)
+    assert sorted(e["id"] for e in elementos if e["type"] == "node") == [1, 2, 3, 5, 6]
+
+
+def test_xml_comprimido_vira_grafo(tmp_path):
+    caminho = tmp_path / "extrato.osm.bz2"
+    caminho.write_bytes(bz2.compress(XML.encode("utf-8")))
+    G, nodes, vertices, ways, n2i, i2n = build_graph(load_osm_extract(str(caminho), BBOX))
+    assert set(nodes) == {1, 2, 3, 5, 6}
+    # Arestas entre vértices (pontas dos trechos), nos dois sentidos
+    assert G.num_edges() == 4
+
+
+def test_trechos_sobrevivem_a_juncao_e_ao_snapshot(tmp_path):
+    from src.OSM.tiles import merge_elements
+    from src.Grafo.snapshot import save_graph, load_graph
+    caminho = tmp_path / "extrato.osm"
+    caminho.write_text(XML, encoding="utf-8")
+    data = load_osm_extract(str(caminho), BBOX)
+
+    # Os dois trechos do way 10 têm o mesmo id: a junção mantém ambos
+    juntos = merge_elements([data, data])
+    assert [(e["id"], e.get("part")) for e in juntos["elements"] if e["type"] == "way"] == [(10, None), (10, 1)]
+
+    grafo = build_graph(juntos)
+    arquivo = str(tmp_path / "grafo.npz")
+    save_graph(arquivo, *grafo)
+    ways = load_graph(arquivo)[3]
+    assert [w.get("part") for w in ways] == [None, 1] and ways == grafo[3]
@@ -0,0 +1,475 @@
+import math
+import pytest
+from src.Grafo.build import build_graph
+from src.Algoritimos.dijkstra import dijkstra
+from src.Algoritimos.astar import astar
+from src.Algoritimos.contraction import build_contraction_hierarchy, ContractionHierarchy
+
+# Pequena malha 4x4 de ruas com nome; ruas H1 e V2 são de mão única
+def malha(n=4, passo=0.001):
+    elements = []
+    for i in range(n):
+        for j in range(n):
+            elements.append({"type": "node", "id": i * n + j + 1,
+                             "lat": -9.66 + i * passo, "lon": -35.73 + j * passo})
+    wid = 100
+    for i in range(n):
+        tags = {"highway": "residential", "name": f"Rua H{i}"}
+        if i == 1:
+            tags["oneway"] = "yes"
+        elements.append({"type": "way", "id": wid, "tags": tags,
+                         "nodes": [i * n + j + 1 for j in range(n)]})
+        wid += 1
+    for j in range(n):
+        tags = {"highway": "residential", "name": f"Rua V{j}"}
+        if j == 2:
+            tags["oneway"] = "-1"
+        elements.append({"type": "way", "id": wid, "tags": tags,
+                         "nodes": [i * n + j + 1 for i in range(n)]})
+        wid += 1
+    return {"elements": elements}
+
+@pytest.fixture(scope="module")
+def grafo():
+    return build_graph(malha())
+
+@pytest.fixture(scope="module")
+def grafo_compacto():
+    return build_graph(malha(), compact=True)
+
+def pares(n=4):
+    ids = range(1, n * n + 1)
+    return [(s, t) for s in ids for t in ids]
+
+def custo(G, caminho, node_id_to_index):
+    total = 0
+    for a, b in zip(caminho, caminho[1:]):
+        total += min(d['weight'] for d in G.get_all_edge_data(node_id_to_index[a], node_id_to_index[b]))
+    return total
+
+def test_dijkstra_variantes_concordam(grafo, grafo_compacto):
+    G, _, _, _, a, b = grafo
+    C, _, _, _, ca, cb = grafo_compacto
+    for s, t in pares():
+        caminho, dist = dijkstra(G, s, t, a, b)
+        assert caminho[0] == s and caminho[-1] == t
+        assert math.isclose(custo(G, caminho, a), dist)
+        for outro in (dijkstra(G, s, t, a, b, bidirectional=True),
+                      dijkstra(G, s, t, a, b, indexed_heap=True),
+                      dijkstra(C, s, t, ca, cb),
+                      dijkstra(C, s, t, ca, cb, bidirectional=True)):
+            assert math.isclose(outro[1], dist, abs_tol=1e-9)
+
+def test_dijkstra_respeita_mao_unica(grafo):
+    G, _, _, _, a, b = grafo
+    # Rua H1 só vai de 5 para 8; o caminho de volta precisa desviar
+    ida, d_ida = dijkstra(G, 5, 6, a, b)
+    volta, d_volta = dijkstra(G, 6, 5, a, b)
+    assert ida == [5, 6]
+    assert len(volta) > 2 and d_volta > d_ida
+
+def test_dijkstra_arestas_paralelas_usam_menor_peso(grafo):
+    G, _, _, _, a, b = grafo
+    G = G.copy()
+    G.add_edge(a[1], a[16], {'weight': 1.0, 'street': 'Atalho'})
+    G.add_edge(a[1], a[16], {'weight': 0.5, 'street': 'Atalho'})
+    for opcoes in ({}, {"bidirectional": True}, {"indexed_heap": True}):
+        assert dijkstra(G, 1, 16, a, b, **opcoes) == ([1, 16], 0.5)
+
+def test_dijkstra_no_inexistente(grafo):
+    G, _, _, _, a, b = grafo
+    assert dijkstra(G, 1, 999, a, b) == (None, float('inf'))
+
+def test_astar_igual_dijkstra(grafo, grafo_compacto):
+    G, _, _, _, a, b = grafo
+    C, _, _, _, ca, cb = grafo_compacto
+    for s, t in pares():
+        _, dist = dijkstra(G, s, t, a, b)
+        caminho, dist_astar = astar(G, s, t, a, b)
+        assert math.isclose(dist_astar, dist, abs_tol=1e-9)
+        assert math.isclose(custo(G, caminho, a), dist, abs_tol=1e-9)
+        assert math.isclose(astar(C, s, t, ca, cb)[1], dist, abs_tol=1e-9)
+
+def test_contraction_hierarchy_igual_dijkstra(grafo, tmp_path):
+    G, _, _, _, a, b = grafo
+    ch = build_contraction_hierarchy(G)
+    ch.save(str(tmp_path / "ch.npz"))
+    carregada = ContractionHierarchy.load(str(tmp_path / "ch.npz"))
+    for s, t in pares():
+        _, dist = dijkstra(G, s, t, a, b)
+        for hierarquia in (ch, carregada):
+            caminho, dist_ch = hierarquia.query(s, t, a, b)
+            assert math.isclose(dist_ch, dist, abs_tol=1e-9)
+            # Atalhos expandidos: caminho em IDs OSM sobre arestas reais
+            assert caminho[0] == s and caminho[-1] == t
+            assert math.isclose(custo(G, caminho, a), dist, abs_tol=1e-9)
+
+def test_matriz_de_distancias(grafo, monkeypatch):
+    from src.Algoritimos import matriz as modulo
+    from src.Algoritimos.matriz import distance_matrix, default_processes
+    G, _, _, _, a, b = grafo
+    origens, destinos = [1, 6, 16, 999], [4, 11, 1, 999]
+    # Tabelas pequenas não pagam a criação do pool
+    assert default_processes(len(origens)) == 1
+    assert default_processes(10 ** 6) == (modulo.os.cpu_count() or 1)
+    monkeypatch.setattr(modulo, "ProcessPoolExecutor", None)
+    assert distance_matrix(G, origens, destinos, a, b).shape == (4, 4)
+    monkeypatch.undo()
+    for processos in (1, 2):
+        matriz, caminhos = distance_matrix(G, origens, destinos, a, b,
+                                           return_paths=True, processes=processos)
+        assert matriz.shape == (4, 4)
+        for i, s in enumerate(origens):
+            for j, t in enumerate(destinos):
+                caminho, dist = dijkstra(G, s, t, a, b)
+                assert math.isclose(matriz[i, j], dist, abs_tol=1e-9) or matriz[i, j] == dist
+                if caminho:
+                    assert caminhos[i][j][0] == s and caminhos[i][j][-1] == t
+                    assert math.isclose(custo(G, caminhos[i][j], a), dist, abs_tol=1e-9)
+
+def recorte(data, linhas, n=4):
+    """Como a Overpass: ways com algum nó nas linhas pedidas, com todos os seus nós"""
+    ways = [el for el in data["elements"] if el["type"] == "way"
+            and any((nid - 1) // n in linhas for nid in el["nodes"])]
+    usados = {nid for w in ways for nid in w["nodes"]}
+    return {"elements": ways + [el for el in data["elements"]
+                                if el["type"] == "node" and el["id"] in usados]}
+
+def assinatura(G, index_to_node_id):
+    return sorted(
+        (index_to_node_id[u], index_to_node_id[v], round(d['weight'], 6), d['street'], d['way'])
+        for u, v, d in G.weighted_edge_list()
+    )
+
+def test_extensao_igual_reconstrucao():
+    from src.Grafo.build import extend_graph
+    data = malha()
+    completo = build_graph(data)
+    parcial = build_graph(recorte(data, {0}))
+    extend_graph(parcial, recorte(data, {1}))
+    extend_graph(parcial, recorte(data, {2, 3}))
+
+    G, nodes, vertices, ways, a, b = parcial
+    G2, nodes2, vertices2, ways2, a2, b2 = completo
+    assert vertices == vertices2 and nodes == nodes2
+    assert sorted(w["id"] for w in ways) == sorted(w["id"] for w in ways2)
+    assert assinatura(G, b) == assinatura(G2, b2)
+    assert G.attrs["street_index"] == G2.attrs["street_index"]
+    for s, t in pares():
+        assert dijkstra(G, s, t, a, b)[1] == pytest.approx(dijkstra(G2, s, t, a2, b2)[1])
+
+def test_indice_espacial(grafo):
+    from src.Grafo.espacial import SpatialIndex, get_spatial_index
+    from src.Grafo.build import haversine
+    G, nodes, _, _, a, b = grafo
+    indice = get_spatial_index(G, b)
+    ids = list(a)
+    pontos = [(-9.6593, -35.7296), (-9.6612, -35.7275), (-9.5, -35.9), (-9.66, -35.73)]
+    for lat, lon in pontos:
+        esperado = sorted(ids, key=lambda nid: haversine(lat, lon, *nodes[nid]))
+        assert indice.nearest(lat, lon)[0] == esperado[0]
+        assert [nid for nid, _ in indice.k_nearest(lat, lon, 5)] == esperado[:5]
+        dentro = [nid for nid, d in indice.within_radius(lat, lon, 150)]
+        assert dentro == [nid for nid in esperado if haversine(lat, lon, *nodes[nid]) <= 150]
+    assert SpatialIndex([], [], []).nearest(0, 0) is None
+
+def test_rota_por_coordenadas(grafo):
+    G, nodes, _, _, a, b = grafo
+    assert dijkstra(G, (-9.66001, -35.72999), nodes[16], a, b) == dijkstra(G, 1, 16, a, b)
+    assert astar(G, nodes[1], (-9.6570, -35.7270), a, b)[1] == pytest.approx(dijkstra(G, 1, 16, a, b)[1])
+
+def test_rota_entre_pontos_no_meio_da_quadra(grafo):
+    from src.Algoritimos.projecao import route_between_points
+    from src.Grafo.build import haversine
+    G, nodes, vertices, ways, a, b = grafo
+
+    def meio(x, y, deslocamento=0.00003):
+        (lat1, lon1), (lat2, lon2) = nodes[x], nodes[y]
+        return (lat1 + lat2) / 2 + deslocamento, (lon1 + lon2) / 2
+
+    def d(x, y):
+        return haversine(*nodes[x], *nodes[y])
+
+    # Rua H1 é mão única (5 -> 8): de 6-7 para 5-6 precisa contornar a quadra
+    caminho, dist = route_between_points(G, nodes, vertices, ways, a, b, meio(6, 7), meio(5, 6))
+    esperado = d(6, 7) / 2 + dijkstra(G, 7, 5, a, b)[1] + d(5, 6) / 2
+    assert dist == pytest.approx(esperado)
+    assert caminho[1] == 7 and caminho[-2] == 5
+
+    # No sentido permitido, o mesmo trecho é percorrido direto
+    caminho, dist = route_between_points(G, nodes, vertices, ways, a, b, meio(5, 6), meio(6, 7))
+    assert dist == pytest.approx(d(5, 6) / 2 + d(6, 7) / 2)
+    assert caminho[1:-1] == [6]
+    _, dist = route_between_points(G, nodes, vertices, ways, a, b, meio(1, 2), nodes[2])
+    assert dist == pytest.approx(d(1, 2) / 2)
+
+def test_projecao_segue_a_geometria_do_way():
+    from src.Grafo.espacial import EdgeIndex
+    from src.Grafo.build import haversine
+    data = {"elements": [
+        {"type": "node", "id": 1, "lat": -9.660, "lon": -35.730},
+        {"type": "node", "id": 2, "lat": -9.660, "lon": -35.729},
+        {"type": "node", "id": 3, "lat": -9.659, "lon": -35.729},
+        {"type": "way", "id": 10, "nodes": [1, 2, 3], "tags": {"highway": "residential", "name": "Rua L"}},
+    ]}
+    G, nodes, vertices, ways, a, b = build_graph(data)
+    assert vertices == {1, 3}
+    indice = EdgeIndex(ways, nodes, vertices, a)
+    # Perto da quina (nó 2, que não é vértice): a reta 1-3 passaria longe dali
+    seg, deslocamento, distancia, ponto = indice.nearest(-9.66005, -35.72895)
+    assert indice.segmentos[seg][:2] == (1, 3)
+    assert deslocamento == pytest.approx(haversine(*nodes[1], *nodes[2]))
+    assert distancia < 10 and ponto == pytest.approx(nodes[2])
+    assert indice.geometry(seg)[1] == nodes[2]
+
+def test_figura_do_grafo_sem_anotacoes(grafo, grafo_compacto):
+    from src.Grafo.visualizar import build_graph_figure, _edge_arrays
+    for G, nodes, _, ways, a, b in (grafo, grafo_compacto):
+        fig = build_graph_figure(G, nodes, ways, a, b)
+        assert not fig.layout.annotations
+        # Cada par de nós vira um segmento (2 pontos + NaN), em um traço por camada
+        origem, destino, _, _ = _edge_arrays(G, b, nodes)
+        pares = {frozenset(p) for p in zip(origem.tolist(), destino.tolist())}
+        ruas = [t for t in fig.data if t.name.startswith("Ruas")]
+        assert sum(len(t.lat) for t in ruas) == 3 * len(pares)
+        # Setas e cruzamentos só aparecem com zoom
+        assert [t.meta["min_zoom"] for t in fig.data[-2:]] == [15, 15]
+
+def test_cache_de_rotas():
+    from src.Algoritimos.cache_rotas import RouteCache
+    from src.Grafo.build import extend_graph
+    G, nodes, vertices, ways, a, b = build_graph(malha())
+    chamadas = []
+
+    def contando(*args):
+        chamadas.append(args[1:3])
+        return dijkstra(*args)
+
+    cache = RouteCache(max_entries=2)
+    esperado = dijkstra(G, 1, 16, a, b)
+    assert cache.route(contando, "Dijkstra", G, 1, 16, a, b) == esperado
+    caminho, _ = cache.route(contando, "Dijkstra", G, 1, 16, a, b)
+    caminho.append("alterado")  # a cópia devolvida não afeta o cache
+    assert cache.route(contando, "Dijkstra", G, 1, 16, a, b) == esperado
+    assert len(chamadas) == 1 and (cache.hits, cache.misses) == (2, 1)
+
+    # Algoritmo faz parte da chave; limite de entradas despeja o menos recente
+    cache.route(contando, "A*", G, 1, 16, a, b)
+    cache.route(contando, "Dijkstra", G, 2, 3, a, b)
+    assert len(cache) == 2 and cache.evictions == 1
+
+    # Grafo estendido ganha nova impressão digital: nada é reaproveitado
+    cache.route(contando, "Dijkstra", G, 2, 3, a, b)
+    extend_graph((G, nodes, vertices, ways, a, b), {"elements": []})
+    cache.route(contando, "Dijkstra", G, 2, 3, a, b)
+    assert len(chamadas) == 4 and chamadas[-1] == (2, 3)
+
+    pequeno = RouteCache(max_bytes=1)
+    pequeno.route(contando, "Dijkstra", G, 1, 16, a, b)
+    assert len(pequeno) == 0
+
+def test_arvore_de_caminhos_um_para_muitos(grafo):
+    from src.Algoritimos.arvore import build_shortest_path_tree, one_to_many, ShortestPathTreeCache
+    G, _, _, _, a, b = grafo
+    destinos = [16, 6, 1, 999]
+    resultados = one_to_many(G, 1, destinos, a, b)
+    assert resultados == [dijkstra(G, 1, t, a, b) for t in destinos]
+
+    # Parada antecipada: a árvore para perto da origem e não cobre o resto
+    perto = build_shortest_path_tree(G, 1, a, b, targets=[2])
+    assert not perto.complete and len(perto) < G.num_nodes()
+    assert perto.covers(2) and not perto.covers(16)
+    completa = build_shortest_path_tree(G, 1, a, b)
+    assert completa.complete and all(completa.covers(t) for t in range(1, 17))
+
+    cache = ShortestPathTreeCache()
+    for alvos in ([2], [2], [16, 2]):
+        assert one_to_many(G, 1, alvos, a, b, cache=cache) == [dijkstra(G, 1, t, a, b) for t in alvos]
+    assert (cache.hits, cache.misses) == (1, 2) and len(cache) == 1
+
+def restricao(rid, de, via, para, tipo):
+    return {"type": "relation", "id": rid,
+            "tags": {"type": "restriction", "restriction": tipo},
+            "members": [{"type": "way", "ref": de, "role": "from"},
+                        {"type": "node", "ref": via, "role": "via"},
+                        {"type": "way", "ref": para, "role": "to"}]}
+
+def passa_por(caminho, trecho):
+    n = len(trecho)
+    return any(tuple(caminho[i:i + n]) == trecho for i in range(len(caminho) - n + 1))
+
+def test_parse_restriction():
+    from src.Grafo.build import parse_restriction
+    assert parse_restriction(restricao(1, 101, 6, 105, "no_left_turn")) == (101, 6, 105, False)
+    assert parse_restriction(restricao(1, 101, 6, 101, "only_straight_on")) == (101, 6, 101, True)
+    # Via em way e tipos desconhecidos não são suportados
+    via_way = restricao(1, 101, 6, 105, "no_left_turn")
+    via_way["members"][1] = {"type": "way", "ref": 102, "role": "via"}
+    assert parse_restriction(via_way) is None
+    assert parse_restriction(restricao(1, 101, 6, 105, "give_way")) is None
+    assert parse_restriction({"type": "relation", "id": 2, "tags": {"type": "route"}}) is None
+
+def test_rota_com_restricoes_de_conversao():
+    from src.Algoritimos.conversoes import turn_aware_route
+    sem_penalidade = dict.fromkeys(("reta", "direita", "esquerda", "retorno"), 0)
+    data = malha()
+    # H1 (way 101, mão única para leste): proibido seguir reto em 6
+    data["elements"].append(restricao(1, 101, 6, 101, "no_straight_on"))
+    G, _, _, _, a, b = build_graph(data)
+    assert G.attrs["turn_restrictions"] == {1: (101, 6, 101, False)}
+
+    direto, dist_direta = dijkstra(G, 5, 7, a, b)
+    assert direto == [5, 6, 7]
+    caminho, dist = turn_aware_route(G, 5, 7, a, b, penalties=sem_penalidade)
+    assert not passa_por(caminho, (5, 6, 7))
+    assert dist == pytest.approx(custo(G, caminho, a)) and dist > dist_direta
+
+    # Obrigatória: vindo de H1 em 6, só é permitido entrar em V1 (way 105)
+    data = malha()
+    data["elements"].append(restricao(2, 101, 6, 105, "only_right_turn"))
+    G, _, _, _, a, b = build_graph(data)
+    for s, t in pares():
+        caminho, _ = turn_aware_route(G, s, t, a, b, penalties=sem_penalidade)
+        if caminho:
+            assert not passa_por(caminho, (5, 6, 7))
+
+def test_rota_com_conversoes_sem_restricoes(grafo, grafo_compacto):
+    from src.Algoritimos.conversoes import turn_aware_route, turn_type
+    G, _, _, _, a, b = grafo
+    sem_penalidade = dict.fromkeys(("reta", "direita", "esquerda", "retorno"), 0)
+    for s, t in pares():
+        caminho, dist = dijkstra(G, s, t, a, b)
+        livre, dist_livre = turn_aware_route(G, s, t, a, b, penalties=sem_penalidade)
+        assert dist_livre == pytest.approx(dist)
+        # Penalidades só encarecem: a distância percorrida nunca fica menor
+        com_conversoes, dist_conversoes = turn_aware_route(G, s, t, a, b)
+        if caminho is None:
+            assert com_conversoes is None
+            continue
+        assert dist_conversoes >= dist - 1e-9
+        assert custo(G, com_conversoes, a) >= dist - 1e-9
+
+    # De 5 a 10: virar à direita em 9 custa menos que à esquerda em 6
+    assert turn_aware_route(G, 5, 10, a, b)[0] == [5, 9, 10]
+    leste, sul, norte, oeste = (1, 0), (0, -1), (0, 1), (-1, 0)
+    assert turn_type(leste, sul) == "direita" and turn_type(leste, norte) == "esquerda"
+    assert turn_type(leste, (0.99, 0.14)) == "reta" and turn_type(leste, oeste) == "retorno"
+
+    with pytest.raises(TypeError):
+        turn_aware_route(grafo_compacto[0], 1, 16, grafo_compacto[4], grafo_compacto[5])
+
+def test_conversao_medida_na_geometria_da_rua():
+    from src.Algoritimos.conversoes import turn_aware_route
+    from src.Grafo.espacial import get_edge_index
+    # Chega-se a 2 indo para leste; a rua seguinte sai para o norte e só
+    # depois dobra para leste: a reta 2-4 parece seguir reto, mas é esquerda
+    data = {"elements": [
+        {"type": "node", "id": 1, "lat": -9.660, "lon": -35.731},
+        {"type": "node", "id": 2, "lat": -9.660, "lon": -35.730},
+        {"type": "node", "id": 3, "lat": -9.6595, "lon": -35.730},
+        {"type": "node", "id": 4, "lat": -9.6595, "lon": -35.720},
+        {"type": "way", "id": 10, "nodes": [1, 2], "tags": {"highway": "residential", "name": "Rua A"}},
+        {"type": "way", "id": 11, "nodes": [2, 3, 4], "tags": {"highway": "residential", "name": "Rua B"}},
+    ]}
+    G, nodes, vertices, ways, a, b = build_graph(data)
+    so_esquerda = {"reta": 0, "direita": 0, "esquerda": 100, "retorno": 0}
+    distancia = dijkstra(G, 1, 4, a, b)[1]
+    indice = get_edge_index(G, nodes, vertices, ways, a)
+    assert turn_aware_route(G, 1, 4, a, b, penalties=so_esquerda, edge_index=indice)[1] == \
+        pytest.approx(distancia + 100)
+    # Índice já guardado em G.attrs vale sem ser passado
+    assert turn_aware_route(G, 1, 4, a, b, penalties=so_esquerda)[1] == pytest.approx(distancia + 100)
+
+def malha_com_vias():
+    """malha() com classes e limites variados: H0 avenida a 60, H2 a 20 mph, V3 calçadão"""
+    data = malha()
+    for el in data["elements"]:
+        if el["type"] != "way":
+            continue
+        if el["id"] == 100:
+            el["tags"].update(highway="primary", maxspeed="60")
+        elif el["id"] == 102:
+            el["tags"]["maxspeed"] = "20 mph"
+        elif el["id"] == 107:
+            el["tags"]["highway"] = "footway"
+    return data
+
+def test_classes_de_via_e_maxspeed():
+    from src.Grafo.perfis import highway_class, parse_maxspeed, HIGHWAY_CLASSES
+    assert HIGHWAY_CLASSES[highway_class("primary_link")] == "primary"
+    assert HIGHWAY_CLASSES[highway_class("bridleway")] == "outro"
+    assert parse_maxspeed("50") == 50 and parse_maxspeed("60;80") == 60
+    assert parse_maxspeed("20 mph") == pytest.approx(32.18688)
+    assert parse_maxspeed("BR:urban") == 0 and parse_maxspeed(None) == 0
+
+def test_perfis_de_custo():
+    from src.Grafo.perfis import profile_weights
+    from src.Algoritimos.contraction import ch_shortest_path
+    data = malha_com_vias()
+    G, _, _, _, a, b = build_graph(data)
+    Gc, _, _, _, ac, bc = build_graph(data, compact=True)
+    calcadao = {frozenset(p) for p in ((4, 8), (8, 12), (12, 16))}
+    velocidade = {100: 60, 102: 20 * 1.609344}
+
+    def tempo_carro(caminho):
+        total = 0
+        for u, v in zip(caminho, caminho[1:]):
+            dados = min(G.get_all_edge_data(a[u], a[v]), key=lambda d: d['weight'])
+            total += dados['weight'] / (velocidade.get(dados['way'], 30) / 3.6)
+        return total
+
+    for s, t in pares():
+        caminho, tempo = dijkstra(G, s, t, a, b, profile="car")
+        if caminho is None:
+            continue
+        # Carro não entra no calçadão; o tempo segue classe e maxspeed
+        assert not any(frozenset(p) in calcadao for p in zip(caminho, caminho[1:]))
+        assert tempo == pytest.approx(tempo_carro(caminho))
+        assert dijkstra(Gc, s, t, ac, bc, profile="car")[1] == pytest.approx(tempo)
+        assert dijkstra(G, s, t, a, b, profile="car", bidirectional=True)[1] == pytest.approx(tempo)
+        assert astar(G, s, t, a, b, profile="car")[1] == pytest.approx(tempo)
+        assert ch_shortest_path(G, s, t, a, b, profile="car")[1] == pytest.approx(tempo)
+    # Conversões sem penalidade no perfil de carro: mesmo custo do Dijkstra
+    from src.Algoritimos.conversoes import turn_aware_route
+    sem_penalidade = dict.fromkeys(("reta", "direita", "esquerda", "retorno"), 0)
+    assert turn_aware_route(G, 4, 13, a, b, penalties=sem_penalidade, profile="car")[1] == \
+        pytest.approx(dijkstra(G, 4, 13, a, b, profile="car")[1])
+    # A pé o calçadão é permitido
+    assert dijkstra(G, 4, 16, a, b, profile="walk")[0] == [4, 8, 12, 16]
+    assert dijkstra(G, 4, 16, a, b)[1] == dijkstra(G, 4, 16, a, b, profile="distance")[1]
+
+    # Pesos e CH por perfil ficam em cache; as arestas não ganham campos novos
+    assert profile_weights(G, "car") is profile_weights(G, "car")
+    ch = G.attrs["profile_ch"]["car"]
+    ch_shortest_path(G, 1, 16, a, b, profile="car")
+    assert G.attrs["profile_ch"]["car"] is ch and "ch" not in G.attrs
+    assert set(G.get_edge_data_by_index(0)) == {"weight", "street", "way"}
+    with pytest.raises(ValueError):
+        dijkstra(G, 1, 16, a, b, profile="aviao")
+
+def test_perfis_em_arvores_e_pontos():
+    from src.Algoritimos.arvore import one_to_many, ShortestPathTreeCache
+    from src.Algoritimos.projecao import route_between_points
+    from src.Grafo.build import haversine
+    data = malha_com_vias()
+    for compacto in (False, True):
+        G, nodes, vertices, ways, a, b = build_graph(data, compact=compacto)
+        destinos = [16, 13, 8]
+        esperado = [dijkstra(G, 4, t, a, b, profile="car") for t in destinos]
+        assert one_to_many(G, 4, destinos, a, b, profile="car") == esperado
+
+        # Perfil faz parte da chave: a árvore de distância não serve para carro
+        cache = ShortestPathTreeCache()
+        assert one_to_many(G, 4, destinos, a, b, cache=cache) == [dijkstra(G, 4, t, a, b) for t in destinos]
+        assert one_to_many(G, 4, destinos, a, b, cache=cache, profile="car") == esperado
+        assert one_to_many(G, 4, destinos, a, b, cache=cache, profile="distance")[0] == dijkstra(G, 4, 16, a, b)
+        assert (cache.hits, cache.misses) == (1, 2)
+
+        # Na avenida H0 (60 km/h), meio trecho custa metade do tempo da aresta
+        meio = tuple((x + y) / 2 for x, y in zip(nodes[1], nodes[2]))
+        _, tempo = route_between_points(G, nodes, vertices, ways, a, b, meio, nodes[2], profile="car")
+        assert tempo == pytest.approx(haversine(*nodes[1], *nodes[2]) / 2 / (60 / 3.6))
+        # Ponto no calçadão: carro não tem por onde sair
+        calcadao = tuple((x + y) / 2 for x, y in zip(nodes[8], nodes[12]))
+        assert route_between_points(G, nodes, vertices, ways, a, b, calcadao, nodes[2], profile="car")[0] is None
+        assert route_between_points(G, nodes, vertices, ways, a, b, calcadao, nodes[2], profile="walk")[0]
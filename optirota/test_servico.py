@@ -0,0 +1,116 @@
+import asyncio
+import json
+import pytest
+from src.Grafo.build import build_graph
+from src.Grafo.snapshot import save_graph
+from src.Algoritimos.dijkstra import dijkstra
+from src.Interface import servico
+from src.Interface.servico import RoutingService, LatencyHistogram, serve
+from test_rotas import malha, pares
+
+async def requisitar(reader, writer, metodo, alvo, corpo=None):
+    """Uma requisição HTTP/1.1 na conexão aberta; devolve (status, json)"""
+    dados = json.dumps(corpo).encode() if corpo is not None else b""
+    writer.write(f"{metodo} {alvo} HTTP/1.1\r\nHost: teste\r\nContent-Length: {len(dados)}\r\n\r\n".encode() + dados)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    cabecalhos = {}
+    while (linha := await reader.readline()) != b"\r\n":
+        nome, _, valor = linha.decode().partition(":")
+        cabecalhos[nome.lower()] = valor.strip()
+    return status, json.loads(await reader.readexactly(int(cabecalhos["content-length"])))
+
+@pytest.mark.parametrize("workers", [0, 1])
+def test_servico_http(tmp_path, monkeypatch, workers):
+    monkeypatch.setattr(servico, "MAX_NEAREST", 5)  # abaixo dos 16 nós da malha
+    data = malha()
+    G, nodes, _, _, a, b = tupla = build_graph(data)
+    caminho = str(tmp_path / "grafo.npz")
+    save_graph(caminho, *tupla, source_data=data)
+
+    async def cenario():
+        service = RoutingService(caminho, workers=workers, max_wait=0.02)
+        servidor = await serve(service, port=0)
+        porta = servidor.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", porta)
+            # Várias requisições na mesma conexão (keep-alive)
+            consultas = pares()[::17]
+            for s, t in consultas:
+                status, resposta = await requisitar(reader, writer, "GET", f"/route?origem={s}&destino={t}")
+                assert status == 200
+                esperado = dijkstra(G, s, t, a, b)
+                assert (resposta["path"], resposta["distance"]) == (esperado[0], pytest.approx(esperado[1]))
+
+            status, resposta = await requisitar(reader, writer, "POST", "/route",
+                                                {"origem": list(nodes[1]), "destino": 16, "algoritmo": "astar"})
+            assert status == 200 and resposta["path"][0] == 1
+            status, resposta = await requisitar(reader, writer, "POST", "/matrix",
+                                                {"sources": [1, 16], "targets": [16, 999999]})
+            assert resposta["distances"][0] == [pytest.approx(dijkstra(G, 1, 16, a, b)[1]), None]
+            status, resposta = await requisitar(reader, writer, "GET", f"/nearest?lat={nodes[6][0]}&lon={nodes[6][1]}&k=2")
+            assert [n["id"] for n in resposta["nodes"]][0] == 6 and len(resposta["nodes"]) == 2
+            # k fora dos limites: 400 abaixo de 1, no máximo MAX_NEAREST (5) nós
+            perto = f"/nearest?lat={nodes[6][0]}&lon={nodes[6][1]}"
+            assert (await requisitar(reader, writer, "GET", perto + "&k=0"))[0] == 400
+            status, resposta = await requisitar(reader, writer, "GET", perto + "&k=1000000000")
+            assert status == 200 and len(resposta["nodes"]) == 5
+
+            assert (await requisitar(reader, writer, "GET", "/route?origem=1&destino=2&algoritmo=x"))[0] == 400
+            assert (await requisitar(reader, writer, "GET", "/inexistente"))[0] == 404
+            writer.close()
+
+            # Consultas simultâneas em conexões separadas saem no mesmo lote
+            conexoes = [await asyncio.open_connection("127.0.0.1", porta) for _ in range(8)]
+            respostas = await asyncio.gather(*(requisitar(r, w, "GET", f"/route?origem={i + 1}&destino=16&algoritmo=bidirectional")
+                                               for i, (r, w) in enumerate(conexoes)))
+            assert all(status == 200 for status, _ in respostas)
+            for _, w in conexoes:
+                w.close()
+
+            estatisticas = service.stats()
+            assert estatisticas["batching"]["max_batch"] > 1
+            assert estatisticas["latency"]["/route"]["count"] == len(consultas) + 2 + 8  # inclui a consulta inválida (400)
+        finally:
+            servidor.close()
+            await servidor.wait_closed()
+            await service.close()
+
+    asyncio.run(cenario())
+
+def test_histograma_de_latencia():
+    h = LatencyHistogram()
+    for ms in [0.5] * 90 + [30] * 9 + [9000]:
+        h.observe(ms / 1000)
+    resumo = h.snapshot()
+    assert resumo["count"] == 100
+    assert (resumo["p50_ms"], resumo["p95_ms"], resumo["p99_ms"]) == (1, 50, 50)
+    assert h.quantile(1.0) == pytest.approx(9000)
+    assert resumo["buckets"]["+inf"] == 1
+
+def test_lote_dividido_entre_workers(tmp_path):
+    data = malha(n=40)
+    caminho = str(tmp_path / "grafo.npz")
+    save_graph(caminho, *build_graph(data, compact=True), source_data=data)
+
+    async def cenario():
+        service = RoutingService(caminho, workers=2, max_batch=16, max_wait=0.05)
+        await service.start()
+        try:
+            # Lotes de 16 consultas longas: cada metade vai para um processo
+            for rodada in range(5):
+                consultas = [(k + 1 + 40 * rodada, 40 * 40 - k, "dijkstra", "distance") for k in range(16)]
+                respostas = await asyncio.gather(*(service.route(*c) for c in consultas))
+                assert all(r["path"] for r in respostas)
+                if len(service.stats()["worker_pids"]) > 1:
+                    break
+            assert len(service.stats()["worker_pids"]) == 2
+            assert service.stats()["batching"]["max_batch"] == 16
+
+            # Falha interna no worker (conversões exigem o PyDiGraph) é 500, não 400
+            status, resposta = await service.handle("GET", "/route?origem=1&destino=2&algoritmo=turns")
+            assert status == 500 and "TypeError" in resposta["error"]
+        finally:
+            await service.close()
+
+    asyncio.run(cenario())
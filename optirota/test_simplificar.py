@@ -0,0 +1,105 @@
+import pytest
+from src.Grafo.build import build_graph, extend_graph
+from src.Grafo.simplificar import simplify_graph, expand_path, format_report
+from src.Grafo.snapshot import save_graph, load_graph
+from src.Algoritimos.dijkstra import dijkstra
+from test_rotas import malha, pares
+
+def malha_com_ilha():
+    """
+    malha() mais a Rua Nova saindo do canto 16 em dois ways (16-60-61 e
+    61-62-63, o 61 só é vértice por ser ponta de way) e uma ilha 901-902.
+    """
+    data = malha()
+    for nid, lat, lon in ((60, -9.657, -35.7265), (61, -9.657, -35.726), (62, -9.657, -35.7255),
+                          (63, -9.657, -35.725), (901, -9.60, -35.70), (902, -9.601, -35.70)):
+        data["elements"].append({"type": "node", "id": nid, "lat": lat, "lon": lon})
+    rua = {"highway": "residential", "name": "Rua Nova"}
+    data["elements"] += [
+        {"type": "way", "id": 300, "nodes": [16, 60, 61], "tags": dict(rua)},
+        {"type": "way", "id": 301, "nodes": [61, 62, 63], "tags": dict(rua)},
+        {"type": "way", "id": 302, "nodes": [901, 902], "tags": {"highway": "residential", "name": "Rua Ilha"}},
+    ]
+    return data
+
+def test_simplificacao_preserva_rotas(tmp_path):
+    data = malha_com_ilha()
+    G0, _, _, _, a0, b0 = build_graph(data)
+    tupla = build_graph(data)
+    _, relatorio = simplify_graph(tupla)
+    G, nodes, vertices, ways, a, b = tupla
+
+    assert relatorio["componentes"] == 2 and relatorio["nos_podados"] == 2
+    assert relatorio["nos_fundidos"] == 1
+    assert (relatorio["nos_depois"], relatorio["arestas_depois"]) == (G.num_nodes(), G.num_edges())
+    assert relatorio["nos_depois"] == G0.num_nodes() - 3
+    assert relatorio["arestas_depois"] == G0.num_edges() - 2 - 2
+    assert 61 not in a and 61 not in vertices and 901 not in a
+    assert "Nós:" in format_report(relatorio)
+
+    # Mesmas distâncias; o caminho expandido volta a passar pelo vértice fundido
+    for s, t in pares() + [(1, 63), (63, 1)]:
+        caminho, dist = dijkstra(G, s, t, a, b)
+        original, dist_original = dijkstra(G0, s, t, a0, b0)
+        assert dist == pytest.approx(dist_original)
+    caminho, _ = dijkstra(G, 1, 63, a, b)
+    assert caminho[-2:] == [16, 63]
+    assert expand_path(G, caminho, a) == dijkstra(G0, 1, 63, a0, b0)[0]
+    aresta = min(G.get_all_edge_data(a[16], a[63]), key=lambda d: d['weight'])
+    assert aresta["via"] == [61] and aresta["street"] == "Rua Nova"
+
+    with pytest.raises(ValueError):
+        extend_graph(tupla, {"elements": []})
+
+    # O snapshot guarda as arestas fundidas
+    caminho_npz = str(tmp_path / "simplificado.npz")
+    save_graph(caminho_npz, *tupla)
+    G2, _, _, _, a2, b2 = load_graph(caminho_npz)
+    assert G2.attrs["simplified"]
+    assert expand_path(G2, dijkstra(G2, 1, 63, a2, b2)[0], a2) == expand_path(G, caminho, a)
+
+def test_cadeia_nao_funde_ruas_diferentes():
+    data = malha_com_ilha()
+    for el in data["elements"]:
+        if el.get("id") == 301 and el["type"] == "way":
+            el["tags"]["name"] = "Rua Outra"
+    tupla = build_graph(data)
+    _, relatorio = simplify_graph(tupla, keep_largest_scc=False)
+    assert relatorio["componentes"] is None and relatorio["nos_fundidos"] == 0
+    assert 61 in tupla[4] and 901 in tupla[4]
+
+def test_carregar_area_sobre_grafo_simplificado(monkeypatch):
+    from src.Interface import app
+    pedidos = []
+
+    def baixar(bbox, offline=False, restrictions=False):
+        pedidos.append((tuple(bbox), restrictions))
+        return malha_com_ilha()
+    monkeypatch.setattr(app, "get_osm_data_tiled", baixar)
+
+    carregada = (-9.661, -35.731, -9.658, -35.728)
+    base = app.load_data(carregada, True, lambda etapa: None)
+    simplify_graph(base)
+
+    # extend_graph recusa o grafo simplificado: a união é refeita do zero
+    nova = (-9.659, -35.729, -9.656, -35.725)
+    uniao_carregada = app.load_data(nova, True, lambda etapa: None, base)
+    G, _, _, _, a, b = uniao_carregada
+    uniao = (-9.661, -35.731, -9.656, -35.725)
+    assert pedidos == [(carregada, False), (uniao, False)]
+    assert G is not base[0] and not G.attrs.get("simplified") and G.attrs["bbox"] == uniao
+    assert dijkstra(G, 1, 63, a, b)[0] is not None
+
+    # Base sem restrições não é estendida quando elas são pedidas
+    com_restricoes = app.load_data(nova, True, lambda etapa: None, uniao_carregada, restricoes=True)
+    assert pedidos[-1] == (uniao, True)
+    assert com_restricoes[0] is not G and com_restricoes[0].attrs["restrictions"]
+
+def test_estatisticas_do_grafo_compacto():
+    from src.Interface.app import graph_statistics
+    G, _, vertices, _, _, _ = build_graph(malha())
+    Gc, _, vertices_c, _, _, _ = build_graph(malha(), compact=True)
+    grau = f"Grau médio: {G.num_edges() / G.num_nodes():.2f}"
+    assert grau in graph_statistics(G, vertices)
+    estatisticas = graph_statistics(Gc, vertices_c)
+    assert grau in estatisticas and "não disponível para o grafo compacto" in estatisticas
@@ -0,0 +1,89 @@
+import pytest
+from src.Grafo.build import build_graph
+from src.Grafo.snapshot import save_graph, load_graph, data_checksum, read_snapshot_header, SNAPSHOT_FORMAT_VERSION
+from src.Algoritimos.dijkstra import dijkstra
+from src.Algoritimos.contraction import get_contraction_hierarchy
+from test_rotas import malha, pares
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("mmap", [False, True])
+def test_snapshot_ida_e_volta(tmp_path, compact, mmap):
+    data = malha()
+    original = build_graph(data, compact=compact)
+    if not compact:
+        get_contraction_hierarchy(original[0])
+    caminho = str(tmp_path / "grafo.npz")
+    save_graph(caminho, *original, source_data=data)
+
+    assert read_snapshot_header(caminho) == (SNAPSHOT_FORMAT_VERSION, data_checksum(data))
+    carregado = load_graph(caminho, expected_checksum=data_checksum(data), mmap=mmap)
+
+    G, nodes, vertices, ways, a, b = original
+    G2, nodes2, vertices2, ways2, a2, b2 = carregado
+    assert (nodes2, vertices2, ways2) == (nodes, vertices, ways)
+    assert G2.attrs["street_index"] == G.attrs["street_index"]
+    assert G2.num_edges() == G.num_edges()
+    for s, t in pares():
+        assert dijkstra(G2, s, t, a2, b2) == dijkstra(G, s, t, a, b)
+        if not compact:
+            assert G2.attrs["ch"].query(s, t, a2, b2)[1] == pytest.approx(dijkstra(G, s, t, a, b)[1])
+
+def test_snapshot_checksum_divergente(tmp_path):
+    data = malha()
+    caminho = str(tmp_path / "grafo.npz")
+    save_graph(caminho, *build_graph(data), source_data=data)
+    with pytest.raises(ValueError):
+        load_graph(caminho, expected_checksum=data_checksum(malha(n=3)))
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_snapshot_preserva_classes_de_via(tmp_path, compact):
+    from test_rotas import malha_com_vias
+    data = malha_com_vias()
+    G, _, _, _, a, b = original = build_graph(data, compact=compact)
+    caminho = str(tmp_path / "grafo.npz")
+    save_graph(caminho, *original, source_data=data)
+    G2, _, _, _, a2, b2 = load_graph(caminho)
+    for s, t in pares():
+        assert dijkstra(G2, s, t, a2, b2, profile="car") == dijkstra(G, s, t, a, b, profile="car")
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_snapshot_carrega_sem_materializar(tmp_path, compact):
+    from src.Grafo.compacto import NodeCoords, StreetIndex, WayList
+    from src.OSM.consultaOSM import get_node_street_name
+    data = malha()
+    G, nodes, vertices, ways, _, _ = original = build_graph(data, compact=compact)
+    caminho = str(tmp_path / "grafo.npz")
+    save_graph(caminho, *original, source_data=data)
+    G2, nodes2, _, ways2, _, _ = load_graph(caminho)
+
+    # Nós, ways e índice de ruas ficam sobre os arrays do arquivo
+    assert isinstance(nodes2, NodeCoords) and isinstance(ways2, WayList)
+    assert isinstance(G2.attrs["street_index"], StreetIndex)
+    assert all(w is None for w in ways2._cache)
+    for nid in nodes:
+        assert nodes2[nid] == nodes[nid]
+        assert (get_node_street_name(nid, ways2, G2.attrs["street_index"])
+                == get_node_street_name(nid, ways, G.attrs["street_index"]))
+    assert nodes2.get(-1) is None and -1 not in nodes2
+    assert ways2[0] == ways[0] and ways2[-1] == ways[-1]
+
+    # Entradas novas (extend_graph) vão para o lado, sem tocar nos arrays
+    nodes2[-1] = (0.0, 0.0)
+    assert nodes2[-1] == (0.0, 0.0) and len(nodes2) == len(nodes) + 1
+
+def test_grafo_compacto_sobre_arrays(tmp_path):
+    from src.Grafo.compacto import NodeCoords, StreetIndex, WayList
+    data = malha()
+    _, nodes, _, ways, _, _ = build_graph(data)
+    Gc, nodes_c, _, ways_c, _, _ = compacto = build_graph(data, compact=True)
+
+    # build_graph(compact=True) já devolve as views de arrays, com o mesmo conteúdo
+    assert isinstance(nodes_c, NodeCoords) and isinstance(ways_c, WayList)
+    assert isinstance(Gc.attrs["street_index"], StreetIndex)
+    assert dict(nodes_c) == nodes and ways_c == ways
+
+    # save_graph grava os arrays como estão
+    caminho = str(tmp_path / "grafo.npz")
+    save_graph(caminho, *compacto, source_data=data)
+    _, nodes2, _, ways2, _, _ = load_graph(caminho)
+    assert dict(nodes2) == nodes and ways2 == ways
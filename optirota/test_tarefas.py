@@ -0,0 +1,36 @@
+import time
+from src.Interface.tarefas import BackgroundRunner
+
+class RootFalso:
+    """Só o root.after do Tk: guarda o callback agendado para o teste chamar"""
+    def __init__(self):
+        self.agendado = None
+
+    def after(self, ms, funcao):
+        self.agendado = funcao
+
+def esperar(root, condicao, limite=5.0):
+    fim = time.monotonic() + limite
+    while not condicao():
+        assert time.monotonic() < fim, "tarefa não terminou"
+        root.agendado()
+        time.sleep(0.01)
+
+def test_callback_com_erro_nao_trava_a_fila():
+    root = RootFalso()
+    status, concluidas = [], []
+    runner = BackgroundRunner(root, status.append)
+    try:
+        def falhar(resultado):
+            raise RuntimeError("widget destruído")
+
+        runner.submit("A", lambda progresso: 1, falhar, concluidas.append)
+        esperar(root, lambda: not runner.is_running("A"))
+        assert any("widget destruído" in s for s in status)
+
+        # O poll continua agendado e as próximas tarefas terminam
+        runner.submit("B", lambda progresso: 2, concluidas.append, concluidas.append)
+        esperar(root, lambda: concluidas)
+        assert concluidas == [2] and not runner.is_running("B")
+    finally:
+        runner.shutdown()
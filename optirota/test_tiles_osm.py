@@ -0,0 +1,98 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import re
+import pytest
+from src.OSM.tiles import split_bbox, get_osm_data_tiled
+
+# Malha de nós a cada 0.01 grau; uma rua horizontal por linha da malha
+PASSO = 0.01
+
+def elementos_na_bbox(lat_min, lon_min, lat_max, lon_max):
+    i0, i1 = round(lat_min / PASSO), round(lat_max / PASSO)
+    j0, j1 = round(lon_min / PASSO), round(lon_max / PASSO)
+    elements = []
+    for i in range(i0, i1 + 1):
+        # Overpass devolve o way inteiro (todos os nós), mesmo cruzando a borda
+        nos = [i * 1000 + j for j in range(0, 11)]
+        elements.append({"type": "way", "id": 10**6 + i, "nodes": nos,
+                         "tags": {"highway": "residential", "name": f"Rua {i}"}})
+        for j in range(0, 11):
+            elements.append({"type": "node", "id": i * 1000 + j, "lat": i * PASSO, "lon": j * PASSO})
+    return elements
+
+class Handler(BaseHTTPRequestHandler):
+    falhas_restantes = 0
+    requisicoes = 0
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requisicoes += 1
+        if cls.falhas_restantes > 0:
+            cls.falhas_restantes -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        query = parse_qs(urlparse(self.path).query)["data"][0]
+        bbox = [float(x) for x in re.search(r"\(([^)]*)\)", query).group(1).split(",")]
+        corpo = json.dumps({"elements": elementos_na_bbox(*bbox)}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def servidor():
+    Handler.falhas_restantes = 0
+    Handler.requisicoes = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/api/interpreter"
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_split_bbox_cobre_a_area():
+    tiles = split_bbox([0, 0, 0.1, 0.25], tile_size=0.05)
+    assert len(tiles) == 2 * 5
+    assert min(t[0] for t in tiles) == 0 and max(t[2] for t in tiles) == 0.1
+    assert min(t[1] for t in tiles) == 0 and max(t[3] for t in tiles) == 0.25
+
+def test_tiles_sem_duplicatas(servidor):
+    data = get_osm_data_tiled([0, 0, 0.1, 0.1], tile_size=0.05, url=servidor,
+                              use_cache=False, backoff=0)
+    chaves = [(el["type"], el["id"]) for el in data["elements"]]
+    assert len(chaves) == len(set(chaves))
+    assert set(chaves) == {(el["type"], el["id"]) for el in elementos_na_bbox(0, 0, 0.1, 0.1)}
+    assert Handler.requisicoes == 4
+
+def test_tiles_tentam_novamente(servidor):
+    Handler.falhas_restantes = 2
+    data = get_osm_data_tiled([0, 0, 0.05, 0.05], tile_size=0.05, url=servidor,
+                              use_cache=False, retries=3, backoff=0)
+    assert len(data["elements"]) > 0
+    assert Handler.requisicoes == 3
+
+def test_streaming_igual_ao_json_completo():
+    from src.OSM.streaming import iter_elements
+    corpo = json.dumps({"version": 0.6, "osm3s": {"copyright": "OSM"},
+                        "elements": elementos_na_bbox(0, 0, 0.03, 0.1)}, indent=1).encode()
+    for tamanho in (1, 5, 64, len(corpo)):
+        pedacos = [corpo[i:i + tamanho] for i in range(0, len(corpo), tamanho)]
+        assert list(iter_elements(pedacos)) == json.loads(corpo)["elements"]
+
+def test_streaming_grava_e_le_cache(servidor, tmp_path):
+    from src.OSM.cache import OverpassCache
+    from src.OSM.streaming import stream_osm_elements
+    from src.Grafo.build import build_graph
+    cache = OverpassCache(str(tmp_path))
+    bbox = [0, 0, 0.02, 0.1]
+    G, *_ = build_graph(stream_osm_elements(bbox, cache=cache, url=servidor, chunk_size=256))
+    offline = list(stream_osm_elements(bbox, cache=cache, offline=True))
+    assert offline == elementos_na_bbox(*bbox)
+    assert G.num_nodes() > 0 and Handler.requisicoes == 1
@@ -0,0 +1,192 @@
+import heapq
+import threading
+from collections import OrderedDict
+import numpy as np
+from src.Algoritimos.dijkstra import edge_iterator
+from src.Algoritimos.cache_rotas import graph_fingerprint
+from src.Grafo.espacial import resolve_node
+
+DEFAULT_MAX_TREES = 32
+
+
+class ShortestPathTree:
+    """
+    Árvore de caminhos mínimos a partir de uma origem, em arrays NumPy:
+    indices (nós finalizados, ordenados), dist e pred (índice do predecessor,
+    -1 na raiz), alinhados. Só nós finalizados entram, então toda distância
+    guardada é definitiva.
+
+    complete=True indica que a busca esgotou o grafo: um nó fora da árvore é
+    inalcançável. Caso contrário a busca parou ao finalizar os alvos pedidos.
+    """
+
+    def __init__(self, source_idx, indices, dist, pred, complete, node_id_to_index, index_to_node_id):
+        self.source_idx = source_idx
+        self.indices = indices
+        self.dist = dist
+        self.pred = pred
+        self.complete = complete
+        self.node_id_to_index = node_id_to_index
+        self.index_to_node_id = index_to_node_id
+
+    def __len__(self):
+        return len(self.indices)
+
+    def _posicao(self, idx):
+        pos = int(np.searchsorted(self.indices, idx))
+        if pos < len(self.indices) and self.indices[pos] == idx:
+            return pos
+        return None
+
+    def covers(self, node_id):
+        """True se a árvore já responde por node_id (alcançado ou sabidamente inalcançável)"""
+        idx = self.node_id_to_index.get(node_id)
+        return idx is None or self.complete or self._posicao(idx) is not None
+
+    def distance(self, node_id):
+        idx = self.node_id_to_index.get(node_id)
+        pos = None if idx is None else self._posicao(idx)
+        return float('inf') if pos is None else float(self.dist[pos])
+
+    def path(self, node_id):
+        """Caminho (IDs originais) da origem até node_id, sem nova busca; None se ausente"""
+        idx = self.node_id_to_index.get(node_id)
+        pos = None if idx is None else self._posicao(idx)
+        if pos is None:
+            return None
+        caminho = []
+        while True:
+            caminho.append(self.index_to_node_id[int(self.indices[pos])])
+            anterior = int(self.pred[pos])
+            if anterior < 0:
+                break
+            pos = self._posicao(anterior)
+        caminho.reverse()
+        return caminho
+
+    @property
+    def nbytes(self):
+        return self.indices.nbytes + self.dist.nbytes + self.pred.nbytes
+
+
+def build_shortest_path_tree(G, source_id, node_id_to_index, index_to_node_id, targets=None, profile=None):
+    """
+    Uma única busca de Dijkstra a partir de source_id. Com targets, para assim
+    que todos os alvos alcançáveis forem finalizados; sem targets, percorre
+    tudo o que for alcançável. profile escolhe o perfil de custo (ver
+    edge_iterator). Devolve uma ShortestPathTree (None se a origem não
+    estiver no grafo).
+    """
+    source_id = resolve_node(G, source_id, index_to_node_id)
+    origem_idx = node_id_to_index.get(source_id)
+    if origem_idx is None:
+        return None
+
+    faltando = None
+    if targets is not None:
+        faltando = {node_id_to_index.get(resolve_node(G, t, index_to_node_id)) for t in targets}
+        faltando.discard(None)
+
+    saida = edge_iterator(G, profile=profile)
+    infinito = float('inf')
+    heappop, heappush = heapq.heappop, heapq.heappush
+    distancias = {origem_idx: 0}
+    predecessores = {origem_idx: -1}
+    fila_prioridade = [(0, origem_idx)]
+    finalizados = []
+
+    while fila_prioridade:
+        if faltando is not None and not faltando:
+            break
+        dist_atual, no_atual_idx = heappop(fila_prioridade)
+        if dist_atual > distancias[no_atual_idx]:
+            continue
+        finalizados.append(no_atual_idx)
+        if faltando is not None:
+            faltando.discard(no_atual_idx)
+
+        for vizinho_idx, peso in saida(no_atual_idx):
+            nova_dist = dist_atual + peso
+            if nova_dist < distancias.get(vizinho_idx, infinito):
+                distancias[vizinho_idx] = nova_dist
+                predecessores[vizinho_idx] = no_atual_idx
+                heappush(fila_prioridade, (nova_dist, vizinho_idx))
+
+    # Esgotou a fila sem sobrar nó a finalizar: a árvore cobre tudo o que é alcançável
+    completa = not fila_prioridade
+    indices = np.array(finalizados, dtype=np.int64)
+    ordem = np.argsort(indices, kind="stable")
+    indices = indices[ordem]
+    dist = np.array([distancias[i] for i in finalizados], dtype=np.float64)[ordem]
+    pred = np.array([predecessores[i] for i in finalizados], dtype=np.int64)[ordem]
+    return ShortestPathTree(origem_idx, indices, dist, pred, completa, node_id_to_index, index_to_node_id)
+
+
+class ShortestPathTreeCache:
+    """
+    Árvores já calculadas por origem (LRU), chave (impressão digital do grafo,
+    origem, perfil). Uma árvore que não cobre os novos alvos é refeita
+    incluindo-os.
+    """
+
+    def __init__(self, max_trees=DEFAULT_MAX_TREES):
+        self.max_trees = max_trees
+        self._arvores = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._arvores)
+
+    def tree(self, G, source_id, targets, node_id_to_index, index_to_node_id, profile=None):
+        source_id = resolve_node(G, source_id, index_to_node_id)
+        targets = [resolve_node(G, t, index_to_node_id) for t in targets]
+        # "distance" e None usam o mesmo peso: mesma árvore
+        chave = (graph_fingerprint(G), source_id, profile if profile != "distance" else None)
+        with self._lock:
+            arvore = self._arvores.get(chave)
+            if arvore is not None and all(arvore.covers(t) for t in targets):
+                self._arvores.move_to_end(chave)
+                self.hits += 1
+                return arvore
+            self.misses += 1
+
+        if arvore is not None:
+            # Refaz a busca com os alvos antigos (nós da árvore) e os novos
+            targets = targets + [index_to_node_id[int(i)] for i in arvore.indices]
+        arvore = build_shortest_path_tree(G, source_id, node_id_to_index, index_to_node_id, targets, profile)
+        if arvore is not None:
+            with self._lock:
+                self._arvores[chave] = arvore
+                self._arvores.move_to_end(chave)
+                while len(self._arvores) > self.max_trees:
+                    self._arvores.popitem(last=False)
+        return arvore
+
+    def clear(self):
+        with self._lock:
+            self._arvores.clear()
+
+
+def one_to_many(G, source_id, targets, node_id_to_index, index_to_node_id, cache=None, profile=None):
+    """
+    Rotas de uma origem para vários destinos com uma única busca. Devolve uma
+    lista de (caminho, distância), na ordem de targets, no mesmo formato de
+    dijkstra. Com cache (ShortestPathTreeCache), a árvore da origem (no
+    mesmo perfil) é reaproveitada nas próximas chamadas.
+    """
+    targets = list(targets)
+    if cache is not None:
+        arvore = cache.tree(G, source_id, targets, node_id_to_index, index_to_node_id, profile)
+    else:
+        arvore = build_shortest_path_tree(G, source_id, node_id_to_index, index_to_node_id, targets, profile)
+    if arvore is None:
+        return [(None, float('inf')) for _ in targets]
+
+    resultados = []
+    for alvo in targets:
+        alvo = resolve_node(G, alvo, index_to_node_id)
+        caminho = arvore.path(alvo)
+        resultados.append((caminho, arvore.distance(alvo)) if caminho else (None, float('inf')))
+    return resultados
@@ -0,0 +1,98 @@
+import heapq
+import math
+from src.Grafo.compacto import CompactGraph
+from src.Algoritimos.dijkstra import edge_iterator, reconstruir_caminho
+from src.Grafo.espacial import resolve_node
+from src.Grafo.perfis import profile_scale
+
+R_TERRA = 6371000  # mesmo raio usado em build.haversine
+
+
+def coordinate_getter(G):
+    """Retorna uma função idx -> (lat, lon) para PyDiGraph ou CompactGraph"""
+    if isinstance(G, CompactGraph):
+        lat, lon = G.lat, G.lon
+        return lambda idx: (float(lat[idx]), float(lon[idx]))
+
+    def coordenadas(idx):
+        dados = G[idx]
+        return dados['lat'], dados['lon']
+    return coordenadas
+
+
+def haversine_heuristic(G, alvo_idx, escala=1.0):
+    """
+    Heurística h(n) = distância Haversine de n até o alvo, vezes escala.
+
+    Como o peso de cada aresta é a soma das distâncias Haversine ao longo da
+    rua, a linha reta nunca superestima o custo (heurística admissível e
+    consistente), então A* devolve o mesmo caminho ótimo do Dijkstra. Para
+    perfis de tempo, escala é o menor custo por metro do grafo
+    (profile_scale), o que mantém a heurística admissível.
+    """
+    coordenadas = coordinate_getter(G)
+    lat_alvo, lon_alvo = coordenadas(alvo_idx)
+    phi2 = math.radians(lat_alvo)
+    cos_phi2 = math.cos(phi2)
+    lambda2 = math.radians(lon_alvo)
+    cache = {}
+
+    def h(idx):
+        valor = cache.get(idx)
+        if valor is None:
+            lat, lon = coordenadas(idx)
+            phi1 = math.radians(lat)
+            a = (math.sin((phi2 - phi1) / 2)**2
+                 + math.cos(phi1) * cos_phi2 * math.sin((lambda2 - math.radians(lon)) / 2)**2)
+            valor = 2 * R_TERRA * math.atan2(math.sqrt(a), math.sqrt(1 - a)) * escala
+            cache[idx] = valor
+        return valor
+    return h
+
+
+def astar(G, start_id, end_id, node_id_to_index, index_to_node_id, profile=None):
+    """
+    A* com heurística Haversine; mesmo contrato (caminho, distância) de
+    dijkstra, inclusive o perfil de custo opcional.
+    """
+    start_id = resolve_node(G, start_id, index_to_node_id)
+    end_id = resolve_node(G, end_id, index_to_node_id)
+    if start_id not in node_id_to_index or end_id not in node_id_to_index:
+        return None, float('inf')
+
+    start_idx = node_id_to_index[start_id]
+    end_idx = node_id_to_index[end_id]
+
+    saida = edge_iterator(G, profile=profile)
+    h = haversine_heuristic(G, end_idx, profile_scale(G, profile) if profile is not None else 1.0)
+    infinito = float('inf')
+    heappop, heappush = heapq.heappop, heapq.heappush
+
+    distancias = {start_idx: 0}
+    predecessores = {start_idx: None}
+    fila_prioridade = [(h(start_idx), 0, start_idx)]
+
+    caminho_encontrado = False
+    while fila_prioridade:
+        _, dist_atual, no_atual_idx = heappop(fila_prioridade)
+
+        if no_atual_idx == end_idx:
+            caminho_encontrado = True
+            break
+
+        if dist_atual > distancias[no_atual_idx]:
+            continue
+
+        for vizinho_idx, peso in saida(no_atual_idx):
+            nova_dist = dist_atual + peso
+
+            if nova_dist < distancias.get(vizinho_idx, infinito):
+                distancias[vizinho_idx] = nova_dist
+                predecessores[vizinho_idx] = no_atual_idx
+                heappush(fila_prioridade, (nova_dist + h(vizinho_idx), nova_dist, vizinho_idx))
+
+    if not caminho_encontrado:
+        return None, float('inf')
+
+    caminho = reconstruir_caminho(predecessores, end_idx, index_to_node_id)
+    return caminho, distancias[end_idx]
@@ -0,0 +1,106 @@
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024  # 32 MB
+
+
+def graph_fingerprint(G):
+    """
+    Identificador da versão do grafo, criado na primeira consulta e guardado
+    em G.attrs. Um grafo novo (build_graph, load_graph) começa sem ele, e
+    extend_graph o descarta, então rotas de versões antigas nunca são reusadas.
+    """
+    fingerprint = G.attrs.get("fingerprint")
+    if fingerprint is None:
+        fingerprint = G.attrs["fingerprint"] = uuid.uuid4().hex
+    return fingerprint
+
+
+def _tamanho_rota(caminho):
+    """Estimativa (bytes) da memória de uma rota guardada"""
+    if caminho is None:
+        return 64
+    return sys.getsizeof(caminho) + sum(sys.getsizeof(no) for no in caminho) + 64
+
+
+class RouteCache:
+    """
+    Cache LRU de resultados de rota, na frente de dijkstra/astar/CH.
+
+    Chave: (impressão digital do grafo, origem, destino, algoritmo). Limitado
+    por número de entradas e por memória estimada; as menos usadas
+    recentemente saem primeiro. Seguro para uso entre threads (a GUI calcula
+    rotas na thread de trabalho e limpa o cache na thread do Tk).
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()  # chave -> (caminho, distância, bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def get(self, chave):
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.hits += 1
+        caminho, distancia, _ = entrada
+        return (list(caminho) if caminho is not None else None), distancia
+
+    def put(self, chave, caminho, distancia):
+        caminho = tuple(caminho) if caminho is not None else None
+        tamanho = _tamanho_rota(caminho)
+        with self._lock:
+            antiga = self._entradas.pop(chave, None)
+            if antiga is not None:
+                self._bytes -= antiga[2]
+            if tamanho > self.max_bytes:
+                return
+            self._entradas[chave] = (caminho, distancia, tamanho)
+            self._bytes += tamanho
+            while len(self._entradas) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, liberado) = self._entradas.popitem(last=False)
+                self._bytes -= liberado
+                self.evictions += 1
+
+    def route(self, algoritmo, nome, G, start_id, end_id, node_id_to_index, index_to_node_id):
+        """
+        Rota via cache: devolve (caminho, distância) como algoritmo(G, start_id,
+        end_id, node_id_to_index, index_to_node_id), calculando só na falta.
+        nome identifica o algoritmo (e suas opções) na chave.
+        """
+        chave = (graph_fingerprint(G), start_id, end_id, nome)
+        resultado = self.get(chave)
+        if resultado is not None:
+            return resultado
+        caminho, distancia = algoritmo(G, start_id, end_id, node_id_to_index, index_to_node_id)
+        self.put(chave, caminho, distancia)
+        return caminho, distancia
+
+    def clear(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
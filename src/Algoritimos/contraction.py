@@ -0,0 +1,367 @@
+import heapq
+import numpy as np
+from src.Algoritimos.dijkstra import edge_iterator
+from src.Grafo.espacial import resolve_node
+from src.Grafo.perfis import DEFAULT_PROFILE
+
+CH_FORMAT_VERSION = 1
+
+
+def _csr_to_lists(offsets, vizinhos, pesos, mids):
+    arestas = list(zip(vizinhos.tolist(), pesos.tolist(), mids.tolist()))
+    limites = offsets.tolist()
+    return [arestas[limites[v]:limites[v + 1]] for v in range(len(limites) - 1)]
+
+
+class ContractionHierarchy:
+    """
+    Hierarquia de contração (CH) sobre o grafo de build_graph.
+
+    rank[v] é a ordem em que v foi contraído. As arestas (originais + atalhos)
+    ficam em dois grafos "para cima", ambos em CSR:
+      - fwd: arestas v -> w com rank[w] > rank[v] (busca a partir da origem)
+      - bwd: arestas u -> v com rank[u] > rank[v], indexadas por v (busca a
+        partir do destino, no sentido inverso)
+    mid[e] é o nó contraído que o atalho e substitui (-1 para aresta original).
+    """
+
+    def __init__(self, rank, fwd_offsets, fwd_targets, fwd_weights, fwd_mid,
+                 bwd_offsets, bwd_sources, bwd_weights, bwd_mid):
+        self.rank = rank
+        self.fwd_offsets = fwd_offsets
+        self.fwd_targets = fwd_targets
+        self.fwd_weights = fwd_weights
+        self.fwd_mid = fwd_mid
+        self.bwd_offsets = bwd_offsets
+        self.bwd_sources = bwd_sources
+        self.bwd_weights = bwd_weights
+        self.bwd_mid = bwd_mid
+        self._listas = None
+
+    def num_shortcuts(self):
+        return int(np.count_nonzero(self.fwd_mid >= 0) + np.count_nonzero(self.bwd_mid >= 0))
+
+    # --- Consulta ---
+    def _upward(self, lado):
+        """
+        Listas de adjacência (vizinho, peso, mid) por nó, montadas a partir do
+        CSR na primeira consulta e reaproveitadas nas seguintes
+        """
+        if self._listas is None:
+            self._listas = (
+                _csr_to_lists(self.fwd_offsets, self.fwd_targets, self.fwd_weights, self.fwd_mid),
+                _csr_to_lists(self.bwd_offsets, self.bwd_sources, self.bwd_weights, self.bwd_mid),
+            )
+        return self._listas[lado].__getitem__
+
+    def query(self, start_id, end_id, node_id_to_index, index_to_node_id):
+        """Mesmo contrato de dijkstra: (caminho em IDs originais, distância)"""
+        if start_id not in node_id_to_index or end_id not in node_id_to_index:
+            return None, float('inf')
+
+        start_idx = node_id_to_index[start_id]
+        end_idx = node_id_to_index[end_id]
+        if start_idx == end_idx:
+            return [start_id], 0
+
+        arestas = (self._upward(0), self._upward(1))
+        distancias = ({start_idx: 0}, {end_idx: 0})
+        # predecessor: nó -> (nó anterior na busca, nó intermediário do atalho)
+        predecessores = ({start_idx: None}, {end_idx: None})
+        filas = ([(0, start_idx)], [(0, end_idx)])
+        infinito = float('inf')
+        melhor = infinito
+        encontro = None
+
+        # Busca bidirecional só para cima; cada lado para quando seu topo
+        # já não pode melhorar o melhor encontro
+        while filas[0] or filas[1]:
+            for lado in (0, 1):
+                fila = filas[lado]
+                if not fila:
+                    continue
+                dist_atual, u = heapq.heappop(fila)
+                dist_lado = distancias[lado]
+                if dist_atual > dist_lado[u]:
+                    continue
+                if dist_atual >= melhor:
+                    fila.clear()
+                    continue
+
+                outro = distancias[1 - lado].get(u)
+                if outro is not None and dist_atual + outro < melhor:
+                    melhor = dist_atual + outro
+                    encontro = u
+
+                # Stall-on-demand: se um vizinho de rank maior alcança u por
+                # um caminho mais curto (aresta no sentido oposto), u não
+                # está em nenhum caminho mínimo desta busca e não é expandido
+                if any(dist_lado.get(x, infinito) + peso < dist_atual
+                       for x, peso, _ in arestas[1 - lado](u)):
+                    continue
+
+                for v, peso, mid in arestas[lado](u):
+                    nova_dist = dist_atual + peso
+                    if nova_dist < dist_lado.get(v, infinito):
+                        dist_lado[v] = nova_dist
+                        predecessores[lado][v] = (u, mid)
+                        heapq.heappush(fila, (nova_dist, v))
+
+        if encontro is None:
+            return None, float('inf')
+
+        # Origem -> encontro (arestas da busca para frente)
+        trechos = []
+        v = encontro
+        while predecessores[0][v] is not None:
+            u, mid = predecessores[0][v]
+            trechos.append((u, v, mid))
+            v = u
+        trechos.reverse()
+
+        # Encontro -> destino (arestas da busca reversa, já no sentido original)
+        u = encontro
+        while predecessores[1][u] is not None:
+            v, mid = predecessores[1][u]
+            trechos.append((u, v, mid))
+            u = v
+
+        caminho = [start_idx]
+        for u, v, mid in trechos:
+            caminho.extend(self._unpack(u, v, mid)[1:])
+
+        return [index_to_node_id[idx] for idx in caminho], melhor
+
+    @staticmethod
+    def _edge_mid(arestas, no, vizinho):
+        for w, _, mid in arestas(no):
+            if w == vizinho:
+                return mid
+        raise KeyError((no, vizinho))
+
+    def _unpack(self, u, v, mid):
+        """Expande o atalho u -> v em nós do grafo original"""
+        if mid < 0:
+            return [u, v]
+        fwd, bwd = self._upward(0), self._upward(1)
+        caminho = [u]
+        pilha = [(u, v, mid)]
+        while pilha:
+            a, b, m = pilha.pop()
+            if m < 0:
+                caminho.append(b)
+                continue
+            # a -> m: m tem rank menor que a, está em bwd[m]
+            # m -> b: m tem rank menor que b, está em fwd[m]
+            pilha.append((m, b, self._edge_mid(fwd, m, b)))
+            pilha.append((a, m, self._edge_mid(bwd, m, a)))
+        return caminho
+
+    # --- Serialização ---
+    def to_arrays(self):
+        return {
+            "ch_version": np.array([CH_FORMAT_VERSION], dtype=np.int32),
+            "ch_rank": self.rank,
+            "ch_fwd_offsets": self.fwd_offsets,
+            "ch_fwd_targets": self.fwd_targets,
+            "ch_fwd_weights": self.fwd_weights,
+            "ch_fwd_mid": self.fwd_mid,
+            "ch_bwd_offsets": self.bwd_offsets,
+            "ch_bwd_sources": self.bwd_sources,
+            "ch_bwd_weights": self.bwd_weights,
+            "ch_bwd_mid": self.bwd_mid,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        versao = int(arrays["ch_version"][0])
+        if versao != CH_FORMAT_VERSION:
+            raise ValueError(f"Versão de CH incompatível: {versao} (esperado {CH_FORMAT_VERSION})")
+        return cls(*(arrays[f"ch_{nome}"] for nome in (
+            "rank", "fwd_offsets", "fwd_targets", "fwd_weights", "fwd_mid",
+            "bwd_offsets", "bwd_sources", "bwd_weights", "bwd_mid")))
+
+    def save(self, path):
+        np.savez(path, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls.from_arrays({nome: arrays[nome] for nome in arrays.files})
+
+
+def _witness_search(saida, origem, ignorado, alvos, limite, max_settled):
+    """Dijkstra limitado a partir de origem, sem passar por 'ignorado'"""
+    distancias = {origem: 0}
+    fila = [(0, origem)]
+    restantes = set(alvos)
+    settled = 0
+    while fila and restantes and settled < max_settled:
+        dist_atual, u = heapq.heappop(fila)
+        if dist_atual > distancias[u]:
+            continue
+        if dist_atual > limite:
+            break
+        restantes.discard(u)
+        settled += 1
+        for v, (peso, _) in saida[u].items():
+            if v == ignorado:
+                continue
+            nova_dist = dist_atual + peso
+            if nova_dist < distancias.get(v, float('inf')):
+                distancias[v] = nova_dist
+                heapq.heappush(fila, (nova_dist, v))
+    return distancias
+
+
+def _shortcuts(saida, entrada, v, max_settled):
+    """Atalhos (u, w, peso) necessários para contrair v"""
+    atalhos = []
+    saidas_v = saida[v]
+    if not saidas_v:
+        return atalhos
+    max_saida = max(peso for peso, _ in saidas_v.values())
+    for u, (peso_uv, _) in entrada[v].items():
+        alvos = [w for w in saidas_v if w != u]
+        if not alvos:
+            continue
+        distancias = _witness_search(saida, u, v, alvos, peso_uv + max_saida, max_settled)
+        for w in alvos:
+            candidato = peso_uv + saidas_v[w][0]
+            if distancias.get(w, float('inf')) > candidato:
+                atalhos.append((u, w, candidato))
+    return atalhos
+
+
+def build_contraction_hierarchy(G, max_settled=60, profile=None):
+    """
+    Pré-processa G (PyDiGraph ou CompactGraph) em uma ContractionHierarchy.
+
+    A ordem de contração usa a diferença de arestas (atalhos criados menos
+    arestas removidas) mais o número de vizinhos já contraídos, com
+    atualização preguiçosa das prioridades. max_settled limita as buscas de
+    testemunha: valores menores aceleram o pré-processamento à custa de
+    atalhos extras, sem afetar a corretude das consultas. profile escolhe o
+    perfil de custo das arestas (ver edge_iterator).
+    """
+    indices = list(G.node_indices())
+    n = max(indices) + 1 if indices else 0
+    arestas = edge_iterator(G, profile=profile)
+
+    # Grafo remanescente: saida[u][w] = (peso, mid); arestas paralelas -> menor peso
+    saida = [dict() for _ in range(n)]
+    entrada = [dict() for _ in range(n)]
+    for u in indices:
+        for w, peso in arestas(u):
+            if w == u:
+                continue
+            atual = saida[u].get(w)
+            if atual is None or peso < atual[0]:
+                saida[u][w] = (peso, -1)
+                entrada[w][u] = (peso, -1)
+
+    contraidos_vizinhos = [0] * n
+    nivel = [0] * n
+    diferenca = [0] * n  # atalhos criados - arestas removidas (recalculada sob demanda)
+
+    def calcular_diferenca(v):
+        atalhos = _shortcuts(saida, entrada, v, max(1, max_settled // 4))
+        diferenca[v] = len(atalhos) - len(saida[v]) - len(entrada[v])
+
+    def prioridade(v):
+        return 2 * diferenca[v] + contraidos_vizinhos[v] + nivel[v]
+
+    for v in indices:
+        calcular_diferenca(v)
+    fila = [(prioridade(v), v) for v in indices]
+    heapq.heapify(fila)
+    prioridade_atual = dict((v, p) for p, v in fila)
+
+    rank = np.full(n, -1, dtype=np.int64)
+    fwd = [None] * n  # arestas para cima a partir de v
+    bwd = [None] * n  # arestas que chegam em v vindas de nós de rank maior
+    proximo_rank = 0
+
+    while fila:
+        p, v = heapq.heappop(fila)
+        if rank[v] >= 0 or p != prioridade_atual[v]:
+            continue  # entrada obsoleta (a prioridade foi atualizada depois)
+
+        # Atualização preguiçosa: a diferença de arestas só é recalculada
+        # quando v chega ao topo; se piorou, v volta para a fila
+        calcular_diferenca(v)
+        nova = prioridade(v)
+        if fila and nova > fila[0][0]:
+            prioridade_atual[v] = nova
+            heapq.heappush(fila, (nova, v))
+            continue
+
+        for u, w, peso in _shortcuts(saida, entrada, v, max_settled):
+            atual = saida[u].get(w)
+            if atual is None or peso < atual[0]:
+                saida[u][w] = (peso, v)
+                entrada[w][u] = (peso, v)
+
+        rank[v] = proximo_rank
+        proximo_rank += 1
+        fwd[v] = [(w, peso, mid) for w, (peso, mid) in saida[v].items()]
+        bwd[v] = [(u, peso, mid) for u, (peso, mid) in entrada[v].items()]
+
+        # Remove v do grafo remanescente
+        vizinhos = set(saida[v]) | set(entrada[v])
+        for w in saida[v]:
+            del entrada[w][v]
+        for u in entrada[v]:
+            del saida[u][v]
+        saida[v] = {}
+        entrada[v] = {}
+
+        # Vizinhos: atualiza os termos baratos da prioridade
+        for x in vizinhos:
+            contraidos_vizinhos[x] += 1
+            nivel[x] = max(nivel[x], nivel[v] + 1)
+            prioridade_atual[x] = prioridade(x)
+            heapq.heappush(fila, (prioridade_atual[x], x))
+
+    def csr(listas):
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        for v in range(n):
+            offsets[v + 1] = offsets[v] + (len(listas[v]) if listas[v] else 0)
+        vizinhos = np.empty(offsets[-1], dtype=np.int64)
+        pesos = np.empty(offsets[-1], dtype=np.float64)
+        mids = np.empty(offsets[-1], dtype=np.int64)
+        for v in range(n):
+            if listas[v]:
+                inicio = offsets[v]
+                for k, (w, peso, mid) in enumerate(listas[v]):
+                    vizinhos[inicio + k] = w
+                    pesos[inicio + k] = peso
+                    mids[inicio + k] = mid
+        return offsets, vizinhos, pesos, mids
+
+    return ContractionHierarchy(rank, *csr(fwd), *csr(bwd))
+
+
+def get_contraction_hierarchy(G, profile=None):
+    """
+    CH do grafo, construída na primeira chamada e guardada em G.attrs['ch']
+    (distância) ou em G.attrs['profile_ch'][perfil] (demais perfis).
+    """
+    if profile is None or profile == DEFAULT_PROFILE:
+        ch = G.attrs.get("ch")
+        if ch is None:
+            ch = build_contraction_hierarchy(G)
+            G.attrs["ch"] = ch
+        return ch
+    por_perfil = G.attrs.setdefault("profile_ch", {})
+    ch = por_perfil.get(profile)
+    if ch is None:
+        ch = por_perfil[profile] = build_contraction_hierarchy(G, profile=profile)
+    return ch
+
+
+def ch_shortest_path(G, start_id, end_id, node_id_to_index, index_to_node_id, profile=None):
+    """Consulta via CH com a mesma assinatura e retorno de dijkstra"""
+    start_id = resolve_node(G, start_id, index_to_node_id)
+    end_id = resolve_node(G, end_id, index_to_node_id)
+    return get_contraction_hierarchy(G, profile).query(start_id, end_id, node_id_to_index, index_to_node_id)
@@ -0,0 +1,197 @@
+import heapq
+import math
+import rustworkx as rx
+from src.Grafo.espacial import resolve_node
+from src.Algoritimos.astar import haversine_heuristic
+from src.Grafo.perfis import profile_weights, profile_scale
+
+# Penalidade por conversão, em metros equivalentes somados à distância.
+# Mão de direção à direita: virar à direita não cruza o fluxo contrário.
+DEFAULT_TURN_PENALTIES = {
+    "reta": 0.0,
+    "direita": 5.0,
+    "esquerda": 15.0,
+    "retorno": 60.0,
+}
+ANGULO_RETA = 30.0      # |mudança de rumo| até aqui conta como seguir reto
+ANGULO_RETORNO = 150.0  # a partir daqui conta como retorno
+_COS_RETA = math.cos(math.radians(ANGULO_RETA))
+_COS_RETORNO = math.cos(math.radians(ANGULO_RETORNO))
+
+
+def _direcao(lat1, lon1, lat2, lon2, cos_lat):
+    """Vetor unitário (leste, norte) de (lat1, lon1) para (lat2, lon2), projeção local"""
+    leste = (lon2 - lon1) * cos_lat
+    norte = lat2 - lat1
+    comprimento = math.hypot(leste, norte)
+    if comprimento == 0:
+        return 0.0, 0.0
+    return leste / comprimento, norte / comprimento
+
+
+def turn_type(chegada, saida):
+    """
+    Classifica a conversão entre duas direções (vetores unitários leste,
+    norte): reta, direita, esquerda ou retorno. Usa produto escalar e
+    vetorial, sem trigonometria por aresta.
+    """
+    cos_angulo = chegada[0] * saida[0] + chegada[1] * saida[1]
+    if cos_angulo >= _COS_RETA:
+        return "reta"
+    if cos_angulo <= _COS_RETORNO:
+        return "retorno"
+    return "direita" if chegada[0] * saida[1] - chegada[1] * saida[0] < 0 else "esquerda"
+
+
+def _indice_restricoes(G):
+    """(from_way, via_node) -> (ways proibidos, way obrigatório ou None)"""
+    indice = {}
+    for de, via, para, obrigatoria in G.attrs.get("turn_restrictions", {}).values():
+        proibidos, obrigatorio = indice.get((de, via), (frozenset(), None))
+        if obrigatoria:
+            obrigatorio = para
+        else:
+            proibidos = proibidos | {para}
+        indice[(de, via)] = (proibidos, obrigatorio)
+    return indice
+
+
+def turn_aware_route(G, start_id, end_id, node_id_to_index, index_to_node_id, penalties=None,
+                     profile=None, edge_index=None):
+    """
+    Rota com custo de conversões e restrições de conversão (relações
+    type=restriction em G.attrs["turn_restrictions"]).
+
+    A busca é feita no grafo de arestas (line graph): cada estado é a aresta
+    pela qual se chega a um nó, então o custo de sair dele pode depender de
+    onde se veio. O grafo de arestas não é montado; as saídas de cada nó são
+    lidas do grafo sob demanda e guardadas só durante a consulta. Como as
+    penalidades não são negativas, a busca é guiada pela mesma heurística
+    Haversine do A* (exploração perto da de astar, não de todo o grafo).
+
+    penalties sobrescreve DEFAULT_TURN_PENALTIES (chaves reta, direita,
+    esquerda, retorno), na unidade do perfil de custo (profile, ver
+    edge_iterator). Devolve (caminho, distância) como dijkstra; a distância
+    inclui as penalidades. Só para grafos rustworkx.
+
+    O rumo de cada aresta na saída e na chegada é medido no pedaço da rua
+    junto ao nó, com a geometria dos ways do índice de ruas (edge_index, ou
+    G.attrs["edge_index"] se get_edge_index já o montou): a reta entre dois
+    vértices distantes não diz para onde a rua vira no cruzamento. Arestas
+    sem trecho no índice (ex.: grafo simplificado) usam essa reta.
+    """
+    if not isinstance(G, rx.PyDiGraph):
+        raise TypeError("turn_aware_route precisa do grafo rustworkx (compact=False)")
+    start_id = resolve_node(G, start_id, index_to_node_id)
+    end_id = resolve_node(G, end_id, index_to_node_id)
+    if start_id not in node_id_to_index or end_id not in node_id_to_index:
+        return None, float('inf')
+    origem_idx = node_id_to_index[start_id]
+    destino_idx = node_id_to_index[end_id]
+    if origem_idx == destino_idx:
+        return [start_id], 0
+
+    custo = dict(DEFAULT_TURN_PENALTIES)
+    if penalties:
+        custo.update(penalties)
+    pen_reta, pen_direita = custo["reta"], custo["direita"]
+    pen_esquerda, pen_retorno = custo["esquerda"], custo["retorno"]
+    restricoes = _indice_restricoes(G)
+
+    # Pesos do perfil por índice de aresta (None = metros do próprio grafo)
+    pesos = profile_weights(G, profile) if profile is not None else None
+    if pesos is not None:
+        pesos = pesos.tolist()
+    escala = profile_scale(G, profile) if profile is not None else 1.0
+
+    if edge_index is None:
+        edge_index = G.attrs.get("edge_index")
+
+    # Saídas de cada nó visitado: (aresta, destino, peso, way, rumo na saída
+    # de u (leste, norte), rumo na chegada a v (leste, norte), h(destino))
+    saidas = {}
+    h = haversine_heuristic(G, destino_idx, escala)
+    infinito = float('inf')
+
+    def rumo(a, b, dados):
+        """Rumo ao sair de a pela aresta a -> b (vetor unitário leste, norte)"""
+        no_a = G[a]
+        lat_a, lon_a = no_a["lat"], no_a["lon"]
+        ponto = None
+        if edge_index is not None:
+            ponto = edge_index.next_point(index_to_node_id[a], index_to_node_id[b], dados["weight"])
+        if ponto is None:
+            no_b = G[b]
+            ponto = no_b["lat"], no_b["lon"]
+        return _direcao(lat_a, lon_a, ponto[0], ponto[1], math.cos(math.radians(lat_a)))
+
+    def saida(u):
+        lista = saidas.get(u)
+        if lista is None:
+            lista = []
+            for aresta, (_, v, dados) in G.incident_edge_index_map(u).items():
+                peso = dados["weight"] if pesos is None else pesos[aresta]
+                if peso == infinito:
+                    continue  # proibida no perfil
+                leste, norte = rumo(u, v, dados)
+                # Chegada a v: oposto do rumo de quem sai de v pelo mesmo trecho
+                leste_volta, norte_volta = rumo(v, u, dados)
+                lista.append((aresta, v, peso, dados.get("way"), leste, norte,
+                              -leste_volta, -norte_volta, h(v)))
+            saidas[u] = lista
+        return lista
+
+    heappop, heappush = heapq.heappop, heapq.heappush
+    distancias = {}
+    predecessores = {}  # aresta -> aresta anterior (None na saída da origem)
+    estados = {}        # aresta -> (origem, destino, way, rumo de chegada leste, norte)
+    fila_prioridade = []
+
+    for aresta, v, peso, way, _, _, leste, norte, h_v in saida(origem_idx):
+        if peso < distancias.get(aresta, infinito):
+            distancias[aresta] = peso
+            predecessores[aresta] = None
+            estados[aresta] = (origem_idx, v, way, leste, norte)
+            heappush(fila_prioridade, (peso + h_v, peso, aresta))
+
+    while fila_prioridade:
+        _, dist_atual, aresta_atual = heappop(fila_prioridade)
+        if dist_atual > distancias[aresta_atual]:
+            continue
+        u, v, way, leste, norte = estados[aresta_atual]
+
+        if v == destino_idx:
+            caminho = [index_to_node_id[v]]
+            aresta = aresta_atual
+            while aresta is not None:
+                caminho.append(index_to_node_id[estados[aresta][0]])
+                aresta = predecessores[aresta]
+            caminho.reverse()
+            return caminho, dist_atual
+
+        proibidos = obrigatorio = None
+        if restricoes:
+            proibidos, obrigatorio = restricoes.get((way, index_to_node_id[v]), (None, None))
+        for proxima, x, peso, way_saida, leste_saida, norte_saida, leste_chegada, norte_chegada, h_x in saida(v):
+            if obrigatorio is not None and way_saida != obrigatorio:
+                continue
+            if proibidos and way_saida in proibidos:
+                continue
+            # Mesma classificação de turn_type, em linha (laço mais quente da busca)
+            cos_angulo = leste * leste_saida + norte * norte_saida
+            if x == u or cos_angulo <= _COS_RETORNO:
+                penalidade = pen_retorno
+            elif cos_angulo >= _COS_RETA:
+                penalidade = pen_reta
+            elif leste * norte_saida - norte * leste_saida < 0:
+                penalidade = pen_direita
+            else:
+                penalidade = pen_esquerda
+            nova_dist = dist_atual + peso + penalidade
+            if nova_dist < distancias.get(proxima, infinito):
+                distancias[proxima] = nova_dist
+                predecessores[proxima] = aresta_atual
+                estados[proxima] = (v, x, way_saida, leste_chegada, norte_chegada)
+                heappush(fila_prioridade, (nova_dist + h_x, nova_dist, proxima))
+
+    return None, float('inf')
@@ -1,48 +1,267 @@
 import heapq
+from src.Grafo.compacto import CompactGraph
+from src.Grafo.espacial import resolve_node
+from src.Grafo.perfis import profile_weights
+from Filas.Fila_Prioridade import FilaPrioridade
 
-def dijkstra(G, start_id, end_id, node_id_to_index, index_to_node_id):
+
+def edge_iterator(G, reverse=False, profile=None):
+    """
+    Retorna uma função u -> [(vizinho, peso), ...] percorrendo as arestas de
+    saída de u (ou de entrada, com reverse=True). Cada aresta paralela aparece
+    separadamente, com o próprio peso.
+
+    profile escolhe o perfil de custo (src.Grafo.perfis.PROFILES); None ou
+    "distance" usa o peso em metros. Arestas proibidas no perfil (peso inf)
+    são omitidas.
+
+    Funciona tanto com o PyDiGraph de build_graph quanto com o CompactGraph.
+    """
+    pesos_perfil = profile_weights(G, profile) if profile is not None else None
+    infinito = float('inf')
+    if isinstance(G, CompactGraph):
+        if reverse:
+            offsets, vizinhos, pesos = G.reverse_csr(pesos_perfil)
+        else:
+            offsets, vizinhos = G.offsets, G.targets
+            pesos = G.weights if pesos_perfil is None else pesos_perfil
+
+        def arestas(u):
+            inicio, fim = offsets[u], offsets[u + 1]
+            return zip(vizinhos[inicio:fim].tolist(), pesos[inicio:fim].tolist())
+
+        if pesos_perfil is None:
+            return arestas
+
+        def permitidas(u):
+            return [(v, peso) for v, peso in arestas(u) if peso != infinito]
+        return permitidas
+
+    if pesos_perfil is not None:
+        # Pesos do perfil indexados pelo índice da aresta
+        pesos = pesos_perfil.tolist()
+        if reverse:
+            def arestas(u):
+                for e in G.in_edge_indices(u):
+                    if pesos[e] != infinito:
+                        yield G.get_edge_endpoints_by_index(e)[0], pesos[e]
+        else:
+            def arestas(u):
+                for e, (_, destino, _) in G.incident_edge_index_map(u).items():
+                    if pesos[e] != infinito:
+                        yield destino, pesos[e]
+        return arestas
+
+    if reverse:
+        def arestas(u):
+            for origem, _, dados in G.in_edges(u):
+                yield origem, dados['weight']
+    else:
+        def arestas(u):
+            for _, destino, dados in G.out_edges(u):
+                yield destino, dados['weight']
+    return arestas
+
+
+def reconstruir_caminho(predecessores, fim_idx, index_to_node_id):
+    """Segue o mapa de predecessores a partir de fim_idx e devolve IDs originais"""
+    caminho = []
+    no_passado_idx = fim_idx
+    while no_passado_idx is not None:
+        caminho.append(index_to_node_id[no_passado_idx])
+        no_passado_idx = predecessores[no_passado_idx]
+    caminho.reverse()
+    return caminho
+
+
+def dijkstra(G, start_id, end_id, node_id_to_index, index_to_node_id, bidirectional=False,
+             indexed_heap=False, profile=None):
+    # Origem/destino podem ser IDs OSM ou coordenadas (lat, lon) do vértice mais próximo
+    start_id = resolve_node(G, start_id, index_to_node_id)
+    end_id = resolve_node(G, end_id, index_to_node_id)
     if start_id not in node_id_to_index or end_id not in node_id_to_index:
         return None, float('inf')
-    
+
     start_idx = node_id_to_index[start_id]
     end_idx = node_id_to_index[end_id]
-    
-    distancias = {node: float('inf') for node in G.node_indices()}
-    distancias[start_idx] = 0
-    
+
+    if bidirectional:
+        return _dijkstra_bidirecional(G, start_idx, end_idx, index_to_node_id, profile)
+    if indexed_heap:
+        return _dijkstra_indexado(G, start_idx, end_idx, index_to_node_id, profile)
+
+    saida = edge_iterator(G, profile=profile)
+    infinito = float('inf')
+    heappop, heappush = heapq.heappop, heapq.heappush
+
+    # Estado alocado sob demanda: só os nós alcançados entram nos dicionários
+    distancias = {start_idx: 0}
+    predecessores = {start_idx: None}
     fila_prioridade = [(0, start_idx)]
-    predecessores = {node: None for node in G.node_indices()}
-    
+
     caminho_encontrado = False
     while fila_prioridade:
-        dist_atual, no_atual_idx = heapq.heappop(fila_prioridade)
-        
+        dist_atual, no_atual_idx = heappop(fila_prioridade)
+
         if no_atual_idx == end_idx:
             caminho_encontrado = True
             break
-            
+
         if dist_atual > distancias[no_atual_idx]:
             continue
-            
-        for vizinho_idx in G.successor_indices(no_atual_idx):
-            aresta_data = G.get_edge_data(no_atual_idx, vizinho_idx)
-            nova_dist = dist_atual + aresta_data['weight']
-            
-            if nova_dist < distancias[vizinho_idx]:
+
+        for vizinho_idx, peso in saida(no_atual_idx):
+            nova_dist = dist_atual + peso
+
+            if nova_dist < distancias.get(vizinho_idx, infinito):
                 distancias[vizinho_idx] = nova_dist
                 predecessores[vizinho_idx] = no_atual_idx
-                heapq.heappush(fila_prioridade, (nova_dist, vizinho_idx))
-    
+                heappush(fila_prioridade, (nova_dist, vizinho_idx))
+
     if not caminho_encontrado:
         return None, float('inf')
 
-    caminho = []
-    no_passado_idx = end_idx
-    while no_passado_idx is not None:
-        caminho.append(index_to_node_id[no_passado_idx])
-        no_passado_idx = predecessores[no_passado_idx]
-    
-    caminho.reverse()
-    
+    caminho = reconstruir_caminho(predecessores, end_idx, index_to_node_id)
     return caminho, distancias[end_idx]
 
+
+def _dijkstra_indexado(G, start_idx, end_idx, index_to_node_id, profile=None):
+    """
+    Mesma busca com FilaPrioridade (heap d-ário indexado): cada nó entra uma
+    única vez na fila e melhorias usam diminuição de chave, então a fila fica
+    limitada a V entradas, sem entradas obsoletas.
+
+    Em CPython o heapq (em C) com remoção preguiçosa ainda é mais rápido; veja
+    optirota/benchmark_fila.py.
+    """
+    saida = edge_iterator(G, profile=profile)
+    infinito = float('inf')
+
+    distancias = {start_idx: 0}
+    predecessores = {start_idx: None}
+    fila = FilaPrioridade()
+    fila.inserir(0, start_idx)
+    inserir, remover = fila.inserir, fila.remover_com_prioridade
+
+    while fila.itens:
+        dist_atual, no_atual_idx = remover()
+
+        if no_atual_idx == end_idx:
+            caminho = reconstruir_caminho(predecessores, end_idx, index_to_node_id)
+            return caminho, dist_atual
+
+        for vizinho_idx, peso in saida(no_atual_idx):
+            nova_dist = dist_atual + peso
+
+            if nova_dist < distancias.get(vizinho_idx, infinito):
+                distancias[vizinho_idx] = nova_dist
+                predecessores[vizinho_idx] = no_atual_idx
+                # Insere ou diminui a chave de quem já está na fila
+                inserir(nova_dist, vizinho_idx)
+
+    return None, float('inf')
+
+
+def dijkstra_multi(G, origens, alvos, index_to_node_id, profile=None):
+    """
+    Dijkstra com várias origens e vários destinos, cada um com custo extra:
+    origens = {índice: custo inicial}, alvos = {índice: custo final}.
+
+    Devolve (caminho, distância) do par de menor custo total, com o caminho
+    em IDs originais da origem ao destino escolhidos. Serve para pontos
+    temporários no meio de uma aresta sem alterar o grafo.
+    """
+    saida = edge_iterator(G, profile=profile)
+    infinito = float('inf')
+    heappop, heappush = heapq.heappop, heapq.heappush
+
+    distancias = dict(origens)
+    predecessores = dict.fromkeys(origens)
+    fila_prioridade = [(custo, idx) for idx, custo in origens.items()]
+    heapq.heapify(fila_prioridade)
+
+    melhor, melhor_alvo = infinito, None
+    while fila_prioridade:
+        dist_atual, no_atual_idx = heappop(fila_prioridade)
+
+        # Nenhum alvo ainda não visto pode sair mais barato
+        if dist_atual >= melhor:
+            break
+        if dist_atual > distancias[no_atual_idx]:
+            continue
+
+        custo_final = alvos.get(no_atual_idx)
+        if custo_final is not None and dist_atual + custo_final < melhor:
+            melhor, melhor_alvo = dist_atual + custo_final, no_atual_idx
+
+        for vizinho_idx, peso in saida(no_atual_idx):
+            nova_dist = dist_atual + peso
+
+            if nova_dist < distancias.get(vizinho_idx, infinito):
+                distancias[vizinho_idx] = nova_dist
+                predecessores[vizinho_idx] = no_atual_idx
+                heappush(fila_prioridade, (nova_dist, vizinho_idx))
+
+    if melhor_alvo is None:
+        return None, infinito
+    return reconstruir_caminho(predecessores, melhor_alvo, index_to_node_id), melhor
+
+
+def _dijkstra_bidirecional(G, start_idx, end_idx, index_to_node_id, profile=None):
+    """
+    Busca simultânea a partir da origem (arestas de saída) e do destino
+    (arestas de entrada). Para quando a soma dos topos das duas filas não pode
+    mais melhorar o melhor encontro conhecido.
+    """
+    if start_idx == end_idx:
+        return [index_to_node_id[start_idx]], 0
+
+    arestas = (edge_iterator(G, profile=profile), edge_iterator(G, reverse=True, profile=profile))
+    distancias = ({start_idx: 0}, {end_idx: 0})
+    predecessores = ({start_idx: None}, {end_idx: None})
+    filas = ([(0, start_idx)], [(0, end_idx)])
+    finalizados = (set(), set())
+
+    melhor = float('inf')
+    encontro = None
+
+    while filas[0] and filas[1]:
+        if filas[0][0][0] + filas[1][0][0] >= melhor:
+            break
+
+        # Expande o lado com a menor fronteira
+        lado = 0 if filas[0][0][0] <= filas[1][0][0] else 1
+        outro = 1 - lado
+        dist_atual, no_atual_idx = heapq.heappop(filas[lado])
+
+        if no_atual_idx in finalizados[lado]:
+            continue
+        finalizados[lado].add(no_atual_idx)
+
+        dist_lado = distancias[lado]
+        dist_outro = distancias[outro]
+        for vizinho_idx, peso in arestas[lado](no_atual_idx):
+            nova_dist = dist_atual + peso
+
+            if nova_dist < dist_lado.get(vizinho_idx, float('inf')):
+                dist_lado[vizinho_idx] = nova_dist
+                predecessores[lado][vizinho_idx] = no_atual_idx
+                heapq.heappush(filas[lado], (nova_dist, vizinho_idx))
+
+            if vizinho_idx in dist_outro:
+                total = dist_lado[vizinho_idx] + dist_outro[vizinho_idx]
+                if total < melhor:
+                    melhor = total
+                    encontro = vizinho_idx
+
+    if encontro is None:
+        return None, float('inf')
+
+    # Origem -> encontro pelos predecessores da ida; encontro -> destino pelos da volta
+    caminho = reconstruir_caminho(predecessores[0], encontro, index_to_node_id)
+    no_idx = predecessores[1][encontro]
+    while no_idx is not None:
+        caminho.append(index_to_node_id[no_idx])
+        no_idx = predecessores[1][no_idx]
+
+    return caminho, melhor
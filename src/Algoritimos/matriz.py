@@ -0,0 +1,148 @@
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from src.Grafo.compacto import CompactGraph, IndexToNodeId, to_compact
+from src.Algoritimos.dijkstra import edge_iterator, reconstruir_caminho
+from src.Grafo.espacial import resolve_node
+from src.Grafo.perfis import profile_weights
+
+
+def single_source_search(saida, origem_idx, alvos):
+    """
+    Dijkstra a partir de origem_idx que para assim que todos os alvos
+    alcançáveis forem finalizados. Retorna (distancias, predecessores) apenas
+    dos nós visitados.
+    """
+    distancias = {origem_idx: 0}
+    predecessores = {origem_idx: None}
+    fila_prioridade = [(0, origem_idx)]
+    faltando = set(alvos)
+    infinito = float('inf')
+    heappop, heappush = heapq.heappop, heapq.heappush
+
+    while fila_prioridade and faltando:
+        dist_atual, no_atual_idx = heappop(fila_prioridade)
+        if dist_atual > distancias[no_atual_idx]:
+            continue
+        faltando.discard(no_atual_idx)
+
+        for vizinho_idx, peso in saida(no_atual_idx):
+            nova_dist = dist_atual + peso
+            if nova_dist < distancias.get(vizinho_idx, infinito):
+                distancias[vizinho_idx] = nova_dist
+                predecessores[vizinho_idx] = no_atual_idx
+                heappush(fila_prioridade, (nova_dist, vizinho_idx))
+
+    return distancias, predecessores
+
+
+def _linha(saida, origem_idx, alvos_idx, index_to_node_id, return_paths):
+    """Uma linha da matriz: distâncias (e caminhos) da origem para cada alvo"""
+    linha = np.full(len(alvos_idx), np.inf)
+    caminhos = [None] * len(alvos_idx) if return_paths else None
+    if origem_idx is None:
+        return linha, caminhos
+
+    distancias, predecessores = single_source_search(
+        saida, origem_idx, [a for a in alvos_idx if a is not None]
+    )
+    for j, alvo_idx in enumerate(alvos_idx):
+        if alvo_idx is None or alvo_idx not in distancias:
+            continue
+        linha[j] = distancias[alvo_idx]
+        if return_paths:
+            caminhos[j] = reconstruir_caminho(predecessores, alvo_idx, index_to_node_id)
+    return linha, caminhos
+
+
+# Com processes=None, cada processo do pool precisa de ao menos estas origens:
+# abaixo disso, criar o pool e converter o grafo para CompactGraph custa mais
+# que as próprias buscas
+MIN_SOURCES_PER_PROCESS = 32
+
+
+def default_processes(num_sources):
+    """Processos usados por distance_matrix com processes=None (1 = sem pool)"""
+    return max(1, min(os.cpu_count() or 1, num_sources // MIN_SOURCES_PER_PROCESS))
+
+
+# --- Estado de cada processo do pool (enviado uma única vez por processo) ---
+_worker = {}
+
+
+def _init_worker(grafo, alvos_idx, return_paths):
+    _worker["saida"] = edge_iterator(grafo)
+    _worker["index_to_node_id"] = IndexToNodeId(grafo.original_ids)
+    _worker["alvos_idx"] = alvos_idx
+    _worker["return_paths"] = return_paths
+
+
+def _worker_linhas(origens_idx):
+    return [
+        _linha(_worker["saida"], origem_idx, _worker["alvos_idx"],
+               _worker["index_to_node_id"], _worker["return_paths"])
+        for origem_idx in origens_idx
+    ]
+
+
+def distance_matrix(G, sources, targets, node_id_to_index, index_to_node_id,
+                    return_paths=False, processes=None, chunksize=None, profile=None):
+    """
+    Matriz de distâncias origem x destino (IDs OSM originais ou coordenadas).
+
+    Faz uma única busca por origem, colhendo todos os destinos dela. Com mais
+    de um processo, o grafo é convertido para CompactGraph e enviado uma vez
+    para cada processo do pool (initializer), não a cada tarefa.
+    processes=None só usa o pool a partir de MIN_SOURCES_PER_PROCESS origens
+    por processo (ver default_processes); tabelas pequenas rodam no próprio
+    processo.
+
+    profile escolhe o perfil de custo (ver edge_iterator).
+
+    Retorna a matriz NumPy (inf onde não há caminho ou o ID não existe) e,
+    com return_paths=True, também a lista de listas de caminhos.
+    """
+    # Coordenadas (lat, lon) são trocadas pelo vértice mais próximo
+    sources = [resolve_node(G, s, index_to_node_id) for s in sources]
+    targets = [resolve_node(G, t, index_to_node_id) for t in targets]
+    if processes is None:
+        processes = default_processes(len(sources))
+
+    matriz = np.full((len(sources), len(targets)), np.inf)
+    caminhos = [[None] * len(targets) for _ in sources] if return_paths else None
+    if not sources or not targets:
+        return (matriz, caminhos) if return_paths else matriz
+
+    if processes <= 1:
+        saida = edge_iterator(G, profile=profile)
+        origens_idx = [node_id_to_index.get(s) for s in sources]
+        alvos_idx = [node_id_to_index.get(t) for t in targets]
+        linhas = (_linha(saida, o, alvos_idx, index_to_node_id, return_paths) for o in origens_idx)
+    else:
+        if isinstance(G, CompactGraph):
+            compacto, ids_para_indice = G, node_id_to_index
+        else:
+            compacto, ids_para_indice, _ = to_compact(G, index_to_node_id)
+        # Só os arrays da adjacência (com os pesos do perfil) vão para os processos
+        pesos = profile_weights(compacto, profile) if profile is not None else None
+        leve = CompactGraph(compacto.original_ids, compacto.lat, compacto.lon, compacto.offsets,
+                            compacto.targets, compacto.weights if pesos is None else pesos,
+                            compacto.street_ids, [])
+        origens_idx = [ids_para_indice.get(s) for s in sources]
+        alvos_idx = [ids_para_indice.get(t) for t in targets]
+
+        if chunksize is None:
+            chunksize = max(1, len(origens_idx) // (processes * 4))
+        blocos = [origens_idx[i:i + chunksize] for i in range(0, len(origens_idx), chunksize)]
+
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(leve, alvos_idx, return_paths)) as pool:
+            linhas = [linha for bloco in pool.map(_worker_linhas, blocos) for linha in bloco]
+
+    for i, (linha, caminhos_linha) in enumerate(linhas):
+        matriz[i] = linha
+        if return_paths:
+            caminhos[i] = caminhos_linha
+
+    return (matriz, caminhos) if return_paths else matriz
@@ -0,0 +1,99 @@
+from src.Grafo.compacto import CompactGraph
+from src.Grafo.espacial import get_edge_index
+from src.Grafo.perfis import profile_weights
+from src.Algoritimos.dijkstra import dijkstra_multi
+
+
+def _com_menor(custos, idx, custo):
+    if custo < custos.get(idx, float('inf')):
+        custos[idx] = custo
+
+
+def _custo_por_metro(G, u_idx, v_idx, comprimento, pesos):
+    """
+    Custo do perfil por metro no trecho u -> v (inf se proibido ou ausente).
+    Entre arestas paralelas, usa a de comprimento mais próximo do trecho.
+    """
+    if isinstance(G, CompactGraph):
+        inicio, fim = int(G.offsets[u_idx]), int(G.offsets[u_idx + 1])
+        arestas = [(k, float(G.weights[k])) for k in range(inicio, fim) if G.targets[k] == v_idx]
+    else:
+        arestas = [(e, G.get_edge_data_by_index(e)['weight']) for e in G.edge_indices_from_endpoints(u_idx, v_idx)]
+    if not arestas:
+        return float('inf')
+    aresta, distancia = min(arestas, key=lambda a: abs(a[1] - comprimento))
+    return float(pesos[aresta]) / distancia if distancia > 0 else 0.0
+
+
+def route_between_points(G, nodes, vertices, ways, node_id_to_index, index_to_node_id, origem, destino,
+                         profile=None):
+    """
+    Menor caminho entre duas coordenadas (lat, lon) quaisquer, projetadas na
+    rua mais próxima (ex.: um endereço no meio da quadra).
+
+    Cada ponto projetado age como um vértice temporário que divide a aresta
+    em duas, com pesos parciais medidos ao longo da geometria original do way;
+    a busca parte/chega nesses pesos (dijkstra_multi), sem alterar nem copiar
+    o grafo compartilhado.
+
+    profile escolhe o perfil de custo (ver edge_iterator): os pesos parciais
+    são a fração do custo da aresta no perfil, e trechos proibidos nele não
+    são usados.
+
+    Retorna (caminho, custo): o caminho começa e termina nos pontos
+    projetados (tuplas lat, lon), com os IDs dos vértices percorridos no meio.
+    Os trechos vêm dos ways, então o grafo não pode ter sido simplificado.
+    """
+    if G.attrs.get("simplified"):
+        raise ValueError("route_between_points requer o grafo sem simplificação (simplify_graph)")
+    indice = get_edge_index(G, nodes, vertices, ways, node_id_to_index)
+    proj_origem = indice.nearest(*origem)
+    proj_destino = indice.nearest(*destino)
+    if proj_origem is None or proj_destino is None:
+        return None, float('inf')
+
+    seg_o, desloc_o, _, ponto_o = proj_origem
+    seg_d, desloc_d, _, ponto_d = proj_destino
+    pesos = profile_weights(G, profile) if profile is not None else None
+    infinito = float('inf')
+
+    def taxas(seg):
+        """(u, v, comprimento, custo por metro u->v, custo por metro v->u); inf = sentido proibido"""
+        u, v, (frente, tras), comprimento = indice.segmentos[seg]
+        iu, iv = node_id_to_index[u], node_id_to_index[v]
+        if pesos is None:
+            return iu, iv, comprimento, 1.0 if frente else infinito, 1.0 if tras else infinito
+        return (iu, iv, comprimento,
+                _custo_por_metro(G, iu, iv, comprimento, pesos) if frente else infinito,
+                _custo_por_metro(G, iv, iu, comprimento, pesos) if tras else infinito)
+
+    # Da origem até as pontas do trecho, no(s) sentido(s) permitido(s)
+    iu, iv, comprimento, frente, tras = taxas(seg_o)
+    origens = {}
+    if frente < infinito:
+        _com_menor(origens, iv, (comprimento - desloc_o) * frente)
+    if tras < infinito:
+        _com_menor(origens, iu, desloc_o * tras)
+
+    # Das pontas do trecho de destino até o ponto
+    iu, iv, comprimento, frente, tras = taxas(seg_d)
+    alvos = {}
+    if frente < infinito:
+        _com_menor(alvos, iu, desloc_d * frente)
+    if tras < infinito:
+        _com_menor(alvos, iv, (comprimento - desloc_d) * tras)
+
+    # Mesmo trecho: pode ir direto, sem passar por vértice
+    direto = infinito
+    if seg_o == seg_d:
+        if frente < infinito and desloc_d >= desloc_o:
+            direto = (desloc_d - desloc_o) * frente
+        if tras < infinito and desloc_o >= desloc_d:
+            direto = min(direto, (desloc_o - desloc_d) * tras)
+
+    caminho, distancia = dijkstra_multi(G, origens, alvos, index_to_node_id, profile)
+    if direto <= distancia and direto < infinito:
+        return [ponto_o, ponto_d], direto
+    if caminho is None:
+        return None, float('inf')
+    return [ponto_o] + caminho + [ponto_d], distancia
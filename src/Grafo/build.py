@@ -1,6 +1,9 @@
 import math
+import numpy as np
 import rustworkx as rx
 from collections import defaultdict
+from src.Grafo.compacto import build_compact, NodeCoords, StreetIndex, WayList
+from src.Grafo.perfis import edge_tags, store_edge_attributes
 
 # --- Função para calcular distância Haversine ---
 def haversine(lat1, lon1, lat2, lon2):
@@ -11,19 +14,202 @@ def haversine(lat1, lon1, lat2, lon2):
     a = math.sin(dphi/2)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda/2)**2
     return 2 * R * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
+# --- Índice invertido nó -> nomes de rua ---
+def build_street_index(ways):
+    """
+    Pré-computa, para cada nó presente nos ways, o nome do cruzamento
+    ("Rua A / Rua B", em ordem alfabética), permitindo consultas O(1).
+    """
+    ruas_por_no = defaultdict(set)
+    for way in ways:
+        nome = way.get("tags", {}).get("name")
+        for nid in way["nodes"]:
+            ruas_por_no[nid].add(nome)
+
+    index = {}
+    nomes_cache = {}  # reaproveita a mesma string para combinações repetidas
+    for nid, ruas in ruas_por_no.items():
+        if None in ruas:
+            # Mesmo rótulo usado por get_node_street_name para ways sem nome
+            ruas = (ruas - {None}) | {f"rua sem nome (Node {nid})"}
+            index[nid] = " / ".join(sorted(ruas))
+            continue
+        chave = frozenset(ruas)
+        if chave not in nomes_cache:
+            nomes_cache[chave] = " / ".join(sorted(ruas))
+        index[nid] = nomes_cache[chave]
+    return index
+
+# --- Versão vetorizada (NumPy) da distância Haversine ---
+def haversine_np(lat1, lon1, lat2, lon2):
+    """Mesma fórmula de haversine(), aplicada elemento a elemento em arrays (graus)"""
+    R = 6371000
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = np.radians(lon2) - np.radians(lon1)
+    a = np.sin(dphi/2)**2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda/2)**2
+    return 2 * R * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+# --- Restrições de conversão (relações type=restriction) ---
+def parse_restriction(el):
+    """
+    (from_way, via_node, to_way, obrigatória) de uma relação de restrição, ou
+    None se não for suportada. "no_*" proíbe a conversão from -> to no nó via;
+    "only_*" (obrigatória) proíbe qualquer outra saída vinda de from. Só
+    restrições com via em um nó são consideradas.
+    """
+    tags = el.get("tags", {})
+    tipo = tags.get("restriction")
+    if tags.get("type") != "restriction" or not tipo:
+        return None
+    papeis = defaultdict(list)
+    for membro in el.get("members", []):
+        papeis[membro.get("role")].append(membro)
+    de, via, para = papeis.get("from", []), papeis.get("via", []), papeis.get("to", [])
+    if (len(de) != 1 or len(via) != 1 or len(para) != 1
+            or de[0]["type"] != "way" or via[0]["type"] != "node" or para[0]["type"] != "way"):
+        return None
+    if tipo.startswith("no_"):
+        obrigatoria = False
+    elif tipo.startswith("only_"):
+        obrigatoria = True
+    else:
+        return None
+    return de[0]["ref"], via[0]["ref"], para[0]["ref"], obrigatoria
+
+# --- Segmentos entre vértices consecutivos de cada way ---
+def _iter_edges(ways, nodes, vertices):
+    """
+    Gera (n1, n2, distância, rua, oneway, way_id, classe, maxspeed) para cada
+    segmento entre vértices (classe e maxspeed como em src.Grafo.perfis).
+
+    As coordenadas de todos os segmentos são reunidas em arrays e as distâncias
+    calculadas numa única passada de haversine_np; a soma por segmento é feita
+    com np.add.reduceat.
+    """
+    segmentos = []      # (n1, n2, rua, oneway, way_id, classe, maxspeed)
+    flat = []           # índices (em coords) dos nós de todos os segmentos, em sequência
+    inicios = []        # posição em flat onde cada segmento começa
+    coord_idx = {}      # id do nó -> posição nos arrays de coordenadas
+    lats, lons = [], []
+
+    for way in ways:
+        node_ids = way["nodes"]
+        oneway = way["tags"].get("oneway", "no").lower()
+        street_name = way.get("tags", {}).get("name", "rua sem nome")
+        classe, maxspeed = edge_tags(way["tags"])
+        
+        path = []
+        for nid in node_ids:
+            path.append(nid)
+            if nid in vertices:
+                if len(path) > 1:
+                    inicios.append(len(flat))
+                    for p in path:
+                        idx = coord_idx.get(p)
+                        if idx is None:
+                            lat, lon = nodes[p]
+                            idx = coord_idx[p] = len(lats)
+                            lats.append(lat)
+                            lons.append(lon)
+                        flat.append(idx)
+                    segmentos.append((path[0], path[-1], street_name, oneway, way["id"], classe, maxspeed))
+                
+                # reinicia caminho a partir do cruzamento
+                path = [nid]
+
+    if not segmentos:
+        return
+
+    lats = np.array(lats, dtype=np.float64)
+    lons = np.array(lons, dtype=np.float64)
+    flat = np.array(flat, dtype=np.int64)
+    inicios = np.array(inicios, dtype=np.int64)
+
+    # Distância de cada par consecutivo em flat
+    a, b = flat[:-1], flat[1:]
+    pares = haversine_np(lats[a], lons[a], lats[b], lons[b])
+
+    # Pares que atravessam a fronteira entre dois segmentos não contam
+    pares[inicios[1:] - 1] = 0.0
+    distancias = np.add.reduceat(pares, inicios).tolist()
+
+    for (n1, n2, street_name, oneway, way_id, classe, maxspeed), dist in zip(segmentos, distancias):
+        yield n1, n2, dist, street_name, oneway, way_id, classe, maxspeed
+
+# --- Inserção dos vértices e arestas no PyDiGraph ---
+def _add_vertices(G, vertex_ids, nodes, node_id_to_index, index_to_node_id):
+    for vertex_id in vertex_ids:
+        if vertex_id in nodes:
+            lat, lon = nodes[vertex_id]
+            # Adicionar nó com dados originais
+            node_data = {
+                'original_id': vertex_id,
+                'lat': lat,
+                'lon': lon
+            }
+            node_index = G.add_node(node_data)
+            node_id_to_index[vertex_id] = node_index
+            index_to_node_id[node_index] = vertex_id
+
+def _add_edges(G, edges, node_id_to_index):
+    # Classe e maxspeed vão para arrays paralelos por índice de aresta
+    indices, classes, velocidades = [], [], []
+    for n1, n2, dist, street_name, oneway, way_id, classe, maxspeed in edges:
+        # Verificar se ambos os nós existem no grafo
+        if n1 in node_id_to_index and n2 in node_id_to_index:
+            n1_idx = node_id_to_index[n1]
+            n2_idx = node_id_to_index[n2]
+            
+            # Dados da aresta (way de origem permite re-segmentar a rua depois)
+            edge_data = {
+                'weight': dist,
+                'street': street_name,
+                'way': way_id
+            }
+            
+            # --- Tratamento de mão ---
+            if oneway in ["yes", "true", "1"]:
+                novas = (G.add_edge(n1_idx, n2_idx, edge_data),)
+            elif oneway == "-1":
+                novas = (G.add_edge(n2_idx, n1_idx, edge_data),)
+            else:  # assume mão dupla
+                novas = (G.add_edge(n1_idx, n2_idx, edge_data),
+                         G.add_edge(n2_idx, n1_idx, edge_data))
+            for aresta in novas:
+                indices.append(aresta)
+                classes.append(classe)
+                velocidades.append(maxspeed)
+    store_edge_attributes(G, indices, classes, velocidades)
+
 # --- Função para construir o grafo ---
-def build_graph(data):
-    G = rx.PyDiGraph()  # Grafo direcionado (equivalente ao nx.DiGraph)
+def build_graph(data, compact=False):
+    """
+    Constrói o grafo de ruas a partir da resposta da Overpass.
+
+    data pode ser o JSON completo ({"elements": [...]}) ou qualquer iterável
+    de elementos (ex.: src.OSM.streaming.stream_osm_elements), consumido em
+    uma única passada à medida que os elementos chegam.
+
+    compact=True devolve um CompactGraph (arrays NumPy + CSR) no lugar do
+    PyDiGraph, com mapeamentos de índice apoiados nesses mesmos arrays; nodes,
+    ways e o índice de ruas também vêm sobre arrays (NodeCoords, WayList e
+    StreetIndex, como em load_graph), sem um objeto Python por nó.
+    """
+    G = rx.PyDiGraph(attrs={})  # Grafo direcionado (equivalente ao nx.DiGraph)
     nodes = {}
     node_usage = defaultdict(int)
     ways = []
+    restricoes = {}  # id da relação -> (from_way, via_node, to_way, obrigatória)
     
     # Mapeamentos entre IDs originais e índices do RustworkX
     node_id_to_index = {}  # ID original -> índice no grafo
     index_to_node_id = {}  # índice no grafo -> ID original
     
+    elements = data["elements"] if isinstance(data, dict) else data
+    
     # Separar nodes e ways
-    for el in data["elements"]:
+    for el in elements:
         if el["type"] == "node":
             nodes[el["id"]] = (el["lat"], el["lon"])
         elif el["type"] == "way" and "highway" in el.get("tags", {}):
@@ -32,6 +218,10 @@ def build_graph(data):
                 ways.append(el)
                 for nid in el["nodes"]:
                     node_usage[nid] += 1
+        elif el["type"] == "relation":
+            restricao = parse_restriction(el)
+            if restricao is not None:
+                restricoes[el["id"]] = restricao
     
     # Identificar vértices (cruzamentos e extremidades de ruas com nome)
     vertices = set()
@@ -47,62 +237,151 @@ def build_graph(data):
             if node_usage[nid] > 1:
                 vertices.add(nid)
     
+    if compact:
+        G, node_id_to_index, index_to_node_id = build_compact(
+            nodes, vertices, _iter_edges(ways, nodes, vertices)
+        )
+        G.attrs["street_index"] = StreetIndex.pack(build_street_index(ways))
+        G.attrs["turn_restrictions"] = restricoes
+        return G, NodeCoords.pack(nodes), vertices, WayList.pack(ways), node_id_to_index, index_to_node_id
+
     # Adicionar todos os vértices ao grafo RustworkX
-    for vertex_id in vertices:
-        if vertex_id in nodes:
-            lat, lon = nodes[vertex_id]
-            # Adicionar nó com dados originais
-            node_data = {
-                'original_id': vertex_id,
-                'lat': lat,
-                'lon': lon
-            }
-            node_index = G.add_node(node_data)
-            node_id_to_index[vertex_id] = node_index
-            index_to_node_id[node_index] = vertex_id
+    _add_vertices(G, vertices, nodes, node_id_to_index, index_to_node_id)
     
     # Criar arestas (segmentos entre vértices)
-    for way in ways:
-        node_ids = way["nodes"]
-        oneway = way["tags"].get("oneway", "no").lower()
-        street_name = way.get("tags", {}).get("name", "rua sem nome")
-        
-        path = []
-        for nid in node_ids:
-            path.append(nid)
-            if nid in vertices:
-                if len(path) > 1:
-                    # calcular distância acumulada
-                    dist = 0
-                    for i in range(len(path)-1):
-                        lat1, lon1 = nodes[path[i]]
-                        lat2, lon2 = nodes[path[i+1]]
-                        dist += haversine(lat1, lon1, lat2, lon2)
-                    
-                    n1, n2 = path[0], path[-1]
-                    
-                    # Verificar se ambos os nós existem no grafo
-                    if n1 in node_id_to_index and n2 in node_id_to_index:
-                        n1_idx = node_id_to_index[n1]
-                        n2_idx = node_id_to_index[n2]
-                        
-                        # Dados da aresta
-                        edge_data = {
-                            'weight': dist,
-                            'street': street_name
-                        }
-                        
-                        # --- Tratamento de mão ---
-                        if oneway in ["yes", "true", "1"]:
-                            G.add_edge(n1_idx, n2_idx, edge_data)
-                        elif oneway == "-1":
-                            G.add_edge(n2_idx, n1_idx, edge_data)
-                        else:  # assume mão dupla
-                            G.add_edge(n1_idx, n2_idx, edge_data)
-                            G.add_edge(n2_idx, n1_idx, edge_data)
-                
-                # reinicia caminho a partir do cruzamento
-                path = [nid]
+    _add_edges(G, _iter_edges(ways, nodes, vertices), node_id_to_index)
     
+    # Metadados do grafo: índice nó -> nomes de rua (consultas O(1))
+    G.attrs["street_index"] = build_street_index(ways)
+    # Restrições de conversão (só presentes se a consulta incluiu relações)
+    G.attrs["turn_restrictions"] = restricoes
+
     # Retornar também os mapeamentos para facilitar uso posterior
     return G, nodes, vertices, ways, node_id_to_index, index_to_node_id
+
+# Metadados calculados a partir do grafo (hierarquias, índices, pesos por
+# perfil, identificadores de versão); valem só para o grafo que os gerou
+DERIVED_ATTRS = ("ch", "profile_ch", "profile_weights", "profile_scale", "spatial_index",
+                 "edge_index", "source_checksum", "fingerprint")
+
+def drop_derived_attrs(G):
+    """Descarta de G.attrs o que foi derivado do grafo antes de uma alteração"""
+    for chave in DERIVED_ATTRS:
+        G.attrs.pop(chave, None)
+
+# --- Índices auxiliares para atualização incremental ---
+def _way_index(G, ways):
+    """
+    (way id -> ways, nó -> ids dos ways que passam por ele), guardados em
+    G.attrs na primeira extensão. O segundo repete o id a cada ocorrência do
+    nó, para que len() seja o mesmo node_usage de build_graph.
+    """
+    if "ways_by_id" not in G.attrs:
+        ways_by_id = defaultdict(list)
+        node_ways = defaultdict(list)
+        for way in ways:
+            ways_by_id[way["id"]].append(way)
+            for nid in way["nodes"]:
+                node_ways[nid].append(way["id"])
+        G.attrs["ways_by_id"] = ways_by_id
+        G.attrs["node_ways"] = node_ways
+    return G.attrs["ways_by_id"], G.attrs["node_ways"]
+
+# --- Extensão incremental do grafo ---
+def extend_graph(graph_tuple, data):
+    """
+    Acrescenta ao grafo de build_graph os elementos de uma nova área (ex.: a
+    diferença entre a bbox nova e a já carregada), alterando-o no lugar.
+
+    Nós e ways já presentes são ignorados. Ways antigos que ganham um novo
+    cruzamento (ou cujo vértice só agora tem coordenadas) têm as arestas
+    removidas e re-segmentadas, de modo que o resultado tem os mesmos vértices,
+    arestas e índice de ruas de um build_graph sobre todos os elementos (os
+    índices internos dos nós podem diferir). O custo é proporcional à área nova.
+
+    Só vale para o PyDiGraph não simplificado; devolve a mesma tupla recebida.
+    """
+    G, nodes, vertices, ways, node_id_to_index, index_to_node_id = graph_tuple
+    if not isinstance(G, rx.PyDiGraph):
+        raise TypeError("extend_graph requer o grafo RustworkX (build_graph com compact=False)")
+    if G.attrs.get("simplified"):
+        raise ValueError("extend_graph requer o grafo sem simplificação (simplify_graph)")
+
+    ways_by_id, node_ways = _way_index(G, ways)
+
+    novos_nos = []
+    novos_ways = []
+    restricoes = G.attrs.setdefault("turn_restrictions", {})
+    elements = data["elements"] if isinstance(data, dict) else data
+    for el in elements:
+        if el["type"] == "relation":
+            restricao = parse_restriction(el)
+            if restricao is not None:
+                restricoes[el["id"]] = restricao
+        elif el["type"] == "node":
+            if el["id"] not in nodes:
+                nodes[el["id"]] = (el["lat"], el["lon"])
+                novos_nos.append(el["id"])
+        elif el["type"] == "way" and "highway" in el.get("tags", {}):
+            if "name" not in el["tags"]:
+                continue
+            # Ways que atravessam a borda já vieram na carga anterior
+            if any(w.get("part") == el.get("part") for w in ways_by_id.get(el["id"], ())):
+                continue
+            ways.append(el)
+            novos_ways.append(el)
+            ways_by_id[el["id"]].append(el)
+            for nid in el["nodes"]:
+                node_ways[nid].append(el["id"])
+
+    # Vértices que surgem com os novos ways (mesma regra de build_graph)
+    novos_vertices = set()
+    for way in novos_ways:
+        node_ids = way["nodes"]
+        for k, nid in enumerate(node_ids):
+            extremidade = len(node_ids) > 1 and (k == 0 or k == len(node_ids) - 1)
+            if nid not in vertices and (extremidade or len(node_ways[nid]) > 1):
+                novos_vertices.add(nid)
+    vertices |= novos_vertices
+
+    # Vértices antigos que só agora têm coordenadas também entram no grafo
+    inseridos = [nid for nid in novos_vertices if nid not in node_id_to_index]
+    inseridos += [nid for nid in novos_nos if nid in vertices and nid not in node_id_to_index
+                  and nid not in novos_vertices]
+    _add_vertices(G, inseridos, nodes, node_id_to_index, index_to_node_id)
+
+    # Ways antigos afetados: passam por um vértice novo ou recém-inserido
+    ids_novos = {way["id"] for way in novos_ways}
+    afetados = set()
+    for nid in novos_vertices.union(inseridos):
+        afetados.update(wid for wid in node_ways.get(nid, ()) if wid not in ids_novos)
+
+    # Remove as arestas dos ways afetados (saem sempre de um vértice do próprio way)
+    remover = set()
+    for wid in afetados:
+        for way in ways_by_id[wid]:
+            for nid in way["nodes"]:
+                idx = node_id_to_index.get(nid)
+                if idx is None:
+                    continue
+                for e in G.incident_edges(idx):
+                    if G.get_edge_data_by_index(e).get('way') == wid:
+                        remover.add(e)
+    for e in remover:
+        G.remove_edge_from_index(e)
+
+    refazer = novos_ways + [way for wid in afetados for way in ways_by_id[wid]]
+    _add_edges(G, _iter_edges(refazer, nodes, vertices), node_id_to_index)
+
+    # Rótulos de cruzamento dos nós tocados pelos novos ways
+    tocados = {nid for way in novos_ways for nid in way["nodes"]}
+    envolvidos = {wid for nid in tocados for wid in node_ways[nid]}
+    rotulos = build_street_index([way for wid in envolvidos for way in ways_by_id[wid]])
+    street_index = G.attrs.setdefault("street_index", {})
+    for nid in tocados:
+        street_index[nid] = rotulos[nid]
+
+    # Estruturas derivadas do grafo antigo deixam de valer
+    drop_derived_attrs(G)
+
+    return graph_tuple
@@ -0,0 +1,464 @@
+import json
+from abc import abstractmethod
+from collections.abc import MutableMapping, Sequence
+import numpy as np
+
+
+class NodeIdIndex:
+    """
+    Mapeamento ID original -> índice sobre um array ordenado de IDs.
+
+    Substitui o dicionário node_id_to_index: a busca é binária (searchsorted)
+    e não há um objeto Python por vértice.
+    """
+
+    def __init__(self, original_ids):
+        self.original_ids = original_ids
+
+    def get(self, node_id, default=None):
+        ids = self.original_ids
+        pos = int(np.searchsorted(ids, node_id))
+        if pos < len(ids) and ids[pos] == node_id:
+            return pos
+        return default
+
+    def __getitem__(self, node_id):
+        pos = self.get(node_id)
+        if pos is None:
+            raise KeyError(node_id)
+        return pos
+
+    def __contains__(self, node_id):
+        return self.get(node_id) is not None
+
+    def __len__(self):
+        return len(self.original_ids)
+
+    def __iter__(self):
+        return (int(nid) for nid in self.original_ids)
+
+
+class IndexToNodeId:
+    """Mapeamento índice -> ID original (devolve int Python, não np.int64)"""
+
+    def __init__(self, original_ids):
+        self.original_ids = original_ids
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            raise KeyError(idx)
+        try:
+            return int(self.original_ids[idx])
+        except IndexError:
+            raise KeyError(idx) from None
+
+    def get(self, idx, default=None):
+        try:
+            return self[idx]
+        except KeyError:
+            return default
+
+    def __contains__(self, idx):
+        return 0 <= idx < len(self.original_ids)
+
+    def __len__(self):
+        return len(self.original_ids)
+
+
+class _ArrayMapping(MutableMapping):
+    """
+    Base dos mapeamentos ID -> valor sobre um array ordenado de IDs (busca
+    binária, sem um objeto Python por entrada). Entradas acrescentadas depois
+    (ex.: extend_graph) ficam num dicionário à parte e têm precedência.
+    """
+
+    def __init__(self, ids):
+        self.ids = ids
+        self._extras = {}
+
+    def _posicao(self, chave):
+        ids = self.ids
+        pos = int(np.searchsorted(ids, chave))
+        if pos < len(ids) and ids[pos] == chave:
+            return pos
+        return None
+
+    @abstractmethod
+    def _valor(self, pos):
+        """Valor guardado na posição pos dos arrays"""
+
+    def get(self, chave, default=None):
+        if chave in self._extras:
+            return self._extras[chave]
+        pos = self._posicao(chave)
+        return default if pos is None else self._valor(pos)
+
+    def __getitem__(self, chave):
+        valor = self.get(chave, _AUSENTE)
+        if valor is _AUSENTE:
+            raise KeyError(chave)
+        return valor
+
+    def __contains__(self, chave):
+        return chave in self._extras or self._posicao(chave) is not None
+
+    def __setitem__(self, chave, valor):
+        self._extras[chave] = valor
+
+    def __delitem__(self, chave):
+        raise TypeError(f"{type(self).__name__} não permite remover entradas")
+
+    def __iter__(self):
+        for chave in self.ids.tolist():
+            if chave not in self._extras:
+                yield chave
+        yield from self._extras
+
+    def __len__(self):
+        return len(self.ids) + sum(1 for chave in self._extras if self._posicao(chave) is None)
+
+
+_AUSENTE = object()
+
+
+def _strings_to_arrays(strings):
+    """Tabela de strings -> (bytes UTF-8 concatenados, offsets)"""
+    codificadas = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(codificadas) + 1, dtype=np.int64)
+    np.cumsum([len(c) for c in codificadas], out=offsets[1:])
+    blob = np.frombuffer(b"".join(codificadas), dtype=np.uint8)
+    return blob, offsets
+
+
+class NodeCoords(_ArrayMapping):
+    """
+    Substitui o dicionário nodes (ID -> (lat, lon)) por dois arrays: IDs
+    ordenados e coordenadas N x 2.
+    """
+
+    def __init__(self, ids, coords):
+        super().__init__(ids)
+        self.coords = coords
+
+    @classmethod
+    def pack(cls, nodes):
+        """NodeCoords com o conteúdo de nodes (o próprio, se já for um sem extras)"""
+        if isinstance(nodes, cls) and not nodes._extras:
+            return nodes
+        ids = np.fromiter(nodes.keys(), dtype=np.int64, count=len(nodes))
+        coords = np.array(list(nodes.values()), dtype=np.float64).reshape(-1, 2)
+        ordem = np.argsort(ids, kind="stable")
+        return cls(ids[ordem], coords[ordem])
+
+    def _valor(self, pos):
+        return tuple(self.coords[pos].tolist())
+
+
+class StreetIndex(_ArrayMapping):
+    """
+    Índice nó -> nome do cruzamento (como build_street_index) sobre arrays:
+    IDs ordenados, o rótulo de cada um (posição na tabela) e a tabela de
+    rótulos em UTF-8 concatenado. O texto só é decodificado na consulta.
+    """
+
+    def __init__(self, ids, rotulos, blob, offsets):
+        super().__init__(ids)
+        self.rotulos = rotulos
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def pack(cls, indice):
+        """StreetIndex com o conteúdo de indice (o próprio, se já for um sem extras)"""
+        if isinstance(indice, cls) and not indice._extras:
+            return indice
+        itens = sorted(indice.items())
+        tabela, rotulo_ids = [], {}
+        for _, rotulo in itens:
+            if rotulo not in rotulo_ids:
+                rotulo_ids[rotulo] = len(tabela)
+                tabela.append(rotulo)
+        blob, offsets = _strings_to_arrays(tabela)
+        return cls(np.array([nid for nid, _ in itens], dtype=np.int64),
+                   np.array([rotulo_ids[rotulo] for _, rotulo in itens], dtype=np.int32), blob, offsets)
+
+    def _valor(self, pos):
+        k = int(self.rotulos[pos])
+        return bytes(self.blob[int(self.offsets[k]):int(self.offsets[k + 1])]).decode("utf-8")
+
+
+class WayList(Sequence):
+    """
+    Substitui a lista de ways por arrays: ids, nós em CSR, tags em JSON
+    (UTF-8 concatenado) e "part" (0 = sem part). Cada way vira dict no
+    primeiro acesso e fica em cache; append (extend_graph) guarda ways novos
+    já como dict.
+    """
+
+    def __init__(self, ids, offsets, refs, tags_blob, tags_offsets, parts=None):
+        self.ids = ids
+        self.parts = parts
+        self.offsets = offsets
+        self.refs = refs
+        self.tags_blob = tags_blob
+        self.tags_offsets = tags_offsets
+        self._cache = [None] * len(ids)
+        self._extras = []
+
+    @classmethod
+    def pack(cls, ways):
+        """WayList com os ways dados (o próprio, se já for um sem extras)"""
+        if isinstance(ways, cls) and not ways._extras:
+            return ways
+        offsets = np.zeros(len(ways) + 1, dtype=np.int64)
+        np.cumsum([len(w["nodes"]) for w in ways], out=offsets[1:])
+        tags_blob, tags_offsets = _strings_to_arrays(
+            [json.dumps(w.get("tags", {}), separators=(",", ":")) for w in ways]
+        )
+        return cls(np.array([w["id"] for w in ways], dtype=np.int64), offsets,
+                   np.array([nid for w in ways for nid in w["nodes"]], dtype=np.int64),
+                   tags_blob, tags_offsets, np.array([w.get("part", 0) for w in ways], dtype=np.int32))
+
+    def _montar(self, k):
+        inicio, fim = int(self.offsets[k]), int(self.offsets[k + 1])
+        t0, t1 = int(self.tags_offsets[k]), int(self.tags_offsets[k + 1])
+        way = {"type": "way", "id": int(self.ids[k]), "nodes": self.refs[inicio:fim].tolist(),
+               "tags": json.loads(bytes(self.tags_blob[t0:t1]).decode("utf-8"))}
+        if self.parts is not None and self.parts[k]:
+            way["part"] = int(self.parts[k])
+        self._cache[k] = way
+        return way
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [self[i] for i in range(*k.indices(len(self)))]
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError(k)
+        if k >= len(self._cache):
+            return self._extras[k - len(self._cache)]
+        way = self._cache[k]
+        return way if way is not None else self._montar(k)
+
+    def __len__(self):
+        return len(self._cache) + len(self._extras)
+
+    def __eq__(self, outra):
+        if not isinstance(outra, (list, Sequence)):
+            return NotImplemented
+        return len(self) == len(outra) and all(a == b for a, b in zip(self, outra))
+
+    def append(self, way):
+        self._extras.append(way)
+
+
+class CompactGraph:
+    """
+    Grafo direcionado em formato CSR (Compressed Sparse Row).
+
+    Vértice i: original_ids[i], lat[i], lon[i].
+    Arestas de saída de i: posições offsets[i]:offsets[i+1] de targets,
+    weights e street_ids. Os nomes de rua ficam internados em street_table.
+    highway (classe da via, ver src.Grafo.perfis) e maxspeed (km/h, 0 =
+    desconhecida) são opcionais e paralelos a targets.
+    """
+
+    def __init__(self, original_ids, lat, lon, offsets, targets, weights, street_ids, street_table,
+                 highway=None, maxspeed=None):
+        self.original_ids = original_ids
+        self.lat = lat
+        self.lon = lon
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.street_ids = street_ids
+        self.street_table = street_table
+        self.highway = highway
+        self.maxspeed = maxspeed
+        self.attrs = {}
+        self._reverse = None
+
+    def num_nodes(self):
+        return len(self.original_ids)
+
+    def num_edges(self):
+        return len(self.targets)
+
+    def node_indices(self):
+        return range(self.num_nodes())
+
+    def edge_indices(self):
+        return range(self.num_edges())
+
+    def out_edge_range(self, idx):
+        return int(self.offsets[idx]), int(self.offsets[idx + 1])
+
+    def successor_indices(self, idx):
+        inicio, fim = self.out_edge_range(idx)
+        return self.targets[inicio:fim].tolist()
+
+    def out_edges(self, idx):
+        """Mesmo formato de PyDiGraph.out_edges: (origem, destino, dados)"""
+        inicio, fim = self.out_edge_range(idx)
+        return [
+            (idx, int(self.targets[e]), {
+                'weight': float(self.weights[e]),
+                'street': self.street_table[self.street_ids[e]]
+            })
+            for e in range(inicio, fim)
+        ]
+
+    def reverse_csr(self, weights=None):
+        """
+        CSR das arestas de entrada (offsets, sources, weights), calculado sob
+        demanda e guardado para buscas reversas (ex.: Dijkstra bidirecional).
+        weights (paralelo a targets, ex.: pesos de um perfil) substitui os
+        pesos do grafo, reordenado com a mesma permutação.
+        """
+        if self._reverse is None:
+            n = self.num_nodes()
+            sources = np.repeat(np.arange(n, dtype=np.int32), np.diff(self.offsets))
+            ordem = np.argsort(self.targets, kind="stable")
+            contagem = np.bincount(self.targets, minlength=n)
+            offsets = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(contagem, out=offsets[1:])
+            self._reverse = (offsets, sources[ordem], self.weights[ordem], ordem)
+        offsets, sources, pesos, ordem = self._reverse
+        if weights is not None:
+            pesos = weights[ordem]
+        return offsets, sources, pesos
+
+    def nbytes(self):
+        arrays = (self.original_ids, self.lat, self.lon, self.offsets,
+                  self.targets, self.weights, self.street_ids, self.highway, self.maxspeed)
+        return sum(a.nbytes for a in arrays if a is not None)
+
+
+# Chaves de G.attrs alinhadas com os índices de aresta do PyDiGraph
+_ATTRS_POR_ARESTA = ("edge_highway", "edge_maxspeed", "profile_weights", "profile_scale", "profile_ch")
+
+
+def _csr(num_nodes, sources, *paralelos):
+    """Ordena as arestas (e os arrays paralelos) por origem (estável) e calcula os offsets"""
+    ordem = np.argsort(sources, kind="stable")
+    contagem = np.bincount(sources, minlength=num_nodes)
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(contagem, out=offsets[1:])
+    return (offsets, *(a[ordem] for a in paralelos))
+
+
+def build_compact(nodes, vertices, edges):
+    """
+    Monta um CompactGraph a partir dos vértices e de um iterável de arestas
+    (n1, n2, distância, rua, oneway, way_id, classe, maxspeed), como produzido
+    em build_graph.
+
+    Retorna (grafo, node_id_to_index, index_to_node_id).
+    """
+    original_ids = np.array(sorted(v for v in vertices if v in nodes), dtype=np.int64)
+    lat = np.array([nodes[v][0] for v in original_ids.tolist()], dtype=np.float64)
+    lon = np.array([nodes[v][1] for v in original_ids.tolist()], dtype=np.float64)
+    node_id_to_index = NodeIdIndex(original_ids)
+
+    street_table = []
+    street_ids_by_name = {}
+    sources, targets, weights, street_ids = [], [], [], []
+    classes, velocidades = [], []
+
+    for n1, n2, dist, street_name, oneway, _, classe, maxspeed in edges:
+        i1 = node_id_to_index.get(n1)
+        i2 = node_id_to_index.get(n2)
+        if i1 is None or i2 is None:
+            continue
+
+        sid = street_ids_by_name.get(street_name)
+        if sid is None:
+            sid = len(street_table)
+            street_ids_by_name[street_name] = sid
+            street_table.append(street_name)
+
+        # --- Tratamento de mão ---
+        if oneway in ["yes", "true", "1"]:
+            pares = ((i1, i2),)
+        elif oneway == "-1":
+            pares = ((i2, i1),)
+        else:  # assume mão dupla
+            pares = ((i1, i2), (i2, i1))
+
+        for origem, destino in pares:
+            sources.append(origem)
+            targets.append(destino)
+            weights.append(dist)
+            street_ids.append(sid)
+            classes.append(classe)
+            velocidades.append(maxspeed)
+
+    offsets, targets, weights, street_ids, classes, velocidades = _csr(
+        len(original_ids),
+        np.array(sources, dtype=np.int64),
+        np.array(targets, dtype=np.int32),
+        np.array(weights, dtype=np.float64),
+        np.array(street_ids, dtype=np.int32),
+        np.array(classes, dtype=np.uint8),
+        np.array(velocidades, dtype=np.float32),
+    )
+    G = CompactGraph(original_ids, lat, lon, offsets, targets, weights, street_ids, street_table,
+                     classes, velocidades)
+    return G, node_id_to_index, IndexToNodeId(original_ids)
+
+
+def to_compact(G, index_to_node_id):
+    """
+    Converte um PyDiGraph de build_graph em CompactGraph.
+
+    Os índices são renumerados pela ordem dos IDs originais; use os
+    mapeamentos retornados com o grafo compacto.
+    """
+    original_ids = np.array(sorted(index_to_node_id[i] for i in G.node_indices()), dtype=np.int64)
+    node_id_to_index = NodeIdIndex(original_ids)
+    novo_indice = {i: node_id_to_index[index_to_node_id[i]] for i in G.node_indices()}
+
+    lat = np.empty(len(original_ids), dtype=np.float64)
+    lon = np.empty(len(original_ids), dtype=np.float64)
+    for i in G.node_indices():
+        dados = G[i]
+        lat[novo_indice[i]] = dados['lat']
+        lon[novo_indice[i]] = dados['lon']
+
+    street_table = []
+    street_ids_by_name = {}
+    m = G.num_edges()
+    sources = np.empty(m, dtype=np.int64)
+    targets = np.empty(m, dtype=np.int32)
+    weights = np.empty(m, dtype=np.float64)
+    street_ids = np.empty(m, dtype=np.int32)
+    arestas = np.empty(m, dtype=np.int64)
+    for k, (aresta, (origem, destino, dados)) in enumerate(G.edge_index_map().items()):
+        nome = dados.get('street', 'rua sem nome')
+        sid = street_ids_by_name.get(nome)
+        if sid is None:
+            sid = len(street_table)
+            street_ids_by_name[nome] = sid
+            street_table.append(nome)
+        sources[k] = novo_indice[origem]
+        targets[k] = novo_indice[destino]
+        weights[k] = dados['weight']
+        street_ids[k] = sid
+        arestas[k] = aresta
+
+    attrs = G.attrs if isinstance(getattr(G, "attrs", None), dict) else {}
+    # Classe/maxspeed ficam em arrays por índice de aresta (src.Grafo.perfis)
+    extras = ()
+    if attrs.get("edge_highway") is not None:
+        extras = (attrs["edge_highway"][arestas], attrs["edge_maxspeed"][arestas])
+
+    offsets, targets, weights, street_ids, *extras = _csr(
+        len(original_ids), sources, targets, weights, street_ids, *extras
+    )
+    compacto = CompactGraph(original_ids, lat, lon, offsets, targets, weights, street_ids, street_table,
+                            *extras)
+    # Metadados indexados por aresta do PyDiGraph não valem no CSR
+    compacto.attrs.update((chave, valor) for chave, valor in attrs.items()
+                          if chave not in _ATTRS_POR_ARESTA)
+    return compacto, node_id_to_index, IndexToNodeId(original_ids)
@@ -0,0 +1,384 @@
+import heapq
+import math
+import numpy as np
+from src.Grafo.compacto import CompactGraph
+from src.Grafo.build import haversine_np
+
+R_TERRA = 6371000          # mesmo raio usado em build.haversine
+PONTOS_POR_CELULA = 2      # ocupação média alvo quando cell_size não é dado
+
+
+def _cos_lat_media(lats):
+    return math.cos(math.radians(sum(lats) / len(lats))) if lats else 1.0
+
+
+def _tamanho_celula(xs, ys, quantidade):
+    """Lado da célula para ~PONTOS_POR_CELULA itens por célula ocupada"""
+    if quantidade <= 1:
+        return 100.0
+    area = max(max(xs) - min(xs), 1.0) * max(max(ys) - min(ys), 1.0)
+    return math.sqrt(area * PONTOS_POR_CELULA / quantidade)
+
+
+class _Grade:
+    """
+    Grade uniforme de buckets num plano equiretangular local (metros, em
+    torno da latitude média), suficiente na escala de uma cidade. As consultas
+    percorrem anéis de células a partir do ponto até que nenhum anel mais
+    distante possa conter algo mais próximo.
+    """
+
+    def _iniciar(self, cos_lat0, cell_size):
+        self._cos_lat0 = cos_lat0
+        self.cell_size = float(cell_size)
+        self._celulas = {}
+
+    def _fechar(self):
+        if self._celulas:
+            cxs = [c[0] for c in self._celulas]
+            cys = [c[1] for c in self._celulas]
+            self._limites = (min(cxs), min(cys), max(cxs), max(cys))
+
+    def _projetar(self, lat, lon):
+        return (math.radians(lon) * self._cos_lat0 * R_TERRA,
+                math.radians(lat) * R_TERRA)
+
+    def _celula(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def _anel(self, cx, cy, r):
+        """
+        Células na borda do quadrado de raio r (em células) centrado em
+        (cx, cy), restritas à área ocupada da grade.
+        """
+        celulas = self._celulas
+        if r == 0:
+            bucket = celulas.get((cx, cy))
+            if bucket:
+                yield bucket
+            return
+        xmin, ymin, xmax, ymax = self._limites
+        x0, x1 = max(cx - r, xmin), min(cx + r, xmax)
+        y0, y1 = max(cy - r + 1, ymin), min(cy + r - 1, ymax)
+        for y in (cy - r, cy + r):
+            if ymin <= y <= ymax:
+                for x in range(x0, x1 + 1):
+                    bucket = celulas.get((x, y))
+                    if bucket:
+                        yield bucket
+        for x in (cx - r, cx + r):
+            if xmin <= x <= xmax:
+                for y in range(y0, y1 + 1):
+                    bucket = celulas.get((x, y))
+                    if bucket:
+                        yield bucket
+
+    def _aneis(self, cx, cy):
+        """Raios dos anéis que podem conter itens (do primeiro que toca a grade ao último)"""
+        xmin, ymin, xmax, ymax = self._limites
+        primeiro = max(xmin - cx, cx - xmax, ymin - cy, cy - ymax, 0)
+        ultimo = max(cx - xmin, xmax - cx, cy - ymin, ymax - cy, 0)
+        return range(primeiro, ultimo + 1)
+
+    def _folga(self, x, y, cx, cy, r):
+        """Distância mínima do ponto a qualquer célula fora do quadrado de raio r"""
+        cs = self.cell_size
+        return min(x - (cx - r) * cs, (cx + r + 1) * cs - x,
+                   y - (cy - r) * cs, (cy + r + 1) * cs - y)
+
+
+class SpatialIndex(_Grade):
+    """
+    Índice espacial em grade (buckets) sobre os vértices do grafo.
+
+    Cada célula de cell_size metros (por padrão, ajustada à densidade dos
+    vértices) guarda a lista de (x, y, id) dos vértices nela.
+
+    Distâncias devolvidas em metros.
+    """
+
+    def __init__(self, ids, lats, lons, cell_size=None):
+        lats = list(lats)
+        self._iniciar(_cos_lat_media(lats), 1.0)
+        pontos = [(*self._projetar(lat, lon), nid) for nid, lat, lon in zip(ids, lats, lons)]
+        self._tamanho = len(pontos)
+        if cell_size is None:
+            cell_size = _tamanho_celula([p[0] for p in pontos], [p[1] for p in pontos], len(pontos))
+        self.cell_size = float(cell_size)
+
+        for ponto in pontos:
+            self._celulas.setdefault(self._celula(ponto[0], ponto[1]), []).append(ponto)
+        self._fechar()
+
+    @classmethod
+    def from_graph(cls, G, index_to_node_id, cell_size=None):
+        """Índice sobre os nós de um PyDiGraph ou CompactGraph de build_graph"""
+        if isinstance(G, CompactGraph):
+            return cls(G.original_ids.tolist(), G.lat.tolist(), G.lon.tolist(), cell_size)
+        indices = list(G.node_indices())
+        return cls(
+            [index_to_node_id[i] for i in indices],
+            [G[i]['lat'] for i in indices],
+            [G[i]['lon'] for i in indices],
+            cell_size,
+        )
+
+    def __len__(self):
+        return self._tamanho
+
+    def k_nearest(self, lat, lon, k):
+        """Os k vértices mais próximos: lista de (node_id, distância), do mais próximo ao mais distante"""
+        if not self._tamanho or k <= 0:
+            return []
+        x, y = self._projetar(lat, lon)
+        cx, cy = self._celula(x, y)
+
+        melhores = []  # heap de (-dist², id): a raiz é o pior dos k melhores
+        for r in self._aneis(cx, cy):
+            for bucket in self._anel(cx, cy, r):
+                for px, py, nid in bucket:
+                    d2 = (px - x) ** 2 + (py - y) ** 2
+                    if len(melhores) < k:
+                        heapq.heappush(melhores, (-d2, nid))
+                    elif d2 < -melhores[0][0]:
+                        heapq.heapreplace(melhores, (-d2, nid))
+            # Nenhum ponto fora dos anéis já vistos pode estar mais perto
+            if len(melhores) == k and -melhores[0][0] <= self._folga(x, y, cx, cy, r) ** 2:
+                break
+
+        return [(nid, math.sqrt(-d2)) for d2, nid in sorted(melhores, reverse=True)]
+
+    def nearest(self, lat, lon):
+        """(node_id, distância) do vértice mais próximo, ou None se o índice estiver vazio"""
+        if not self._tamanho:
+            return None
+        x, y = self._projetar(lat, lon)
+        cx, cy = self._celula(x, y)
+
+        melhor_d2, melhor = math.inf, None
+        for r in self._aneis(cx, cy):
+            for bucket in self._anel(cx, cy, r):
+                for px, py, nid in bucket:
+                    d2 = (px - x) ** 2 + (py - y) ** 2
+                    if d2 < melhor_d2:
+                        melhor_d2, melhor = d2, nid
+            if melhor_d2 <= self._folga(x, y, cx, cy, r) ** 2:
+                break
+        return melhor, math.sqrt(melhor_d2)
+
+    def within_radius(self, lat, lon, raio):
+        """Vértices a até raio metros: lista de (node_id, distância), do mais próximo ao mais distante"""
+        if not self._tamanho:
+            return []
+        x, y = self._projetar(lat, lon)
+        cx, cy = self._celula(x, y)
+        aneis = self._aneis(cx, cy)
+        aneis = range(aneis.start, min(aneis.stop, int(math.ceil(raio / self.cell_size)) + 1))
+        raio2 = raio * raio
+
+        encontrados = []
+        for r in aneis:
+            for bucket in self._anel(cx, cy, r):
+                for px, py, nid in bucket:
+                    d2 = (px - x) ** 2 + (py - y) ** 2
+                    if d2 <= raio2:
+                        encontrados.append((d2, nid))
+        encontrados.sort()
+        return [(nid, math.sqrt(d2)) for d2, nid in encontrados]
+
+
+class EdgeIndex(_Grade):
+    """
+    Índice espacial das ruas do grafo pela geometria original dos ways.
+
+    build_graph guarda só a distância total entre dois vértices; aqui cada
+    trecho entre vértices (segmento) recupera a polilinha de nós OSM a partir
+    de ways/nodes, e cada pedaço da polilinha é registrado em todas as células
+    que sua caixa envolvente toca. nearest projeta um ponto no pedaço mais
+    próximo e devolve o deslocamento (metros, ao longo da rua) a partir do
+    início do segmento, medido com a mesma Haversine dos pesos das arestas.
+
+    segmentos[s] = (u, v, sentidos, comprimento), com sentidos = (u->v, v->u)
+    indicando em que direções o trecho existe no grafo.
+    """
+
+    def __init__(self, ways, nodes, vertices, node_id_to_index, cell_size=None):
+        self.segmentos = []
+        self._geometria = []   # por segmento: (lats, lons, acumulado)
+        self._vizinhos = None  # (u, v) -> [(comprimento, ponto após u)], montado em next_point
+        pedacos = []           # (segmento, j): pedaço entre os pontos j e j+1
+        trechos = []           # por segmento: (u, v, sentidos, lats, lons)
+        lats_usadas = []       # pontos de todos os segmentos, em sequência
+        lons_usadas = []
+
+        for way in ways:
+            oneway = way["tags"].get("oneway", "no").lower()
+            if oneway in ["yes", "true", "1"]:
+                sentidos = (True, False)
+            elif oneway == "-1":
+                sentidos = (False, True)
+            else:
+                sentidos = (True, True)
+
+            path = []
+            for nid in way["nodes"]:
+                path.append(nid)
+                if nid not in vertices:
+                    continue
+                if (len(path) > 1 and path[0] in node_id_to_index and nid in node_id_to_index
+                        and all(p in nodes for p in path)):
+                    lats = [nodes[p][0] for p in path]
+                    lons = [nodes[p][1] for p in path]
+                    pedacos.extend((len(trechos), j) for j in range(len(path) - 1))
+                    trechos.append((path[0], nid, sentidos, lats, lons))
+                    lats_usadas.extend(lats)
+                    lons_usadas.extend(lons)
+                path = [nid]
+
+        self._iniciar(_cos_lat_media(lats_usadas), 1.0)
+        lat_arr = np.array(lats_usadas, dtype=np.float64)
+        lon_arr = np.array(lons_usadas, dtype=np.float64)
+        xs = np.radians(lon_arr) * self._cos_lat0 * R_TERRA
+        ys = np.radians(lat_arr) * R_TERRA
+
+        # Distâncias de todos os pontos consecutivos numa passada de
+        # haversine_np (a mesma fórmula dos pesos das arestas); o acumulado de
+        # cada segmento é a soma corrida a partir do seu primeiro ponto
+        corrida = np.zeros(len(lat_arr))
+        if len(lat_arr) > 1:
+            np.cumsum(haversine_np(lat_arr[:-1], lon_arr[:-1], lat_arr[1:], lon_arr[1:]), out=corrida[1:])
+        self._xy = []
+        inicios = []           # posição do primeiro ponto de cada segmento
+        inicio = 0
+        for u, v, sentidos, lats, lons in trechos:
+            fim = inicio + len(lats)
+            acumulado = (corrida[inicio:fim] - corrida[inicio]).tolist()
+            self.segmentos.append((u, v, sentidos, acumulado[-1]))
+            self._geometria.append((lats, lons, acumulado))
+            self._xy.append(list(zip(xs[inicio:fim].tolist(), ys[inicio:fim].tolist())))
+            inicios.append(inicio)
+            inicio = fim
+
+        if cell_size is None:
+            cell_size = _tamanho_celula(xs.tolist(), ys.tolist(), len(pedacos))
+        self.cell_size = float(cell_size)
+
+        # Caixa envolvente (em células) de cada pedaço, calculada em arrays
+        posicoes = np.array([inicios[seg] + j for seg, j in pedacos], dtype=np.int64)
+        x1, x2, y1, y2 = xs[posicoes], xs[posicoes + 1], ys[posicoes], ys[posicoes + 1]
+        caixas = zip(np.floor_divide(np.minimum(x1, x2), self.cell_size).astype(np.int64).tolist(),
+                     np.floor_divide(np.minimum(y1, y2), self.cell_size).astype(np.int64).tolist(),
+                     np.floor_divide(np.maximum(x1, x2), self.cell_size).astype(np.int64).tolist(),
+                     np.floor_divide(np.maximum(y1, y2), self.cell_size).astype(np.int64).tolist())
+        celulas = self._celulas
+        for pedaco, (cx0, cy0, cx1, cy1) in zip(pedacos, caixas):
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    celulas.setdefault((cx, cy), []).append(pedaco)
+        self._fechar()
+
+    def __len__(self):
+        return len(self.segmentos)
+
+    def nearest(self, lat, lon):
+        """
+        Projeção do ponto na rua mais próxima:
+        (segmento, deslocamento desde u, distância até a rua, (lat, lon) projetado),
+        ou None se não houver ruas.
+        """
+        if not self._celulas:
+            return None
+        x, y = self._projetar(lat, lon)
+        cx, cy = self._celula(x, y)
+
+        melhor_d2, melhor = math.inf, None
+        vistos = set()
+        for r in self._aneis(cx, cy):
+            for bucket in self._anel(cx, cy, r):
+                for pedaco in bucket:
+                    if pedaco in vistos:
+                        continue
+                    vistos.add(pedaco)
+                    seg, j = pedaco
+                    (x1, y1), (x2, y2) = self._xy[seg][j], self._xy[seg][j + 1]
+                    dx, dy = x2 - x1, y2 - y1
+                    norma = dx * dx + dy * dy
+                    t = 0.0 if norma == 0 else max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) / norma))
+                    d2 = (x1 + t * dx - x) ** 2 + (y1 + t * dy - y) ** 2
+                    if d2 < melhor_d2:
+                        melhor_d2, melhor = d2, (seg, j, t)
+            if melhor is not None and melhor_d2 <= self._folga(x, y, cx, cy, r) ** 2:
+                break
+
+        seg, j, t = melhor
+        lats, lons, acumulado = self._geometria[seg]
+        deslocamento = acumulado[j] + t * (acumulado[j + 1] - acumulado[j])
+        ponto = (lats[j] + t * (lats[j + 1] - lats[j]), lons[j] + t * (lons[j + 1] - lons[j]))
+        return seg, deslocamento, math.sqrt(melhor_d2), ponto
+
+    def next_point(self, u, v, length=None):
+        """
+        (lat, lon) do primeiro ponto da geometria depois de u no trecho entre
+        os vértices u e v, ou None se não houver trecho u-v no índice. Entre
+        trechos paralelos, usa o de comprimento mais próximo de length.
+        """
+        if self._vizinhos is None:
+            vizinhos = {}
+            for seg, (a, b, _, comprimento) in enumerate(self.segmentos):
+                lats, lons, _ = self._geometria[seg]
+                vizinhos.setdefault((a, b), []).append((comprimento, (lats[1], lons[1])))
+                vizinhos.setdefault((b, a), []).append((comprimento, (lats[-2], lons[-2])))
+            self._vizinhos = vizinhos
+        candidatos = self._vizinhos.get((u, v))
+        if not candidatos:
+            return None
+        if length is None or len(candidatos) == 1:
+            return candidatos[0][1]
+        return min(candidatos, key=lambda c: abs(c[0] - length))[1]
+
+    def geometry(self, seg, inicio=0.0, fim=None):
+        """Pontos (lat, lon) do segmento entre dois deslocamentos (metros desde u)"""
+        lats, lons, acumulado = self._geometria[seg]
+        fim = acumulado[-1] if fim is None else fim
+        a, b = min(inicio, fim), max(inicio, fim)
+
+        def ponto_em(d):
+            for j in range(len(acumulado) - 1):
+                if d <= acumulado[j + 1] or j == len(acumulado) - 2:
+                    trecho = acumulado[j + 1] - acumulado[j]
+                    t = 0.0 if trecho == 0 else (d - acumulado[j]) / trecho
+                    return (lats[j] + t * (lats[j + 1] - lats[j]), lons[j] + t * (lons[j + 1] - lons[j]))
+
+        pontos = [ponto_em(a)]
+        pontos += [(lats[j], lons[j]) for j in range(len(acumulado)) if a < acumulado[j] < b]
+        pontos.append(ponto_em(b))
+        return pontos if inicio <= fim else pontos[::-1]
+
+
+def get_edge_index(G, nodes, vertices, ways, node_id_to_index):
+    """Índice de ruas do grafo, construído uma vez e guardado em G.attrs"""
+    indice = G.attrs.get("edge_index")
+    if indice is None:
+        indice = EdgeIndex(ways, nodes, vertices, node_id_to_index)
+        G.attrs["edge_index"] = indice
+    return indice
+
+
+def get_spatial_index(G, index_to_node_id):
+    """Índice espacial do grafo, construído uma vez e guardado em G.attrs"""
+    indice = G.attrs.get("spatial_index")
+    if indice is None:
+        indice = SpatialIndex.from_graph(G, index_to_node_id)
+        G.attrs["spatial_index"] = indice
+    return indice
+
+
+def resolve_node(G, ponto, index_to_node_id):
+    """
+    Aceita um ID de nó OSM ou uma coordenada (lat, lon); no segundo caso
+    devolve o ID do vértice mais próximo (None se o grafo estiver vazio).
+    """
+    if isinstance(ponto, (tuple, list)):
+        achado = get_spatial_index(G, index_to_node_id).nearest(*ponto)
+        return achado[0] if achado else None
+    return ponto
@@ -0,0 +1,172 @@
+import re
+import numpy as np
+from src.Grafo.compacto import CompactGraph
+
+# Classes de via (tag highway); *_link vira a classe base e o resto cai em "outro"
+HIGHWAY_CLASSES = (
+    "motorway", "trunk", "primary", "secondary", "tertiary", "unclassified",
+    "residential", "living_street", "service", "track", "pedestrian",
+    "footway", "cycleway", "path", "steps", "outro",
+)
+_CLASSE = {nome: i for i, nome in enumerate(HIGHWAY_CLASSES)}
+CLASSE_OUTRO = _CLASSE["outro"]
+
+# Perfis de custo. velocidades em km/h por classe; classe ausente = proibida.
+# maxspeed=True usa a tag maxspeed da aresta quando conhecida. O perfil
+# "distance" usa o peso em metros do próprio grafo.
+PROFILES = {
+    "distance": None,
+    "car": {
+        "maxspeed": True,
+        "velocidades": {
+            "motorway": 110, "trunk": 90, "primary": 60, "secondary": 50,
+            "tertiary": 40, "unclassified": 30, "residential": 30,
+            "living_street": 10, "service": 15, "track": 10, "outro": 30,
+        },
+    },
+    "bike": {
+        "maxspeed": False,
+        "velocidades": {
+            "primary": 16, "secondary": 16, "tertiary": 16, "unclassified": 16,
+            "residential": 16, "living_street": 14, "service": 14, "track": 12,
+            "pedestrian": 6, "footway": 6, "cycleway": 18, "path": 12, "outro": 14,
+        },
+    },
+    "walk": {
+        "maxspeed": False,
+        "velocidades": {
+            "primary": 5, "secondary": 5, "tertiary": 5, "unclassified": 5,
+            "residential": 5, "living_street": 5, "service": 5, "track": 5,
+            "pedestrian": 5, "footway": 5, "cycleway": 5, "path": 5, "steps": 3,
+            "outro": 5,
+        },
+    },
+}
+DEFAULT_PROFILE = "distance"
+
+
+def highway_class(valor):
+    """Índice em HIGHWAY_CLASSES da tag highway ("primary_link" -> primary)"""
+    if not valor:
+        return CLASSE_OUTRO
+    if valor.endswith("_link"):
+        valor = valor[:-5]
+    return _CLASSE.get(valor, CLASSE_OUTRO)
+
+
+def parse_maxspeed(valor):
+    """Tag maxspeed em km/h ("50", "30 mph", "60;80"); 0.0 se ausente ou não numérica"""
+    if not valor:
+        return 0.0
+    m = re.match(r"\s*(\d+(?:\.\d+)?)\s*(mph)?", valor.split(";")[0])
+    if not m:
+        return 0.0
+    velocidade = float(m.group(1))
+    return velocidade * 1.609344 if m.group(2) else velocidade
+
+
+def edge_tags(tags):
+    """(classe, maxspeed) de uma aresta a partir das tags do way"""
+    return highway_class(tags.get("highway")), parse_maxspeed(tags.get("maxspeed"))
+
+
+def store_edge_attributes(G, indices, classes, velocidades):
+    """
+    Grava classe e maxspeed das arestas recém-criadas de um PyDiGraph nos
+    arrays paralelos G.attrs["edge_highway"] / ["edge_maxspeed"], indexados
+    pelo índice da aresta (crescem conforme preciso).
+    """
+    if not indices:
+        return
+    classes_arr = G.attrs.get("edge_highway")
+    velocidades_arr = G.attrs.get("edge_maxspeed")
+    tamanho = max(indices) + 1
+    if classes_arr is None:
+        classes_arr = np.full(tamanho, CLASSE_OUTRO, dtype=np.uint8)
+        velocidades_arr = np.zeros(tamanho, dtype=np.float32)
+    elif len(classes_arr) < tamanho:
+        novo = max(tamanho, 2 * len(classes_arr))
+        classes_arr = np.concatenate([classes_arr, np.full(novo - len(classes_arr), CLASSE_OUTRO, dtype=np.uint8)])
+        velocidades_arr = np.concatenate([velocidades_arr, np.zeros(novo - len(velocidades_arr), dtype=np.float32)])
+    posicoes = np.asarray(indices, dtype=np.int64)
+    classes_arr[posicoes] = classes
+    velocidades_arr[posicoes] = velocidades
+    G.attrs["edge_highway"] = classes_arr
+    G.attrs["edge_maxspeed"] = velocidades_arr
+
+
+def edge_arrays(G):
+    """
+    (comprimento em metros, classe, maxspeed) por aresta, alinhados com a
+    posição CSR (CompactGraph) ou com o índice da aresta (PyDiGraph; lacunas
+    de arestas removidas ficam com comprimento NaN).
+    """
+    if isinstance(G, CompactGraph):
+        m = G.num_edges()
+        classes = G.highway if G.highway is not None else np.full(m, CLASSE_OUTRO, dtype=np.uint8)
+        velocidades = G.maxspeed if G.maxspeed is not None else np.zeros(m, dtype=np.float32)
+        return G.weights, classes, velocidades
+
+    indices = np.asarray(G.edge_indices(), dtype=np.int64)
+    tamanho = int(indices.max()) + 1 if len(indices) else 0
+    comprimentos = np.full(tamanho, np.nan)
+    comprimentos[indices] = [G.get_edge_data_by_index(e)["weight"] for e in indices.tolist()]
+    classes = np.full(tamanho, CLASSE_OUTRO, dtype=np.uint8)
+    velocidades = np.zeros(tamanho, dtype=np.float32)
+    guardadas = G.attrs.get("edge_highway")
+    if guardadas is not None:
+        n = min(tamanho, len(guardadas))
+        classes[:n] = guardadas[:n]
+        velocidades[:n] = G.attrs["edge_maxspeed"][:n]
+    return comprimentos, classes, velocidades
+
+
+def _velocidades_por_classe(perfil):
+    """Array classe -> km/h do perfil (0 = proibida)"""
+    tabela = np.zeros(len(HIGHWAY_CLASSES), dtype=np.float64)
+    for nome, velocidade in perfil["velocidades"].items():
+        tabela[_CLASSE[nome]] = velocidade
+    return tabela
+
+
+def profile_weights(G, profile):
+    """
+    Pesos por aresta do perfil (segundos para car/bike/walk; inf em arestas
+    proibidas), alinhados como em edge_arrays. None para o perfil "distance",
+    que usa o peso do próprio grafo. Calculados uma vez por perfil e
+    guardados em G.attrs["profile_weights"]; nada é copiado para as arestas.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Perfil desconhecido: {profile!r} (opções: {', '.join(PROFILES)})")
+    perfil = PROFILES[profile]
+    if perfil is None:
+        return None
+
+    cache = G.attrs.setdefault("profile_weights", {})
+    pesos = cache.get(profile)
+    if pesos is None:
+        comprimentos, classes, maxspeed = edge_arrays(G)
+        velocidades = _velocidades_por_classe(perfil)[classes]
+        if perfil["maxspeed"]:
+            velocidades = np.where((maxspeed > 0) & (velocidades > 0), maxspeed, velocidades)
+        with np.errstate(divide="ignore"):
+            pesos = np.where(velocidades > 0, comprimentos / (velocidades / 3.6), np.inf)
+        cache[profile] = pesos
+    return pesos
+
+
+def profile_scale(G, profile):
+    """
+    Menor custo por metro do perfil entre as arestas do grafo: multiplicada
+    pela distância em linha reta, dá uma heurística admissível para A*.
+    """
+    pesos = profile_weights(G, profile)
+    if pesos is None:
+        return 1.0
+    cache = G.attrs.setdefault("profile_scale", {})
+    escala = cache.get(profile)
+    if escala is None:
+        comprimentos = edge_arrays(G)[0]
+        validas = np.isfinite(pesos) & (comprimentos > 0)
+        escala = cache[profile] = float(np.min(pesos[validas] / comprimentos[validas])) if validas.any() else 1.0
+    return escala
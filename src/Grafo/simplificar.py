@@ -0,0 +1,178 @@
+import rustworkx as rx
+from src.Grafo.build import drop_derived_attrs
+from src.Grafo.perfis import store_edge_attributes, CLASSE_OUTRO
+
+
+def strongly_connected_components(G):
+    """Componentes fortemente conexas (listas de índices), da maior para a menor"""
+    return sorted(rx.strongly_connected_components(G), key=len, reverse=True)
+
+
+def _remover_vertices(G, indices, vertices, node_id_to_index, index_to_node_id):
+    G.remove_nodes_from(list(indices))
+    for idx in indices:
+        nid = index_to_node_id.pop(idx)
+        del node_id_to_index[nid]
+        vertices.discard(nid)
+
+
+def prune_components(graph_tuple):
+    """
+    Mantém só a maior componente fortemente conexa: de qualquer vértice dela
+    se chega a qualquer outro. Ilhas (e becos de mão única) que sobram fora
+    dela fazem o Dijkstra esgotar a componente antes de falhar. Devolve o
+    número de componentes encontradas.
+    """
+    G, _, vertices, _, node_id_to_index, index_to_node_id = graph_tuple
+    componentes = strongly_connected_components(G)
+    fora = [idx for componente in componentes[1:] for idx in componente]
+    _remover_vertices(G, fora, vertices, node_id_to_index, index_to_node_id)
+    return len(componentes)
+
+
+def _atributos(G, aresta):
+    """(rua, classe, maxspeed) de uma aresta: trechos só se fundem se forem iguais"""
+    classes = G.attrs.get("edge_highway")
+    if classes is None or aresta >= len(classes):
+        return G.get_edge_data_by_index(aresta).get("street"), CLASSE_OUTRO, 0.0
+    return (G.get_edge_data_by_index(aresta).get("street"),
+            int(classes[aresta]), float(G.attrs["edge_maxspeed"][aresta]))
+
+
+def _pares_de_fusao(G, v):
+    """
+    Pares (aresta que chega, aresta que sai) a fundir em v, ou None se v não
+    for um vértice de grau 2: exatamente dois vizinhos a e b, com a -> v -> b
+    (mão única) ou a <-> v <-> b (mão dupla), sem arestas paralelas.
+    """
+    saida = {destino: aresta for aresta, (_, destino, _) in G.incident_edge_index_map(v).items()}
+    entrada = {G.get_edge_endpoints_by_index(aresta)[0]: aresta for aresta in G.in_edge_indices(v)}
+    if (len(saida) != G.out_degree(v) or len(entrada) != G.in_degree(v)
+            or v in saida or v in entrada or len(set(saida) | set(entrada)) != 2):
+        return None
+    if len(saida) == 1 and len(entrada) == 1:
+        (a, chegada), (b, partida) = next(iter(entrada.items())), next(iter(saida.items()))
+        return [(chegada, partida)] if a != b else None
+    if len(saida) == 2 and set(saida) == set(entrada):
+        a, b = saida
+        return [(entrada[a], saida[b]), (entrada[b], saida[a])]
+    return None
+
+
+def merge_chains(graph_tuple):
+    """
+    Funde cadeias de vértices de grau 2 (ex.: onde um way termina e outro da
+    mesma rua começa) em arestas únicas u -> w. Só funde trechos com a mesma
+    rua, classe e maxspeed, então nomes e custos por perfil não mudam. A
+    aresta nova guarda em 'via' os IDs dos vértices removidos, na ordem do
+    percurso (a geometria entre vértices; ver expand_path), e em 'way' o way
+    do primeiro trecho. Vértices e ways citados em restrições de conversão
+    são mantidos. Devolve o número de vértices removidos.
+    """
+    G, _, vertices, _, node_id_to_index, index_to_node_id = graph_tuple
+    restricoes = G.attrs.get("turn_restrictions", {}).values()
+    ways_restritos = {way for de, _, para, _ in restricoes for way in (de, para)}
+    vias_restritas = {via for _, via, _, _ in restricoes}
+
+    fundidos = 0
+    for v in list(G.node_indices()):
+        if index_to_node_id[v] in vias_restritas:
+            continue
+        pares = _pares_de_fusao(G, v)
+        if pares is None:
+            continue
+        novas = []
+        for chegada, partida in pares:
+            d1, d2 = G.get_edge_data_by_index(chegada), G.get_edge_data_by_index(partida)
+            atributos = _atributos(G, chegada)
+            if (atributos != _atributos(G, partida)
+                    or d1.get("way") in ways_restritos or d2.get("way") in ways_restritos):
+                break
+            u = G.get_edge_endpoints_by_index(chegada)[0]
+            w = G.get_edge_endpoints_by_index(partida)[1]
+            dados = {
+                'weight': d1['weight'] + d2['weight'],
+                'street': d1.get('street'),
+                'way': d1.get('way'),
+                'via': d1.get('via', []) + [index_to_node_id[v]] + d2.get('via', []),
+            }
+            novas.append((u, w, dados, atributos))
+        else:
+            _remover_vertices(G, [v], vertices, node_id_to_index, index_to_node_id)
+            indices = [G.add_edge(u, w, dados) for u, w, dados, _ in novas]
+            store_edge_attributes(G, indices, [a[1] for *_, a in novas], [a[2] for *_, a in novas])
+            fundidos += 1
+    return fundidos
+
+
+def simplify_graph(graph_tuple, keep_largest_scc=True, merge=True):
+    """
+    Passada pós-build_graph sobre o PyDiGraph, no lugar: poda tudo fora da
+    maior componente fortemente conexa (keep_largest_scc) e funde cadeias de
+    grau 2 (merge). Devolve (graph_tuple, relatório), com o tamanho antes e
+    depois.
+
+    O grafo simplificado fica marcado em G.attrs["simplified"]: extend_graph
+    e a projeção no meio da quadra (route_between_points) precisam do grafo
+    original, e caminhos devem passar por expand_path antes de serem
+    desenhados.
+    """
+    G = graph_tuple[0]
+    if not isinstance(G, rx.PyDiGraph):
+        raise TypeError("simplify_graph requer o grafo RustworkX (build_graph com compact=False)")
+
+    relatorio = {
+        "nos_antes": G.num_nodes(),
+        "arestas_antes": G.num_edges(),
+        "componentes": None,
+        "nos_podados": 0,
+        "nos_fundidos": 0,
+    }
+    if keep_largest_scc:
+        antes = G.num_nodes()
+        relatorio["componentes"] = prune_components(graph_tuple)
+        relatorio["nos_podados"] = antes - G.num_nodes()
+    if merge:
+        relatorio["nos_fundidos"] = merge_chains(graph_tuple)
+    relatorio["nos_depois"] = G.num_nodes()
+    relatorio["arestas_depois"] = G.num_edges()
+
+    drop_derived_attrs(G)
+    G.attrs["simplified"] = True
+    return graph_tuple, relatorio
+
+
+def format_report(relatorio):
+    """Texto curto do relatório de simplify_graph"""
+    def reducao(antes, depois):
+        return 100.0 * (antes - depois) / antes if antes else 0.0
+
+    linhas = [
+        f"Nós: {relatorio['nos_antes']} -> {relatorio['nos_depois']} "
+        f"(-{reducao(relatorio['nos_antes'], relatorio['nos_depois']):.1f}%)",
+        f"Arestas: {relatorio['arestas_antes']} -> {relatorio['arestas_depois']} "
+        f"(-{reducao(relatorio['arestas_antes'], relatorio['arestas_depois']):.1f}%)",
+    ]
+    if relatorio["componentes"] is not None:
+        linhas.append(f"Componentes fortemente conexas: {relatorio['componentes']} "
+                      f"({relatorio['nos_podados']} nós fora da maior removidos)")
+    linhas.append(f"Vértices de grau 2 fundidos: {relatorio['nos_fundidos']}")
+    return "\n".join(linhas)
+
+
+def expand_path(G, path, node_id_to_index):
+    """
+    Caminho de um grafo simplificado com os vértices fundidos de volta
+    (campo 'via' da aresta mais leve entre cada par), como seria no grafo
+    original. Sem arestas fundidas, devolve o próprio caminho.
+    """
+    if not path or not G.attrs.get("simplified"):
+        return path
+    expandido = [path[0]]
+    for a, b in zip(path, path[1:]):
+        ia, ib = node_id_to_index.get(a), node_id_to_index.get(b)
+        if ia is not None and ib is not None and G.has_edge(ia, ib):
+            dados = min(G.get_all_edge_data(ia, ib), key=lambda d: d['weight'])
+            expandido.extend(dados.get('via', ()))
+        expandido.append(b)
+    return expandido
@@ -0,0 +1,267 @@
+import hashlib
+import json
+import zipfile
+import numpy as np
+import rustworkx as rx
+from src.Grafo.build import build_street_index
+from src.Grafo.compacto import (CompactGraph, NodeIdIndex, IndexToNodeId, NodeCoords, StreetIndex, WayList,
+                                _strings_to_arrays)
+from src.Algoritimos.contraction import ContractionHierarchy
+
+SNAPSHOT_FORMAT_VERSION = 3
+
+
+def data_checksum(data):
+    """SHA-256 da resposta Overpass (JSON canônico), usado para validar snapshots"""
+    canonico = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+
+def _arrays_to_strings(blob, offsets):
+    dados = bytes(blob)
+    limites = offsets.tolist()
+    return [dados[limites[i]:limites[i + 1]].decode("utf-8") for i in range(len(limites) - 1)]
+
+
+def save_graph(path, G, nodes, vertices, ways, node_id_to_index, index_to_node_id,
+               source_data=None, checksum=None):
+    """
+    Salva a saída completa de build_graph em um .npz não comprimido.
+
+    O arquivo contém um cabeçalho (versão do formato + checksum dos dados de
+    origem), arrays planos para nós/vértices/arestas/ways, uma tabela de
+    strings, o índice de nomes de rua e, se existir em G.attrs, a hierarquia
+    de contração. Como os membros não são comprimidos, load_graph pode
+    mapeá-los em memória; os nós e o índice de ruas vão ordenados por ID para
+    serem consultados direto nos arrays.
+    """
+    if checksum is None and source_data is not None:
+        checksum = data_checksum(source_data)
+
+    # Nós, índice de ruas e ways nos mesmos arrays das views de
+    # src.Grafo.compacto (já prontos se vieram de build_graph(compact=True)
+    # ou de load_graph)
+    nos = NodeCoords.pack(nodes)
+    street_index = G.attrs.get("street_index")
+    if street_index is None:
+        street_index = build_street_index(ways)
+    ruas = StreetIndex.pack(street_index)
+    ways = WayList.pack(ways)
+
+    arrays = {
+        "version": np.array([SNAPSHOT_FORMAT_VERSION], dtype=np.int32),
+        "checksum": np.frombuffer((checksum or "").encode("ascii"), dtype=np.uint8),
+        "node_ids": nos.ids,
+        "node_coords": nos.coords,
+        "vertices": np.array(sorted(vertices), dtype=np.int64),
+        "way_ids": ways.ids,
+        "way_parts": ways.parts,
+        "way_offsets": ways.offsets,
+        "way_nodes": ways.refs,
+        "way_tags": ways.tags_blob,
+        "way_tags_offsets": ways.tags_offsets,
+        "street_index_ids": ruas.ids,
+        "street_index_labels": ruas.rotulos,
+        "street_labels": ruas.blob,
+        "street_labels_offsets": ruas.offsets,
+    }
+
+    # Restrições de conversão: (relação, from_way, via_node, to_way, obrigatória)
+    restricoes = G.attrs.get("turn_restrictions") if isinstance(getattr(G, "attrs", None), dict) else None
+    if restricoes:
+        arrays["turn_restrictions"] = np.array(
+            [(rid, de, via, para, int(obrigatoria)) for rid, (de, via, para, obrigatoria) in restricoes.items()],
+            dtype=np.int64
+        )
+
+    if isinstance(G, CompactGraph):
+        arrays["kind"] = np.frombuffer(b"compact", dtype=np.uint8)
+        streets_blob, streets_offsets = _strings_to_arrays(G.street_table)
+        arrays.update({
+            "graph_ids": G.original_ids,
+            "graph_lat": G.lat,
+            "graph_lon": G.lon,
+            "csr_offsets": G.offsets,
+            "csr_targets": G.targets,
+            "csr_weights": G.weights,
+            "csr_street_ids": G.street_ids,
+            "streets": streets_blob,
+            "streets_offsets": streets_offsets,
+        })
+        if G.highway is not None:
+            arrays["csr_highway"] = G.highway
+            arrays["csr_maxspeed"] = G.maxspeed
+    else:
+        arrays["kind"] = np.frombuffer(b"rustworkx", dtype=np.uint8)
+        indices = np.array(list(G.node_indices()), dtype=np.int64)
+        street_table = []
+        street_ids = {}
+        edges = G.weighted_edge_list()
+        edge_street = np.empty(len(edges), dtype=np.int32)
+        for k, (_, _, dados) in enumerate(edges):
+            nome = dados.get("street", "rua sem nome")
+            if nome not in street_ids:
+                street_ids[nome] = len(street_table)
+                street_table.append(nome)
+            edge_street[k] = street_ids[nome]
+        streets_blob, streets_offsets = _strings_to_arrays(street_table)
+        arrays.update({
+            "graph_indices": indices,
+            "graph_ids": np.array([index_to_node_id[i] for i in indices.tolist()], dtype=np.int64),
+            "graph_lat": np.array([G[i]["lat"] for i in indices.tolist()], dtype=np.float64),
+            "graph_lon": np.array([G[i]["lon"] for i in indices.tolist()], dtype=np.float64),
+            "edge_src": np.array([u for u, _, _ in edges], dtype=np.int64),
+            "edge_dst": np.array([v for _, v, _ in edges], dtype=np.int64),
+            "edge_weight": np.array([d["weight"] for _, _, d in edges], dtype=np.float64),
+            "edge_street": edge_street,
+            "edge_way": np.array([d.get("way", -1) for _, _, d in edges], dtype=np.int64),
+            "streets": streets_blob,
+            "streets_offsets": streets_offsets,
+        })
+        # Classe/maxspeed por índice de aresta, na mesma ordem de edges
+        if G.attrs.get("edge_highway") is not None:
+            arestas = np.array(G.edge_indices(), dtype=np.int64)
+            arrays["edge_highway"] = G.attrs["edge_highway"][arestas]
+            arrays["edge_maxspeed"] = G.attrs["edge_maxspeed"][arestas]
+        # Grafo simplificado: vértices fundidos em cada aresta ('via') em CSR
+        if G.attrs.get("simplified"):
+            vias = [d.get("via", ()) for _, _, d in edges]
+            via_offsets = np.zeros(len(vias) + 1, dtype=np.int64)
+            np.cumsum([len(via) for via in vias], out=via_offsets[1:])
+            arrays["edge_via_offsets"] = via_offsets
+            arrays["edge_via"] = np.array([nid for via in vias for nid in via], dtype=np.int64)
+
+    ch = G.attrs.get("ch") if isinstance(getattr(G, "attrs", None), dict) else None
+    if ch is not None:
+        arrays.update(ch.to_arrays())
+
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+
+def _open_arrays(path, mmap):
+    """
+    Abre os membros do .npz. Com mmap=True, cada membro (não comprimido) é
+    mapeado direto do arquivo com np.memmap, sem copiar para a memória.
+    """
+    if not mmap:
+        with np.load(path) as npz:
+            return {nome: npz[nome] for nome in npz.files}
+
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as f:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"Membro comprimido não pode ser mapeado: {info.filename}")
+            # Cabeçalho local do zip: 30 bytes + nome + extra
+            f.seek(info.header_offset + 26)
+            tamanho_nome, tamanho_extra = np.frombuffer(f.read(4), dtype="<u2")
+            f.seek(info.header_offset + 30 + int(tamanho_nome) + int(tamanho_extra))
+            versao = np.lib.format.read_magic(f)
+            if versao == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            nome = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if 0 in shape:
+                arrays[nome] = np.empty(shape, dtype=dtype)
+                continue
+            arrays[nome] = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(),
+                                     shape=shape, order="F" if fortran else "C")
+    return arrays
+
+
+def read_snapshot_header(path):
+    """(versão do formato, checksum dos dados de origem) sem carregar o grafo"""
+    with np.load(path) as npz:
+        return int(npz["version"][0]), bytes(npz["checksum"]).decode("ascii")
+
+
+def load_graph(path, expected_checksum=None, mmap=True):
+    """
+    Carrega um snapshot salvo com save_graph e devolve a mesma tupla de
+    build_graph: (G, nodes, vertices, ways, node_id_to_index, index_to_node_id).
+
+    nodes, ways e o índice de ruas ficam sobre os arrays do arquivo
+    (NodeCoords, WayList, StreetIndex): nada é convertido para objetos Python
+    na carga, só quando consultado. No snapshot compacto o grafo também é
+    usado direto dos arrays; no RustworkX só o PyDiGraph é recriado.
+
+    Levanta ValueError se a versão do formato for diferente ou se o checksum
+    não bater com expected_checksum.
+    """
+    a = _open_arrays(path, mmap)
+
+    versao = int(a["version"][0])
+    if versao != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Versão de snapshot incompatível: {versao} (esperado {SNAPSHOT_FORMAT_VERSION})")
+    checksum = bytes(a["checksum"]).decode("ascii")
+    if expected_checksum is not None and checksum != expected_checksum:
+        raise ValueError("Snapshot desatualizado: checksum dos dados de origem não confere")
+
+    nodes = NodeCoords(a["node_ids"], a["node_coords"])
+    vertices = set(a["vertices"].tolist())
+    ways = WayList(a["way_ids"], a["way_offsets"], a["way_nodes"], a["way_tags"], a["way_tags_offsets"],
+                   a["way_parts"])
+
+    street_table = _arrays_to_strings(a["streets"], a["streets_offsets"])
+    kind = bytes(a["kind"]).decode("ascii")
+
+    if kind == "compact":
+        G = CompactGraph(a["graph_ids"], a["graph_lat"], a["graph_lon"], a["csr_offsets"],
+                         a["csr_targets"], a["csr_weights"], a["csr_street_ids"], street_table,
+                         a["csr_highway"] if "csr_highway" in a else None,
+                         a["csr_maxspeed"] if "csr_maxspeed" in a else None)
+        node_id_to_index = NodeIdIndex(G.original_ids)
+        index_to_node_id = IndexToNodeId(G.original_ids)
+    else:
+        G = rx.PyDiGraph(attrs={})
+        indices = a["graph_indices"].tolist()
+        ids = a["graph_ids"].tolist()
+        dados = [{'original_id': nid, 'lat': lat, 'lon': lon}
+                 for nid, lat, lon in zip(ids, a["graph_lat"].tolist(), a["graph_lon"].tolist())]
+
+        # Recria os nós nos mesmos índices (removendo lacunas, se houver)
+        total = (max(indices) + 1) if indices else 0
+        if len(indices) == total:
+            G.add_nodes_from(dados)
+        else:
+            G.add_nodes_from([None] * total)
+            presentes = set(indices)
+            G.remove_nodes_from([i for i in range(total) if i not in presentes])
+            for idx, dado in zip(indices, dados):
+                G[idx] = dado
+
+        # way de origem de cada aresta (-1 = desconhecido)
+        edge_way = a["edge_way"].tolist()
+        G.add_edges_from([
+            (u, v, {'weight': w, 'street': street_table[s], 'way': wid} if wid >= 0
+                   else {'weight': w, 'street': street_table[s]})
+            for u, v, w, s, wid in zip(a["edge_src"].tolist(), a["edge_dst"].tolist(),
+                                       a["edge_weight"].tolist(), a["edge_street"].tolist(), edge_way)
+        ])
+        node_id_to_index = dict(zip(ids, indices))
+        index_to_node_id = dict(zip(indices, ids))
+        # As arestas são recriadas em ordem, então o índice k é a k-ésima aresta salva
+        if "edge_highway" in a:
+            G.attrs["edge_highway"] = np.array(a["edge_highway"])
+            G.attrs["edge_maxspeed"] = np.array(a["edge_maxspeed"])
+        if "edge_via_offsets" in a:
+            limites_via = a["edge_via_offsets"].tolist()
+            via = a["edge_via"].tolist()
+            for k in range(len(limites_via) - 1):
+                if limites_via[k + 1] > limites_via[k]:
+                    G.get_edge_data_by_index(k)["via"] = via[limites_via[k]:limites_via[k + 1]]
+            G.attrs["simplified"] = True
+
+    G.attrs["street_index"] = StreetIndex(a["street_index_ids"], a["street_index_labels"],
+                                          a["street_labels"], a["street_labels_offsets"])
+    G.attrs["source_checksum"] = checksum
+    G.attrs["turn_restrictions"] = {
+        rid: (de, via, para, bool(obrigatoria))
+        for rid, de, via, para, obrigatoria in (a["turn_restrictions"].tolist() if "turn_restrictions" in a else [])
+    }
+    if "ch_version" in a:
+        G.attrs["ch"] = ContractionHierarchy.from_arrays(a)
+
+    return G, nodes, vertices, ways, node_id_to_index, index_to_node_id
@@ -1,122 +1,244 @@
-import plotly.graph_objects as go
-import rustworkx as rx
+import math
 import os
-from src.OSM.consultaOSM import get_node_street_name
+import numpy as np
+import plotly
+import plotly.graph_objects as go
+from src.Grafo.compacto import CompactGraph
+from src.OSM.consultaOSM import get_node_street_name, get_street_index
 
-def plot_graph_with_names(G, nodes, ways, node_id_to_index, index_to_node_id):
-    print("Gerando visualização do grafo em formato de mapa com Plotly...")
+R_TERRA = 6371000
 
-    edge_x = []
-    edge_y = []
-    
-    node_x = []
-    node_y = []
-    node_text = []
-    node_adjacencies = []
-    # Lista para as anotações (setas de direção)
-    annotations = []
+# Nível de detalhe: zoom mínimo do mapa para cada camada aparecer
+ZOOM_RUAS_CURTAS = 13
+ZOOM_SETAS = 15
+ZOOM_CRUZAMENTOS = 15
+QUANTIL_RUAS_LONGAS = 0.75   # acima deste comprimento a rua aparece em qualquer zoom
+TAMANHO_SETA = 6.0           # metros (limitado a 30% da aresta)
 
-    crossing_node_indices = set()
-    
-    min_lat, max_lat = float('inf'), float('-inf')
-    min_lon, max_lon = float('inf'), float('-inf')
+# Plotly 6+ grava arrays NumPy como arrays tipados (base64): float32 basta para
+# exibir (~0,5 m). Versões anteriores escrevem texto, onde 6 casas decimais
+# (~0,1 m) geram números mais curtos.
+_ARRAYS_TIPADOS = int(plotly.__version__.split(".")[0]) >= 6
 
-    for edge_idx in G.edge_indices():
-        source_idx, target_idx = G.get_edge_endpoints_by_index(edge_idx)
-        edge_data = G.get_edge_data_by_index(edge_idx)
+# Troca a visibilidade das camadas conforme o zoom (meta.min_zoom de cada traço)
+_LOD_SCRIPT = """
+var gd = document.getElementById('{plot_id}');
+var ultimo = null;
+function nivelDeDetalhe() {
+    var z = gd.layout.mapbox.zoom;
+    var visivel = gd.data.map(function (t) {
+        return !(t.meta && t.meta.min_zoom !== undefined && t.meta.min_zoom > z);
+    });
+    var chave = visivel.join();
+    if (chave !== ultimo) {
+        ultimo = chave;
+        Plotly.restyle(gd, {visible: visivel});
+    }
+}
+gd.on('plotly_relayout', function (e) {
+    if (e['mapbox.zoom'] !== undefined || e['mapbox'] !== undefined) nivelDeDetalhe();
+});
+nivelDeDetalhe();
+"""
 
-        crossing_node_indices.add(source_idx)
-        crossing_node_indices.add(target_idx)
 
-        source_id = index_to_node_id[source_idx]
-        target_id = index_to_node_id[target_idx]
+def _edge_arrays(G, index_to_node_id, nodes):
+    """
+    (origem, destino, lat, lon) em arrays NumPy: índices de todas as arestas e
+    coordenadas por índice de nó. Funciona com PyDiGraph e CompactGraph.
+    """
+    if isinstance(G, CompactGraph):
+        origem = np.repeat(np.arange(G.num_nodes(), dtype=np.int64), np.diff(G.offsets))
+        return origem, np.asarray(G.targets, dtype=np.int64), np.asarray(G.lat), np.asarray(G.lon)
 
-        source_lat, source_lon = nodes[source_id]
-        target_lat, target_lon = nodes[target_id]
-        
-        min_lat = min(min_lat, source_lat, target_lat)
-        max_lat = max(max_lat, source_lat, target_lat)
-        min_lon = min(min_lon, source_lon, target_lon)
-        max_lon = max(max_lon, source_lon, target_lon)
+    total = max(G.node_indices(), default=-1) + 1
+    coordenadas = [nodes[index_to_node_id[idx]] if idx in index_to_node_id else (np.nan, np.nan)
+                   for idx in range(total)]
+    if G.attrs.get("simplified"):
+        # Arestas fundidas (simplify_graph) passam pelos vértices em 'via',
+        # que ganham índices próprios depois dos nós do grafo
+        extras = {}
+        pares = []
+        for origem, destino, dados in G.weighted_edge_list():
+            sequencia = [origem]
+            for nid in dados.get('via', ()):
+                if nid not in extras:
+                    extras[nid] = total + len(extras)
+                    coordenadas.append(nodes[nid])
+                sequencia.append(extras[nid])
+            sequencia.append(destino)
+            pares.extend(zip(sequencia, sequencia[1:]))
+        arestas = np.array(pares, dtype=np.int64).reshape(-1, 2)
+    else:
+        arestas = np.array(G.edge_list(), dtype=np.int64).reshape(-1, 2)
+    coordenadas = np.array(coordenadas, dtype=np.float64).reshape(-1, 2)
+    return arestas[:, 0], arestas[:, 1], coordenadas[:, 0], coordenadas[:, 1]
 
-        edge_x.extend([source_lon, target_lon, None])
-        edge_y.extend([source_lat, target_lat, None])
 
-        annotations.append(
-            go.layout.Annotation(
-                x=target_lon, y=target_lat,
-                ax=source_lon, ay=source_lat,
-                showarrow=True,
-                arrowhead=5,
-                arrowsize=1.5,
-                arrowwidth=1,
-                arrowcolor='blue',
-                standoff=2,
-                opacity=0.5
-            )
-        )
+def _coordenadas(valores):
+    if _ARRAYS_TIPADOS:
+        return np.asarray(valores, dtype=np.float32)
+    return np.round(np.asarray(valores, dtype=np.float64), 6)
 
-    for node_idx in crossing_node_indices:
-        node_id = index_to_node_id[node_idx]
-        lat, lon = nodes[node_id]
-        
-        node_x.append(lon)
-        node_y.append(lat)
-        
-        street_name = get_node_street_name(node_id, ways)
-        node_text.append(f"<b>Nó:</b> {node_id}<br><b>Rua:</b> {street_name}")
 
-        adjacencies = len(G.neighbors(node_idx))
-        node_adjacencies.append(adjacencies)
+def _linhas(lat1, lon1, lat2, lon2):
+    """Segmentos como uma única polilinha separada por NaN"""
+    m = len(lat1)
+    lats = np.empty((m, 3))
+    lons = np.empty((m, 3))
+    lats[:, 0], lats[:, 1], lats[:, 2] = lat1, lat2, np.nan
+    lons[:, 0], lons[:, 1], lons[:, 2] = lon1, lon2, np.nan
+    return _coordenadas(lats.ravel()), _coordenadas(lons.ravel())
+
+
+def _setas(lat1, lon1, lat2, lon2, lat0):
+    """
+    Ponta de seta (dois traços em "V") a 60% de cada aresta, apontando para o
+    destino. Arestas de mão dupla ganham duas pontas, em sentidos opostos.
+    """
+    ky = math.radians(1) * R_TERRA
+    kx = ky * math.cos(math.radians(lat0))
+    dx = (lon2 - lon1) * kx
+    dy = (lat2 - lat1) * ky
+    comprimento = np.hypot(dx, dy)
+    validas = comprimento > 0
+    dx, dy, comprimento = dx[validas], dy[validas], comprimento[validas]
+    lat1, lon1 = lat1[validas], lon1[validas]
+
+    ux, uy = dx / comprimento, dy / comprimento
+    tamanho = np.minimum(TAMANHO_SETA, 0.3 * comprimento)
+    px, py = 0.6 * dx, 0.6 * dy
+    # Asas: recuam ao longo da aresta e abrem para os dois lados
+    ax, ay = px - tamanho * ux, py - tamanho * uy
+    lx, ly = -uy * tamanho * 0.6, ux * tamanho * 0.6
+
+    m = len(dx)
+    xs = np.empty((m, 4))
+    ys = np.empty((m, 4))
+    xs[:, 0], ys[:, 0] = ax + lx, ay + ly
+    xs[:, 1], ys[:, 1] = px, py
+    xs[:, 2], ys[:, 2] = ax - lx, ay - ly
+    xs[:, 3] = ys[:, 3] = np.nan
+    lons = lon1[:, None] + xs / kx
+    lats = lat1[:, None] + ys / ky
+    return _coordenadas(lats.ravel()), _coordenadas(lons.ravel())
+
+
+def build_graph_figure(G, nodes, ways, node_id_to_index, index_to_node_id, show_nodes=True):
+    """
+    Figura do grafo sem um objeto de layout por aresta:
+
+    - ruas numa única polilinha (arrays NumPy separados por NaN, gravados
+      como arrays tipados no Plotly 6+), cada par de sentidos desenhado uma vez;
+    - sentido indicado por pontas de seta vetorizadas num único traço;
+    - nível de detalhe por zoom: ruas curtas, setas e cruzamentos só aparecem
+      a partir de ZOOM_RUAS_CURTAS / ZOOM_SETAS / ZOOM_CRUZAMENTOS (ver
+      write_graph_html, que inclui o script que troca as camadas).
+    """
+    origem, destino, lat, lon = _edge_arrays(G, index_to_node_id, nodes)
+    lat1, lon1, lat2, lon2 = lat[origem], lon[origem], lat[destino], lon[destino]
+
+    # Um traço por par de nós (o sentido contrário reaproveita a mesma linha)
+    vistos = set()
+    unicas = np.zeros(len(origem), dtype=bool)
+    for k, (u, v) in enumerate(zip(origem.tolist(), destino.tolist())):
+        par = (u, v) if u < v else (v, u)
+        if par not in vistos:
+            vistos.add(par)
+            unicas[k] = True
+
+    ky = math.radians(1) * R_TERRA
+    lat0 = float(np.nanmean(lat)) if len(lat) else 0.0
+    comprimento = np.hypot((lat2 - lat1) * ky, (lon2 - lon1) * ky * math.cos(math.radians(lat0)))
+    limite = np.quantile(comprimento[unicas], QUANTIL_RUAS_LONGAS) if unicas.any() else 0.0
+    longas = unicas & (comprimento >= limite)
+    curtas = unicas & ~longas
 
-    edge_trace = go.Scattermapbox(
-        lon=edge_x, lat=edge_y,
+    traces = []
+    for nome, selecao, meta in (("Ruas", longas, {}),
+                                ("Ruas (detalhe)", curtas, {"min_zoom": ZOOM_RUAS_CURTAS})):
+        lats, lons = _linhas(lat1[selecao], lon1[selecao], lat2[selecao], lon2[selecao])
+        traces.append(go.Scattermapbox(
+            lon=lons, lat=lats,
+            mode='lines',
+            line=dict(width=1.5, color='red'),
+            hoverinfo='none',
+            name=nome,
+            meta=meta
+        ))
+
+    lats, lons = _setas(lat1, lon1, lat2, lon2, lat0)
+    traces.append(go.Scattermapbox(
+        lon=lons, lat=lats,
         mode='lines',
-        line=dict(width=1.5, color='red'),
+        line=dict(width=1, color='blue'),
+        opacity=0.6,
         hoverinfo='none',
-        name="Ruas"
-    )
+        name="Sentido",
+        meta={"min_zoom": ZOOM_SETAS}
+    ))
 
-    node_trace = go.Scattermapbox(
-        lon=node_x, lat=node_y,
-        mode='markers',
-        hoverinfo='text',
-        text=node_text,
-        name="Cruzamentos",
-        marker=go.scattermapbox.Marker(
-            size=[5 + (adj * 2) for adj in node_adjacencies],
-            color='blue',
-            symbol='circle',
-        )
-    )
+    if show_nodes:
+        street_index = get_street_index(G)
+        usados = np.unique(np.concatenate([origem, destino]))
+        # Só vértices do grafo (pontos intermediários de arestas fundidas vêm depois)
+        usados = usados[usados <= max(G.node_indices(), default=-1)]
+        grau = np.bincount(origem, minlength=len(lat)) + np.bincount(destino, minlength=len(lat))
+        node_text = []
+        for idx in usados.tolist():
+            node_id = index_to_node_id[idx]
+            street_name = get_node_street_name(node_id, ways, street_index)
+            node_text.append(f"<b>Nó:</b> {node_id}<br><b>Rua:</b> {street_name}")
 
-    center_lon = (min_lon + max_lon) / 2
-    center_lat = (min_lat + max_lat) / 2
-    
-    fig = go.Figure(data=[edge_trace, node_trace],
-                    layout=go.Layout(
-                        title=go.layout.Title(text='<br>Grafo de Ruas - Visualização de Mapa', x=0.5),
-                        showlegend=False,
-                        hovermode='closest',
-                        margin={"r":0,"t":0,"l":0,"b":0},
-                        mapbox_style="open-street-map",
-                        mapbox_zoom=14,
-                        mapbox_center={"lat": center_lat, "lon": center_lon},
-                        annotations=annotations
+        traces.append(go.Scattermapbox(
+            lon=_coordenadas(lon[usados]), lat=_coordenadas(lat[usados]),
+            mode='markers',
+            hoverinfo='text',
+            text=node_text,
+            name="Cruzamentos",
+            meta={"min_zoom": ZOOM_CRUZAMENTOS},
+            marker=go.scattermapbox.Marker(
+                size=(5 + grau[usados]).astype(np.int16),
+                color='blue',
+                symbol='circle',
+            )
+        ))
+
+    if len(origem):
+        center_lat = float((np.nanmin(lat[origem]) + np.nanmax(lat[origem])) / 2)
+        center_lon = float((np.nanmin(lon[origem]) + np.nanmax(lon[origem])) / 2)
+    else:
+        center_lat, center_lon = 0.0, 0.0
+
+    return go.Figure(data=traces,
+                     layout=go.Layout(
+                         title=go.layout.Title(text='<br>Grafo de Ruas - Visualização de Mapa', x=0.5),
+                         showlegend=False,
+                         hovermode='closest',
+                         margin={"r":0,"t":0,"l":0,"b":0},
+                         mapbox_style="open-street-map",
+                         mapbox_zoom=14,
+                         mapbox_center={"lat": center_lat, "lon": center_lon},
+                     )
                     )
-                   )
-    
-    file_path = "street_map.html"
-    fig.write_html(file_path)
-    
-    print(f"\nO gráfico interativo em formato de mapa foi salvo em: {os.path.abspath(file_path)}")
 
 
-import plotly.graph_objects as go
-import os
-from src.OSM.consultaOSM import get_node_street_name
+def write_graph_html(fig, file_path="street_map.html"):
+    """Grava o HTML com o script de nível de detalhe por zoom"""
+    fig.write_html(file_path, post_script=_LOD_SCRIPT)
+    return os.path.abspath(file_path)
+
+
+def plot_graph_with_names(G, nodes, ways, node_id_to_index, index_to_node_id, file_path="street_map.html"):
+    print("Gerando visualização do grafo em formato de mapa com Plotly...")
+
+    fig = build_graph_figure(G, nodes, ways, node_id_to_index, index_to_node_id)
+    caminho = write_graph_html(fig, file_path)
+    
+    print(f"\nO gráfico interativo em formato de mapa foi salvo em: {caminho}")
+
 
-def plot_path_only(path, nodes, ways):
+def plot_path_only(path, nodes, ways, street_index=None):
     print("Gerando visualização do menor caminho em um novo mapa...")
     
     path_edge_x = []
@@ -168,7 +290,7 @@ def plot_path_only(path, nodes, ways):
     for i, node_id in enumerate(path):
         if node_id in nodes:
             lat, lon = nodes[node_id]
-            street_name = get_node_street_name(node_id, ways)
+            street_name = get_node_street_name(node_id, ways, street_index)
             
             path_node_x.append(lon)
             path_node_y.append(lat)
@@ -1,11 +1,44 @@
 import tkinter as tk
-from tkinter import messagebox, scrolledtext
+from tkinter import messagebox, scrolledtext, filedialog
 from io import StringIO
 import sys
-from src.OSM.consultaOSM import get_osm_data
-from src.Grafo.build import build_graph
+from src.OSM.tiles import get_osm_data_tiled, bbox_difference, merge_elements
+from src.Grafo.build import build_graph, extend_graph
+from src.Grafo.compacto import CompactGraph
+from src.Grafo.espacial import get_edge_index
+from src.Grafo.snapshot import save_graph, load_graph, data_checksum
 from src.Grafo.visualizar import plot_graph_with_names, plot_path_only
 from src.Algoritimos.dijkstra import dijkstra
+from src.Algoritimos.astar import astar
+from src.Algoritimos.contraction import ch_shortest_path
+from src.Algoritimos.conversoes import turn_aware_route
+from src.Algoritimos.cache_rotas import RouteCache
+from src.Grafo.simplificar import simplify_graph, format_report, expand_path, strongly_connected_components
+from src.Interface.tarefas import BackgroundRunner
+
+# Algoritmos disponíveis para "Calcular Menor Caminho"
+ALGORITMOS = {
+    "Dijkstra": dijkstra,
+    "Dijkstra bidirecional": lambda *args, **kwargs: dijkstra(*args, bidirectional=True, **kwargs),
+    "A* (Haversine)": astar,
+    "Contraction Hierarchies": ch_shortest_path,
+    "Dijkstra com conversões": turn_aware_route,
+}
+
+# Perfis de custo (src.Grafo.perfis.PROFILES): só "distance" mede em metros
+PERFIS = {
+    "Distância": "distance",
+    "Carro (tempo)": "car",
+    "Bicicleta (tempo)": "bike",
+    "A pé (tempo)": "walk",
+}
+
+def parse_point(texto):
+    """ID de nó OSM ("432674688") ou coordenada "lat,lon" ("-9.66,-35.73")"""
+    if "," in texto:
+        lat, lon = (float(parte) for parte in texto.split(","))
+        return lat, lon
+    return int(texto)
 
 def capture_print_crossings(G, nodes, vertices, ways, node_id_to_index, index_to_node_id, limit=20):
     """
@@ -21,6 +54,74 @@ def capture_print_crossings(G, nodes, vertices, ways, node_id_to_index, index_to
         sys.stdout = sys_stdout
     return buffer.getvalue()
 
+def load_data(bbox, offline, progresso, base=None, restricoes=False):
+    """
+    Carrega dados OSM e constrói o grafo usando RustworkX (roda fora da thread do Tk).
+
+    Se base (grafo já carregado) cobre parte da bbox, baixa só a área que
+    falta e estende o grafo no lugar; a área coberta passa a ser o menor
+    retângulo que contém as duas bboxes. Se a base não pode ser estendida
+    (grafo simplificado ou compacto, ou carregado com outra escolha de
+    restrições), a união inteira é baixada e construída de novo.
+    restricoes=True inclui as restrições de conversão (usadas por "Dijkstra
+    com conversões").
+    """
+    carregada = base[0].attrs.get("bbox") if base and base[0] is not None else None
+    if carregada is not None:
+        uniao = (min(bbox[0], carregada[0]), min(bbox[1], carregada[1]),
+                 max(bbox[2], carregada[2]), max(bbox[3], carregada[3]))
+        sobrepoe = (bbox[0] <= carregada[2] and carregada[0] <= bbox[2]
+                    and bbox[1] <= carregada[3] and carregada[1] <= bbox[3])
+        if sobrepoe:
+            G = base[0]
+            if (isinstance(G, CompactGraph) or G.attrs.get("simplified")
+                    or G.attrs.get("restrictions", False) != restricoes):
+                # extend_graph precisa do PyDiGraph original, e a área nova
+                # viria com restrições diferentes das da base
+                bbox = uniao
+            else:
+                faixas = bbox_difference(uniao, carregada)
+                if faixas:
+                    progresso("Baixando área nova")
+                    delta = merge_elements([get_osm_data_tiled(f, offline=offline, restrictions=restricoes)
+                                            for f in faixas])
+                    progresso("Estendendo grafo")
+                    extend_graph(base, delta)
+                    G.attrs["bbox"] = uniao
+                return base
+
+    progresso("Baixando dados OSM")
+    data = get_osm_data_tiled(bbox, offline=offline, restrictions=restricoes)
+
+    progresso("Construindo grafo")
+    G, nodes, vertices, ways, node_id_to_index, index_to_node_id = build_graph(data)
+    G.attrs["source_checksum"] = data_checksum(data)
+    G.attrs["bbox"] = tuple(bbox)
+    G.attrs["restrictions"] = restricoes
+
+    return G, nodes, vertices, ways, node_id_to_index, index_to_node_id
+
+def graph_statistics(G, vertices):
+    """Texto das estatísticas do grafo (PyDiGraph ou CompactGraph)"""
+    stats = f"=== ESTATÍSTICAS DO GRAFO ===\n"
+    stats += f"Nós: {G.num_nodes()}\n"
+    stats += f"Arestas: {G.num_edges()}\n"
+    stats += f"Vértices (cruzamentos): {len(vertices)}\n"
+
+    try:
+        componentes = strongly_connected_components(G)
+        stats += f"Componentes fortemente conexas: {len(componentes)}"
+        stats += f" (maior: {len(componentes[0]) if componentes else 0} nós)\n"
+    except TypeError:
+        stats += f"Componentes fortemente conexas: não disponível para o grafo compacto\n"
+
+    if G.num_nodes() > 0:
+        # Cada aresta soma 1 ao grau de saída de um nó e 1 ao de entrada de outro
+        total_degree = 2 * G.num_edges()
+        avg_degree = total_degree / (2 * G.num_nodes())
+        stats += f"Grau médio: {avg_degree:.2f}\n"
+    return stats
+
 def run_app():
     root = tk.Tk()
     root.title("OptiRota - Interface OSM")
@@ -57,12 +158,12 @@ def run_app():
     east_entry.insert(0, "-35.66720")
 
     # Inputs para o Dijkstra
-    tk.Label(frame, text="Nó de Origem (ID):").grid(row=4, column=0, sticky="w", pady=(10, 0))
+    tk.Label(frame, text="Origem (ID ou lat,lon):").grid(row=4, column=0, sticky="w", pady=(10, 0))
     start_id_entry = tk.Entry(frame)
     start_id_entry.grid(row=4, column=1, sticky="ew", pady=(10, 0))
     start_id_entry.insert(0, "432674688") # Exemplo
     
-    tk.Label(frame, text="Nó de Destino (ID):").grid(row=5, column=0, sticky="w")
+    tk.Label(frame, text="Destino (ID ou lat,lon):").grid(row=5, column=0, sticky="w")
     end_id_entry = tk.Entry(frame)
     end_id_entry.grid(row=5, column=1, sticky="ew")
     end_id_entry.insert(0, "7044690950") # Exemplo
@@ -82,19 +183,21 @@ def run_app():
         "index_to_node_id": None
     }
     
-    def load_data():
-        """Carrega dados OSM e constrói o grafo usando RustworkX"""
-        bbox = (
+    # Rotas já calculadas no grafo atual (limpo a cada grafo novo)
+    route_cache = RouteCache()
+    
+    def read_bbox():
+        """Lê a bounding box dos campos (somente na thread do Tk)"""
+        return (
             float(south_entry.get()),
             float(west_entry.get()),
             float(north_entry.get()),
             float(east_entry.get())
         )
-        
-        data = get_osm_data(bbox)
-        
-        G, nodes, vertices, ways, node_id_to_index, index_to_node_id = build_graph(data)
-        
+
+    def store_loaded(graph_tuple):
+        """Guarda o grafo carregado (somente na thread do Tk)"""
+        G, nodes, vertices, ways, node_id_to_index, index_to_node_id = graph_tuple
         loaded_graph.update({
             "G": G, 
             "nodes": nodes, 
@@ -103,14 +206,38 @@ def run_app():
             "node_id_to_index": node_id_to_index,
             "index_to_node_id": index_to_node_id
         })
-        
-        return G, nodes, vertices, ways, node_id_to_index, index_to_node_id
+        route_cache.clear()
+
+    def current_graph():
+        return (
+            loaded_graph["G"],
+            loaded_graph["nodes"],
+            loaded_graph["vertices"],
+            loaded_graph["ways"],
+            loaded_graph["node_id_to_index"],
+            loaded_graph["index_to_node_id"],
+        )
+
+    def show_output(texto):
+        output_text.delete("1.0", tk.END)
+        output_text.insert(tk.END, texto)
     
     def show_connections():
         """Mostra as conexões do grafo RustworkX"""
         try:
-            G, nodes, vertices, ways, node_id_to_index, index_to_node_id = load_data()
+            bbox = read_bbox()
+        except ValueError as ve:
+            show_output(f"Erro nos valores de entrada: {str(ve)}")
+            return
+        offline = offline_var.get()
+        restricoes = restricoes_var.get()
+        base = current_graph()
+
+        def trabalho(progresso):
+            graph_tuple = load_data(bbox, offline, progresso, base, restricoes)
+            G, nodes, vertices, ways, node_id_to_index, index_to_node_id = graph_tuple
             
+            progresso("Listando cruzamentos")
             result = f"Total de vértices (cruzamentos reais): {len(vertices)}\n"
             result += f"Total de arestas: {G.num_edges()}\n"
             result += f"Total de nós no grafo: {G.num_nodes()}\n\n"
@@ -120,37 +247,48 @@ def run_app():
                 node_id_to_index, index_to_node_id, 
                 limit=20
             )
-            
-            output_text.delete("1.0", tk.END)
-            output_text.insert(tk.END, result)
-            
-        except ValueError as ve:
-            output_text.delete("1.0", tk.END)
-            output_text.insert(tk.END, f"Erro nos valores de entrada: {str(ve)}")
-        except Exception as e:
-            output_text.delete("1.0", tk.END)
-            output_text.insert(tk.END, f"Erro ao carregar dados: {str(e)}")
+            return graph_tuple, result
+
+        def concluir(resultado):
+            graph_tuple, result = resultado
+            store_loaded(graph_tuple)
+            show_output(result)
+
+        runner.submit(
+            "Mostrar Conexões", trabalho, concluir,
+            lambda e: show_output(f"Erro ao carregar dados: {str(e)}")
+        )
     
     def show_graph():
         """Exibe o grafo visualmente"""
-        try:
-            if loaded_graph["G"] is None:
-                G, nodes, vertices, ways, node_id_to_index, index_to_node_id = load_data()
-            else:
-                G, nodes, vertices, ways = (
-                    loaded_graph["G"],
-                    loaded_graph["nodes"],
-                    loaded_graph["vertices"],
-                    loaded_graph["ways"],
-                )
-                node_id_to_index = loaded_graph["node_id_to_index"]
-                index_to_node_id = loaded_graph["index_to_node_id"]
+        graph_tuple = current_graph()
+        if graph_tuple[0] is None:
+            try:
+                bbox = read_bbox()
+            except ValueError as ve:
+                show_output(f"Erro nos valores de entrada: {str(ve)}")
+                return
+            offline = offline_var.get()
+            restricoes = restricoes_var.get()
+        
+        def trabalho(progresso):
+            dados = graph_tuple
+            if dados[0] is None:
+                dados = load_data(bbox, offline, progresso, restricoes=restricoes)
+            G, nodes, vertices, ways, node_id_to_index, index_to_node_id = dados
             
+            progresso("Gerando HTML")
             plot_graph_with_names(G, nodes, ways, node_id_to_index, index_to_node_id)
-            
-        except Exception as e:
-            output_text.delete("1.0", tk.END)
-            output_text.insert(tk.END, f"Erro ao gerar grafo: {str(e)}")
+            return dados
+
+        def concluir(dados):
+            if loaded_graph["G"] is None:
+                store_loaded(dados)
+
+        runner.submit(
+            "Mostrar Grafo", trabalho, concluir,
+            lambda e: show_output(f"Erro ao gerar grafo: {str(e)}")
+        )
     
     def get_graph_statistics():
         """Função adicional para mostrar estatísticas detalhadas do grafo"""
@@ -163,21 +301,7 @@ def run_app():
             G = loaded_graph["G"]
             vertices = loaded_graph["vertices"]
             
-            stats = f"=== ESTATÍSTICAS DO GRAFO ===\n"
-            stats += f"Nós: {G.num_nodes()}\n"
-            stats += f"Arestas: {G.num_edges()}\n"
-            stats += f"Vértices (cruzamentos): {len(vertices)}\n"
-            
-            try:
-                components = len(list(G.connected_components())) if hasattr(G, 'connected_components') else "N/A"
-                stats += f"Componentes conectados: {components}\n"
-            except:
-                stats += f"Componentes conectados: Não disponível para grafos direcionados\n"
-            
-            if G.num_nodes() > 0:
-                total_degree = sum(len(G.out_edges(node_idx)) + len(G.in_edges(node_idx)) for node_idx in G.node_indices())
-                avg_degree = total_degree / (2 * G.num_nodes())
-                stats += f"Grau médio: {avg_degree:.2f}\n"
+            stats = graph_statistics(G, vertices)
             
             output_text.delete("1.0", tk.END)
             output_text.insert(tk.END, stats)
@@ -186,45 +310,92 @@ def run_app():
             output_text.delete("1.0", tk.END)
             output_text.insert(tk.END, f"Erro ao calcular estatísticas: {str(e)}")
 
-    # ... (código anterior)
-
     def find_shortest_path():
-        """Função para encontrar o menor caminho usando Dijkstra e plotá-lo"""
+        """Função para encontrar o menor caminho com o algoritmo escolhido e plotá-lo"""
+        if loaded_graph["G"] is None:
+            show_output("Carregue os dados primeiro usando 'Mostrar Conexões'")
+            return
+        
         try:
-            if loaded_graph["G"] is None:
-                output_text.delete("1.0", tk.END)
-                output_text.insert(tk.END, "Carregue os dados primeiro usando 'Mostrar Conexões'")
-                return
-            
-            start_id = int(start_id_entry.get())
-            end_id = int(end_id_entry.get())
-            
-            path, distance = dijkstra(
-                loaded_graph["G"],
+            start_id = parse_point(start_id_entry.get())
+            end_id = parse_point(end_id_entry.get())
+        except ValueError:
+            show_output("Erro: informe IDs de nós inteiros ou coordenadas no formato lat,lon.")
+            return
+        
+        nome_algoritmo = algoritmo_var.get()
+        perfil = PERFIS[perfil_var.get()]
+        escolhido = ALGORITMOS[nome_algoritmo]
+        algoritmo = lambda *args: escolhido(*args, profile=perfil)
+        G, nodes, vertices, ways, node_id_to_index, index_to_node_id = current_graph()
+
+        def trabalho(progresso):
+            if escolhido is turn_aware_route and not isinstance(G, CompactGraph):
+                # Rumos das conversões vêm da geometria dos ways (montado uma vez)
+                progresso("Indexando ruas")
+                get_edge_index(G, nodes, vertices, ways, node_id_to_index)
+            progresso(f"Calculando rota ({nome_algoritmo})")
+            path, distance = route_cache.route(
+                algoritmo,
+                (nome_algoritmo, perfil),
+                G,
                 start_id,
                 end_id,
-                loaded_graph["node_id_to_index"],
-                loaded_graph["index_to_node_id"]
+                node_id_to_index,
+                index_to_node_id
             )
             
-            output_text.delete("1.0", tk.END)
             if path:
-                result = f"Caminho encontrado de {start_id} para {end_id}:\n"
+                # Grafo simplificado: devolve os vértices fundidos ao caminho
+                path = expand_path(G, path, node_id_to_index)
+                progresso("Gerando HTML")
+                plot_path_only(path, nodes, ways, G.attrs["street_index"])
+            return path, distance
+
+        def concluir(resultado):
+            path, distance = resultado
+            if path:
+                # Coordenadas digitadas são mostradas junto do vértice escolhido
+                origem = path[0] if path[0] == start_id else f"{start_id} (nó {path[0]})"
+                destino = path[-1] if path[-1] == end_id else f"{end_id} (nó {path[-1]})"
+                result = f"Caminho encontrado de {origem} para {destino} ({nome_algoritmo}):\n"
                 result += " -> ".join(map(str, path))
-                result += f"\n\nDistância total: {distance:.2f} metros."
-                output_text.insert(tk.END, result)
-                plot_path_only(path, loaded_graph["nodes"], loaded_graph["ways"])
-            
+                if perfil == "distance":
+                    result += f"\n\nDistância total: {distance:.2f} metros."
+                else:
+                    result += f"\n\nTempo estimado ({perfil_var.get()}): {distance / 60:.1f} minutos."
+                estatisticas = route_cache.stats()
+                result += f"\nCache de rotas: {estatisticas['hits']} acertos, {estatisticas['misses']} faltas."
+                show_output(result)
             else:
-                output_text.insert(tk.END, f"Não foi possível encontrar um caminho entre {start_id} e {end_id}.")
-                
-        except ValueError:
-            output_text.delete("1.0", tk.END)
-            output_text.insert(tk.END, "Erro: Certifique-se de que os IDs dos nós são números inteiros válidos.")
-        except Exception as e:
-            output_text.delete("1.0", tk.END)
-            output_text.insert(tk.END, f"Erro ao calcular o caminho: {str(e)}")
+                show_output(f"Não foi possível encontrar um caminho entre {start_id} e {end_id}.")
+
+        runner.submit(
+            "Calcular Menor Caminho", trabalho, concluir,
+            lambda e: show_output(f"Erro ao calcular o caminho: {str(e)}")
+        )
     
+    def simplify():
+        """Poda componentes isoladas e funde cadeias de grau 2 do grafo carregado"""
+        if loaded_graph["G"] is None:
+            show_output("Carregue os dados primeiro usando 'Mostrar Conexões'")
+            return
+        graph_tuple = current_graph()
+
+        def trabalho(progresso):
+            progresso("Simplificando grafo")
+            return simplify_graph(graph_tuple)
+
+        def concluir(resultado):
+            graph_tuple, relatorio = resultado
+            store_loaded(graph_tuple)
+            show_output("=== SIMPLIFICAÇÃO DO GRAFO ===\n" + format_report(relatorio))
+
+        runner.submit(
+            "Simplificar Grafo", trabalho, concluir,
+            lambda e: show_output(f"Erro ao simplificar o grafo: {str(e)}")
+        )
+
     def clear_cache():
         """Limpa o cache de dados carregados"""
         loaded_graph.update({
@@ -235,9 +406,50 @@ def run_app():
             "node_id_to_index": None,
             "index_to_node_id": None
         })
+        route_cache.clear()
         output_text.delete("1.0", tk.END)
         output_text.insert(tk.END, "Cache limpo. Próxima operação recarregará os dados.")
     
+    def save_snapshot():
+        """Salva o grafo carregado em um snapshot binário (.npz)"""
+        if loaded_graph["G"] is None:
+            show_output("Carregue os dados primeiro usando 'Mostrar Conexões'")
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".npz", filetypes=[("Snapshot OptiRota", "*.npz")])
+        if not path:
+            return
+        graph_tuple = current_graph()
+
+        def trabalho(progresso):
+            progresso("Salvando snapshot")
+            save_graph(path, *graph_tuple, checksum=graph_tuple[0].attrs.get("source_checksum"))
+
+        runner.submit(
+            "Salvar Snapshot", trabalho,
+            lambda _: show_output(f"Snapshot salvo em: {path}"),
+            lambda e: show_output(f"Erro ao salvar snapshot: {str(e)}")
+        )
+
+    def open_snapshot():
+        """Carrega um grafo pré-construído, sem baixar nem reconstruir"""
+        path = filedialog.askopenfilename(filetypes=[("Snapshot OptiRota", "*.npz")])
+        if not path:
+            return
+
+        def trabalho(progresso):
+            progresso("Carregando snapshot")
+            return load_graph(path)
+
+        def concluir(graph_tuple):
+            store_loaded(graph_tuple)
+            G = graph_tuple[0]
+            show_output(f"Snapshot carregado: {G.num_nodes()} nós, {G.num_edges()} arestas.")
+
+        runner.submit(
+            "Abrir Snapshot", trabalho, concluir,
+            lambda e: show_output(f"Erro ao carregar snapshot: {str(e)}")
+        )
+
     # Layout dos botões em grid
     button_frame = tk.Frame(frame)
     button_frame.grid(row=6, column=0, columnspan=2, pady=10, sticky="ew")
@@ -277,6 +489,58 @@ def run_app():
         text="Limpar Cache", 
         command=clear_cache
     ).grid(row=1, column=2, padx=5, pady=(10, 0), sticky="ew")
+
+    # Modo offline: usa apenas respostas Overpass já salvas em disco
+    offline_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(
+        button_frame,
+        text="Modo offline (somente cache local)",
+        variable=offline_var
+    ).grid(row=2, column=0, columnspan=2, pady=(5, 0), sticky="w")
+
+    # Baixar também as restrições de conversão (relações type=restriction)
+    restricoes_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(
+        button_frame,
+        text="Restrições de conversão",
+        variable=restricoes_var
+    ).grid(row=2, column=2, pady=(5, 0), sticky="w")
+
+    tk.Button(
+        button_frame,
+        text="Salvar Snapshot",
+        command=save_snapshot
+    ).grid(row=4, column=0, padx=5, pady=(10, 0), sticky="ew")
+
+    tk.Button(
+        button_frame,
+        text="Carregar Snapshot",
+        command=open_snapshot
+    ).grid(row=4, column=1, padx=5, pady=(10, 0), sticky="ew")
+
+    tk.Button(
+        button_frame,
+        text="Simplificar Grafo",
+        command=simplify
+    ).grid(row=4, column=2, padx=5, pady=(10, 0), sticky="ew")
+
+    # Escolha do algoritmo de menor caminho
+    algoritmo_var = tk.StringVar(value="Dijkstra")
+    tk.Label(button_frame, text="Algoritmo:").grid(row=3, column=0, padx=5, sticky="w")
+    tk.OptionMenu(
+        button_frame,
+        algoritmo_var,
+        *ALGORITMOS.keys()
+    ).grid(row=3, column=1, columnspan=2, padx=5, sticky="ew")
+
+    # Perfil de custo, trocado a cada consulta sem reconstruir o grafo
+    perfil_var = tk.StringVar(value="Distância")
+    tk.Label(button_frame, text="Perfil:").grid(row=5, column=0, padx=5, sticky="w")
+    tk.OptionMenu(
+        button_frame,
+        perfil_var,
+        *PERFIS.keys()
+    ).grid(row=5, column=1, columnspan=2, padx=5, sticky="ew")
     
 
     status_frame = tk.Frame(frame)
@@ -284,8 +548,14 @@ def run_app():
     
     status_label = tk.Label(status_frame, text="Pronto - Digite as coordenadas e clique em 'Mostrar Conexões'", relief=tk.SUNKEN, anchor=tk.W)
     status_label.pack(fill=tk.X)
+
+    # Tarefas pesadas rodam fora da thread do Tk; o status mostra as etapas e tempos
+    runner = BackgroundRunner(root, lambda texto: status_label.config(text=texto))
     
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        runner.shutdown()
 
 # Função auxiliar para compatibilidade
 def get_graph_info_rustworkx(G):
@@ -0,0 +1,494 @@
+"""
+Modo serviço: API HTTP/JSON local com o grafo carregado uma única vez.
+
+O snapshot (src.Grafo.snapshot) é aberto no processo principal, que
+responde /nearest e mantém o cache de rotas, e em cada processo do pool,
+que roda as buscas. Consultas de rota que chegam juntas são agrupadas em
+lotes (RequestBatcher) para dividir o custo de envio ao pool.
+
+Uso (na raiz do projeto):
+    python -m src.Interface.servico grafo.npz --port 8080 --workers 4
+
+Endpoints:
+    GET  /route?origem=<id|lat,lon>&destino=<id|lat,lon>&algoritmo=dijkstra&perfil=distance
+    POST /route    {"origem": 123 | [lat, lon], "destino": ..., "algoritmo": ..., "perfil": ...}
+    POST /matrix   {"sources": [...], "targets": [...], "perfil": ...}
+    GET  /nearest?lat=<lat>&lon=<lon>&k=1
+    GET  /stats    histogramas de latência, lotes e cache
+    GET  /health
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import math
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+from src.Grafo.snapshot import load_graph
+from src.Grafo.compacto import CompactGraph
+from src.Grafo.espacial import get_spatial_index, get_edge_index
+from src.Grafo.perfis import PROFILES, DEFAULT_PROFILE
+from src.Grafo.simplificar import expand_path
+from src.Algoritimos.dijkstra import dijkstra
+from src.Algoritimos.astar import astar
+from src.Algoritimos.contraction import ch_shortest_path
+from src.Algoritimos.conversoes import turn_aware_route
+from src.Algoritimos.matriz import distance_matrix
+from src.Algoritimos.cache_rotas import RouteCache, graph_fingerprint
+
+ALGORITMOS = {
+    "dijkstra": dijkstra,
+    "bidirectional": lambda *args, **kwargs: dijkstra(*args, bidirectional=True, **kwargs),
+    "astar": astar,
+    "ch": ch_shortest_path,
+    "turns": turn_aware_route,
+}
+DEFAULT_MAX_BATCH = 32
+MAX_NEAREST = 100                   # limite de k em /nearest
+DEFAULT_MAX_WAIT = 0.002            # segundos esperando o lote encher
+LIMITES_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+MAX_CORPO = 16 * 1024 * 1024        # 16 MB
+
+
+class RequestError(ValueError):
+    """Requisição inválida (responde 400)"""
+
+
+# --- Estado de cada processo do pool (grafo aberto uma única vez) ---
+_worker = {}
+
+
+def _init_worker(snapshot):
+    _worker["grafo"] = load_graph(snapshot)
+
+
+def _rotas_em_lote(consultas):
+    """
+    Roda um lote de (origem, destino, algoritmo, perfil) no processo do pool.
+    Devolve (pid, [(caminho, distância, erro)]); erro é None ou
+    (da_requisicao, mensagem): ValueError vem da consulta (400), o resto é
+    falha interna (500).
+    """
+    G, nodes, vertices, ways, node_id_to_index, index_to_node_id = _worker["grafo"]
+    resultados = []
+    for origem, destino, algoritmo, perfil in consultas:
+        try:
+            if algoritmo == "turns" and not isinstance(G, CompactGraph):
+                # Rumos das conversões vêm da geometria dos ways (montado uma vez)
+                get_edge_index(G, nodes, vertices, ways, node_id_to_index)
+            caminho, distancia = ALGORITMOS[algoritmo](G, origem, destino, node_id_to_index,
+                                                       index_to_node_id, profile=perfil)
+            resultados.append((expand_path(G, caminho, node_id_to_index), distancia, None))
+        except ValueError as e:
+            resultados.append((None, float('inf'), (True, str(e))))
+        except Exception as e:
+            resultados.append((None, float('inf'), (False, f"{type(e).__name__}: {e}")))
+    return os.getpid(), resultados
+
+
+def _matriz(sources, targets, perfil):
+    G, _, _, _, node_id_to_index, index_to_node_id = _worker["grafo"]
+    return distance_matrix(G, sources, targets, node_id_to_index, index_to_node_id,
+                           processes=1, profile=perfil).tolist()
+
+
+def _finito(valor):
+    """JSON não tem inf: distâncias inalcançáveis viram null"""
+    return valor if math.isfinite(valor) else None
+
+
+class LatencyHistogram:
+    """
+    Histograma de latências com faixas fixas (ms). Os quantis são estimados
+    pelo limite superior da faixa em que caem (o máximo, na última).
+    """
+
+    def __init__(self, limites=LIMITES_MS):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)
+        self.total = 0
+        self.soma = 0.0
+        self.maximo = 0.0
+
+    def observe(self, segundos):
+        ms = segundos * 1000
+        self.contagens[bisect.bisect_left(self.limites, ms)] += 1
+        self.total += 1
+        self.soma += ms
+        self.maximo = max(self.maximo, ms)
+
+    def quantile(self, q):
+        if not self.total:
+            return None
+        alvo = q * self.total
+        acumulado = 0
+        for k, contagem in enumerate(self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo and contagem:
+                return self.limites[k] if k < len(self.limites) else self.maximo
+        return self.maximo
+
+    def snapshot(self):
+        faixas = {f"<={limite}": c for limite, c in zip(self.limites, self.contagens)}
+        faixas["+inf"] = self.contagens[-1]
+        return {
+            "count": self.total,
+            "mean_ms": self.soma / self.total if self.total else None,
+            "max_ms": self.maximo,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "buckets": faixas,
+        }
+
+
+class RequestBatcher:
+    """
+    Agrupa itens enviados quase ao mesmo tempo: o primeiro item abre um lote,
+    que é despachado ao atingir max_batch itens ou depois de max_wait
+    segundos. executar(lista) é uma corrotina que devolve um resultado por
+    item, na mesma ordem. Vários lotes podem estar em andamento ao mesmo tempo.
+    """
+
+    def __init__(self, executar, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT):
+        self.executar = executar
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.lotes = 0
+        self.itens = 0
+        self.maior_lote = 0
+        self._fila = asyncio.Queue()
+        self._coletor = asyncio.create_task(self._coletar())
+        self._pendentes = set()
+
+    async def submit(self, item):
+        futuro = asyncio.get_running_loop().create_future()
+        await self._fila.put((item, futuro))
+        return await futuro
+
+    async def _coletar(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = [await self._fila.get()]
+            prazo = loop.time() + self.max_wait
+            while len(lote) < self.max_batch:
+                restante = prazo - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(await asyncio.wait_for(self._fila.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+            tarefa = asyncio.create_task(self._despachar(lote))
+            self._pendentes.add(tarefa)
+            tarefa.add_done_callback(self._pendentes.discard)
+
+    async def _despachar(self, lote):
+        self.lotes += 1
+        self.itens += len(lote)
+        self.maior_lote = max(self.maior_lote, len(lote))
+        try:
+            resultados = await self.executar([item for item, _ in lote])
+        except Exception as e:
+            for _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+        for (_, futuro), resultado in zip(lote, resultados):
+            if not futuro.done():
+                futuro.set_result(resultado)
+
+    def stats(self):
+        return {
+            "batches": self.lotes,
+            "items": self.itens,
+            "mean_batch": self.itens / self.lotes if self.lotes else None,
+            "max_batch": self.maior_lote,
+        }
+
+    async def close(self):
+        self._coletor.cancel()
+        for tarefa in list(self._pendentes):
+            await tarefa
+
+
+def _ponto(valor, nome):
+    """ID de nó (int ou "123") ou coordenada ("lat,lon" ou [lat, lon])"""
+    try:
+        if isinstance(valor, (list, tuple)):
+            lat, lon = valor
+            return float(lat), float(lon)
+        if isinstance(valor, str) and "," in valor:
+            lat, lon = valor.split(",")
+            return float(lat), float(lon)
+        if isinstance(valor, bool):
+            raise ValueError
+        return int(valor)
+    except (TypeError, ValueError):
+        raise RequestError(f"'{nome}' deve ser um ID de nó ou uma coordenada lat,lon") from None
+
+
+class RoutingService:
+    """
+    Lógica do serviço, independente do HTTP: cada método devolve um dict
+    pronto para JSON. workers > 0 usa um pool de processos (as buscas são
+    CPU-bound e o GIL serializaria threads); workers=0 roda as buscas numa
+    thread do próprio processo (útil em testes e máquinas pequenas).
+    """
+
+    def __init__(self, snapshot, workers=None, max_batch=DEFAULT_MAX_BATCH,
+                 max_wait=DEFAULT_MAX_WAIT, cache=None):
+        self.snapshot = snapshot
+        self.grafo = load_graph(snapshot)
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.cache = cache if cache is not None else RouteCache()
+        self.latencias = defaultdict(LatencyHistogram)
+        self._executor = None
+        self._lote_rotas = None
+        self._pids = set()  # processos que já atenderam algum lote
+
+    async def start(self):
+        if self.workers > 0:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                 initargs=(self.snapshot,))
+        else:
+            _worker["grafo"] = self.grafo
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="optirota-servico")
+        self._lote_rotas = RequestBatcher(self._executar_lote, self.max_batch, self.max_wait)
+        # Índice espacial pronto antes da primeira consulta
+        get_spatial_index(self.grafo[0], self.grafo[5])
+
+    async def close(self):
+        if self._lote_rotas is not None:
+            await self._lote_rotas.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    async def _executar_lote(self, consultas):
+        """
+        Divide o lote em até workers pedaços enviados ao pool ao mesmo tempo:
+        o lote junta o envio das consultas, mas não as serializa num só
+        processo enquanto os outros ficam parados.
+        """
+        loop = asyncio.get_running_loop()
+        tamanho = math.ceil(len(consultas) / max(1, min(self.workers, len(consultas))))
+        pedacos = await asyncio.gather(*(
+            loop.run_in_executor(self._executor, _rotas_em_lote, consultas[k:k + tamanho])
+            for k in range(0, len(consultas), tamanho)))
+        resultados = []
+        for pid, parte in pedacos:
+            self._pids.add(pid)
+            resultados.extend(parte)
+        return resultados
+
+    async def route(self, origem, destino, algoritmo="dijkstra", perfil=DEFAULT_PROFILE):
+        origem, destino = _ponto(origem, "origem"), _ponto(destino, "destino")
+        if algoritmo not in ALGORITMOS:
+            raise RequestError(f"algoritmo desconhecido: {algoritmo} (opções: {', '.join(ALGORITMOS)})")
+        if perfil not in PROFILES:
+            raise RequestError(f"perfil desconhecido: {perfil} (opções: {', '.join(PROFILES)})")
+
+        chave = (graph_fingerprint(self.grafo[0]), origem, destino, (algoritmo, perfil))
+        resultado = self.cache.get(chave)
+        if resultado is None:
+            caminho, distancia, erro = await self._lote_rotas.submit((origem, destino, algoritmo, perfil))
+            if erro is not None:
+                da_requisicao, mensagem = erro
+                raise (RequestError if da_requisicao else RuntimeError)(mensagem)
+            self.cache.put(chave, caminho, distancia)
+        else:
+            caminho, distancia = resultado
+        return {"path": caminho, "distance": _finito(distancia), "algoritmo": algoritmo, "perfil": perfil}
+
+    async def matrix(self, sources, targets, perfil=DEFAULT_PROFILE):
+        if not isinstance(sources, list) or not isinstance(targets, list):
+            raise RequestError("'sources' e 'targets' devem ser listas")
+        if perfil not in PROFILES:
+            raise RequestError(f"perfil desconhecido: {perfil} (opções: {', '.join(PROFILES)})")
+        sources = [_ponto(s, "sources") for s in sources]
+        targets = [_ponto(t, "targets") for t in targets]
+        loop = asyncio.get_running_loop()
+        linhas = await loop.run_in_executor(self._executor, _matriz, sources, targets, perfil)
+        return {"distances": [[_finito(d) for d in linha] for linha in linhas], "perfil": perfil}
+
+    def nearest(self, lat, lon, k=1):
+        G, nodes, _, _, _, index_to_node_id = self.grafo
+        try:
+            lat, lon, k = float(lat), float(lon), int(k)
+        except (TypeError, ValueError):
+            raise RequestError("'lat', 'lon' e 'k' devem ser números") from None
+        if k < 1:
+            raise RequestError("'k' deve ser pelo menos 1")
+        k = min(k, MAX_NEAREST)
+        achados = get_spatial_index(G, index_to_node_id).k_nearest(lat, lon, k)
+        return {"nodes": [{"id": nid, "lat": nodes[nid][0], "lon": nodes[nid][1], "distance": dist}
+                          for nid, dist in achados]}
+
+    def stats(self):
+        G = self.grafo[0]
+        return {
+            "graph": {"nodes": G.num_nodes(), "edges": G.num_edges()},
+            "workers": self.workers,
+            "worker_pids": sorted(self._pids),
+            "latency": {rota: h.snapshot() for rota, h in sorted(self.latencias.items())},
+            "batching": self._lote_rotas.stats() if self._lote_rotas else None,
+            "cache": self.cache.stats(),
+        }
+
+    async def handle(self, metodo, alvo, corpo=b""):
+        """(status, dict) de uma requisição; registra a latência por endpoint"""
+        inicio = time.perf_counter()
+        partes = urlsplit(alvo)
+        rota = partes.path.rstrip("/") or "/"
+        query = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+        try:
+            status, resposta = 200, await self._despachar(metodo, rota, query, corpo)
+        except RequestError as e:
+            status, resposta = 400, {"error": str(e)}
+        except LookupError as e:
+            status, resposta = 404, {"error": str(e)}
+        except Exception as e:
+            status, resposta = 500, {"error": f"{type(e).__name__}: {e}"}
+        if status != 404:
+            self.latencias[rota].observe(time.perf_counter() - inicio)
+        return status, resposta
+
+    async def _despachar(self, metodo, rota, query, corpo):
+        parametros = dict(query)
+        if metodo == "POST":
+            try:
+                dados = json.loads(corpo or b"{}")
+            except ValueError:
+                raise RequestError("corpo JSON inválido") from None
+            if not isinstance(dados, dict):
+                raise RequestError("o corpo deve ser um objeto JSON")
+            parametros.update(dados)
+        elif metodo != "GET":
+            raise RequestError(f"método não suportado: {metodo}")
+
+        if rota == "/route":
+            if "origem" not in parametros or "destino" not in parametros:
+                raise RequestError("informe 'origem' e 'destino'")
+            return await self.route(parametros["origem"], parametros["destino"],
+                                    parametros.get("algoritmo", "dijkstra"),
+                                    parametros.get("perfil", DEFAULT_PROFILE))
+        if rota == "/matrix":
+            return await self.matrix(parametros.get("sources"), parametros.get("targets"),
+                                     parametros.get("perfil", DEFAULT_PROFILE))
+        if rota == "/nearest":
+            return self.nearest(parametros.get("lat"), parametros.get("lon"), parametros.get("k", 1))
+        if rota == "/stats":
+            return self.stats()
+        if rota == "/health":
+            return {"status": "ok"}
+        raise LookupError(f"rota desconhecida: {rota}")
+
+
+# --- Camada HTTP/1.1 mínima sobre asyncio (sem dependências externas) ---
+_MOTIVOS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+            500: "Internal Server Error"}
+
+
+async def _ler_requisicao(reader):
+    """(método, alvo, cabeçalhos, corpo) ou None se a conexão fechou"""
+    linha = await reader.readline()
+    if not linha:
+        return None
+    try:
+        metodo, alvo, versao = linha.decode("latin-1").split()
+    except ValueError:
+        raise RequestError("linha de requisição inválida") from None
+    cabecalhos = {}
+    while True:
+        linha = await reader.readline()
+        if linha in (b"\r\n", b"\n", b""):
+            break
+        nome, _, valor = linha.decode("latin-1").partition(":")
+        cabecalhos[nome.strip().lower()] = valor.strip()
+    tamanho = int(cabecalhos.get("content-length", 0) or 0)
+    if tamanho > MAX_CORPO:
+        raise OverflowError
+    corpo = await reader.readexactly(tamanho) if tamanho else b""
+    cabecalhos[":version"] = versao
+    return metodo.upper(), alvo, cabecalhos, corpo
+
+
+def _resposta(status, dados, manter):
+    corpo = json.dumps(dados, ensure_ascii=False, allow_nan=False).encode("utf-8")
+    cabecalho = (f"HTTP/1.1 {status} {_MOTIVOS.get(status, '')}\r\n"
+                 "Content-Type: application/json; charset=utf-8\r\n"
+                 f"Content-Length: {len(corpo)}\r\n"
+                 f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n")
+    return cabecalho.encode("latin-1") + corpo
+
+
+async def _tratar_conexao(service, reader, writer):
+    try:
+        while True:
+            try:
+                requisicao = await _ler_requisicao(reader)
+            except (RequestError, ValueError):
+                writer.write(_resposta(400, {"error": "requisição HTTP inválida"}, False))
+                break
+            except OverflowError:
+                writer.write(_resposta(413, {"error": "corpo grande demais"}, False))
+                break
+            if requisicao is None:
+                break
+            metodo, alvo, cabecalhos, corpo = requisicao
+            conexao = cabecalhos.get("connection", "").lower()
+            manter = conexao != "close" and (cabecalhos[":version"] != "HTTP/1.0" or conexao == "keep-alive")
+            status, dados = await service.handle(metodo, alvo, corpo)
+            writer.write(_resposta(status, dados, manter))
+            await writer.drain()
+            if not manter:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(service, host="127.0.0.1", port=8080):
+    """Inicia o serviço e o servidor HTTP; devolve o asyncio.Server"""
+    await service.start()
+    return await asyncio.start_server(lambda r, w: _tratar_conexao(service, r, w), host, port)
+
+
+async def _rodar(args):
+    service = RoutingService(args.snapshot, workers=args.workers,
+                             max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000)
+    servidor = await serve(service, args.host, args.port)
+    G = service.grafo[0]
+    print(f"OptiRota: {G.num_nodes()} nós, {G.num_edges()} arestas, {service.workers} workers "
+          f"em http://{args.host}:{args.port}")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        await service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API HTTP/JSON de rotas sobre um snapshot do grafo")
+    parser.add_argument("snapshot", help="arquivo .npz salvo com save_graph")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processos de busca (padrão: número de CPUs; 0 = thread local)")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT * 1000)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_rodar(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BackgroundRunner:
+    """
+    Executa tarefas pesadas (download, construção do grafo, roteamento,
+    geração do HTML) fora da thread principal do Tk.
+
+    A thread de trabalho nunca toca nos widgets: ela só coloca mensagens numa
+    fila, que a thread do Tk esvazia periodicamente via root.after. Uma tarefa
+    com o mesmo nome de outra ainda em andamento é ignorada (cliques repetidos
+    não enfileiram trabalho duplicado).
+    """
+
+    def __init__(self, root, on_status, intervalo_ms=100):
+        self.root = root
+        self.on_status = on_status
+        self.intervalo_ms = intervalo_ms
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="optirota")
+        self._mensagens = queue.Queue()
+        self._ativas = set()
+        self._lock = threading.Lock()
+        self.root.after(self.intervalo_ms, self._poll)
+
+    def is_running(self, nome):
+        with self._lock:
+            return nome in self._ativas
+
+    def submit(self, nome, trabalho, ao_concluir, ao_falhar):
+        """
+        trabalho(progresso) roda na thread de trabalho; progresso("etapa")
+        marca o início de uma nova etapa. ao_concluir(resultado) e
+        ao_falhar(exceção) rodam na thread do Tk.
+
+        Retorna False se uma tarefa com o mesmo nome já estiver em andamento.
+        """
+        with self._lock:
+            if nome in self._ativas:
+                self.on_status(f"{nome}: já em andamento, clique ignorado")
+                return False
+            self._ativas.add(nome)
+
+        self.on_status(f"{nome}: na fila...")
+        self._executor.submit(self._executar, nome, trabalho, ao_concluir, ao_falhar)
+        return True
+
+    def _executar(self, nome, trabalho, ao_concluir, ao_falhar):
+        etapas = []  # (etapa, início)
+
+        def tempos():
+            agora = time.perf_counter()
+            partes = []
+            for k, (etapa, inicio) in enumerate(etapas):
+                fim = etapas[k + 1][1] if k + 1 < len(etapas) else agora
+                partes.append(f"{etapa} {fim - inicio:.2f}s")
+            return " | ".join(partes)
+
+        def progresso(etapa):
+            etapas.append((etapa, time.perf_counter()))
+            self._mensagens.put((self.on_status, (f"{nome}: {etapa}... ({tempos()})",)))
+
+        try:
+            resultado = trabalho(progresso)
+        except Exception as e:
+            self._mensagens.put((self._finalizar, (nome, ao_falhar, e, f"{nome}: erro ({tempos()})")))
+        else:
+            self._mensagens.put((self._finalizar, (nome, ao_concluir, resultado, f"{nome}: concluído ({tempos()})")))
+
+    def _finalizar(self, nome, callback, valor, status):
+        with self._lock:
+            self._ativas.discard(nome)
+        try:
+            self.on_status(status)
+        finally:
+            callback(valor)
+
+    def _poll(self):
+        # O Tk engole exceções de callbacks do after: o reagendamento fica no
+        # finally e cada mensagem é isolada, senão um retorno com erro
+        # deixaria todas as tarefas seguintes presas na fila
+        try:
+            while True:
+                try:
+                    funcao, args = self._mensagens.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    funcao(*args)
+                except Exception as e:
+                    self._relatar_erro(e)
+        finally:
+            self.root.after(self.intervalo_ms, self._poll)
+
+    def _relatar_erro(self, erro):
+        try:
+            self.on_status(f"erro ao tratar o resultado de uma tarefa: {erro}")
+        except Exception:
+            pass
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
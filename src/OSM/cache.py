@@ -0,0 +1,178 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+
+# Diretório padrão do cache (pode ser sobrescrito pela variável de ambiente)
+DEFAULT_CACHE_DIR = os.environ.get(
+    "OPTIROTA_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "optirota", "overpass")
+)
+DEFAULT_TTL = 7 * 24 * 3600          # 7 dias
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
+
+
+def normalize_bbox(bbox):
+    """Normaliza a bbox para que variações de formatação gerem a mesma chave"""
+    return tuple(round(float(c), 6) for c in bbox)
+
+
+def normalize_query(query):
+    """Remove espaços irrelevantes da consulta Overpass"""
+    return "\n".join(line.strip() for line in query.strip().splitlines() if line.strip())
+
+
+def cache_key(bbox, query):
+    """Chave endereçada por conteúdo: hash da bbox normalizada + texto da consulta"""
+    bbox_norm = ",".join(f"{c:.6f}" for c in normalize_bbox(bbox))
+    conteudo = f"{bbox_norm}\n{normalize_query(query)}"
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+class OverpassCache:
+    """
+    Cache local em disco para respostas da Overpass API.
+
+    Cada resposta é gravada como JSON comprimido (gzip) em um arquivo cujo nome
+    é a chave de conteúdo. O mtime do arquivo guarda o momento da gravação (TTL)
+    e o atime guarda o último acesso (despejo LRU quando excede max_bytes).
+    """
+
+    def __init__(self, diretorio=DEFAULT_CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.diretorio = diretorio
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.json.gz")
+
+    def _valido(self, chave, ignorar_ttl):
+        """Caminho da entrada se existir e não estiver expirada (marca o acesso)"""
+        caminho = self._caminho(chave)
+        try:
+            stat = os.stat(caminho)
+        except FileNotFoundError:
+            return None
+
+        agora = time.time()
+        if not ignorar_ttl and self.ttl is not None and agora - stat.st_mtime > self.ttl:
+            self._remover(caminho)
+            return None
+
+        # Atualiza o atime (último acesso) preservando o mtime (gravação)
+        try:
+            os.utime(caminho, (agora, stat.st_mtime))
+        except OSError:
+            pass
+        return caminho
+
+    def get(self, chave, ignorar_ttl=False):
+        caminho = self._valido(chave, ignorar_ttl)
+        if caminho is None:
+            return None
+
+        try:
+            with gzip.open(caminho, "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # Arquivo corrompido/incompleto: descarta
+            self._remover(caminho)
+            return None
+
+    def open(self, chave, ignorar_ttl=False):
+        """Arquivo (binário, já descomprimido) da entrada, para leitura em streaming"""
+        caminho = self._valido(chave, ignorar_ttl)
+        if caminho is None:
+            return None
+        try:
+            return gzip.open(caminho, "rb")
+        except OSError:
+            self._remover(caminho)
+            return None
+
+    @contextmanager
+    def writer(self, chave):
+        """
+        Grava uma entrada aos poucos (bytes do JSON). Só é confirmada se o bloco
+        terminar sem erro; uma interrupção descarta o arquivo parcial.
+        """
+        os.makedirs(self.diretorio, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.diretorio, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                yield f
+            os.replace(tmp, self._caminho(chave))
+        except BaseException:
+            self._remover(tmp)
+            raise
+        self._despejar()
+
+    def put(self, chave, data):
+        # Escrita atômica: grava em arquivo temporário e renomeia
+        with self.writer(chave) as f:
+            f.write(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+    def clear(self):
+        for caminho, _ in self._entradas():
+            self._remover(caminho)
+
+    def tamanho_total(self):
+        return sum(stat.st_size for _, stat in self._entradas())
+
+    def _entradas(self):
+        try:
+            nomes = os.listdir(self.diretorio)
+        except FileNotFoundError:
+            return []
+        entradas = []
+        for nome in nomes:
+            if not nome.endswith(".json.gz"):
+                continue
+            caminho = os.path.join(self.diretorio, nome)
+            try:
+                entradas.append((caminho, os.stat(caminho)))
+            except FileNotFoundError:
+                continue
+        return entradas
+
+    def _despejar(self):
+        """Remove entradas expiradas e, se necessário, as menos usadas recentemente"""
+        agora = time.time()
+        vivas = []
+        for caminho, stat in self._entradas():
+            if self.ttl is not None and agora - stat.st_mtime > self.ttl:
+                self._remover(caminho)
+            else:
+                vivas.append((caminho, stat))
+
+        if self.max_bytes is None:
+            return
+
+        total = sum(stat.st_size for _, stat in vivas)
+        # Menor atime primeiro = menos usado recentemente
+        for caminho, stat in sorted(vivas, key=lambda e: e[1].st_atime):
+            if total <= self.max_bytes:
+                break
+            self._remover(caminho)
+            total -= stat.st_size
+
+    @staticmethod
+    def _remover(caminho):
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = OverpassCache()
+    return _default_cache
@@ -1,8 +1,13 @@
+import time
 import requests
+from src.OSM.cache import cache_key, get_default_cache
 
+OVERPASS_URL = "http://overpass-api.de/api/interpreter"
+# Respostas da Overpass que valem nova tentativa (sobrecarga/limite de taxa)
+RETRY_STATUS = {429, 502, 503, 504}
 
-def get_osm_data(bbox):
-    overpass_url = "http://overpass-api.de/api/interpreter"
+
+def build_query(bbox, restrictions=False):
     query = f"""
     [out:json];
     way["highway"]({bbox[0]},{bbox[1]},{bbox[2]},{bbox[3]});
@@ -10,10 +15,71 @@ def get_osm_data(bbox):
     >;
     out skel qt;
     """
-    response = requests.get(overpass_url, params={'data': query})
-    return response.json()
+    if restrictions:
+        # Relações de restrição de conversão (proibida/obrigatória) na bbox
+        query += f"""rel["type"="restriction"]({bbox[0]},{bbox[1]},{bbox[2]},{bbox[3]});
+    out body;
+    """
+    return query
+
+def request_with_retry(http, url, query, retries=0, backoff=1.0, timeout=None):
+    """
+    GET na Overpass com novas tentativas (espera exponencial: backoff, 2*backoff, ...)
+    em falhas de conexão, timeout e status de sobrecarga.
+    """
+    for tentativa in range(retries + 1):
+        ultima = tentativa == retries
+        try:
+            response = http.get(url, params={'data': query}, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            if ultima:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUS or ultima:
+                return response
+        time.sleep(backoff * (2 ** tentativa))
+
+def get_osm_data(bbox, cache=None, use_cache=True, offline=False,
+                 session=None, url=OVERPASS_URL, retries=0, backoff=1.0, timeout=None,
+                 restrictions=False):
+    """
+    Consulta a Overpass API usando o cache local em disco.
+
+    offline=True nunca acessa a rede: retorna a resposta em cache (mesmo que
+    expirada) ou levanta ConnectionError se a bbox nunca foi baixada.
+    session permite reutilizar um requests.Session (pool de conexões).
+    restrictions=True inclui as relações type=restriction (conversões).
+    """
+    query = build_query(bbox, restrictions)
+
+    if use_cache or offline:
+        cache = cache or get_default_cache()
+        chave = cache_key(bbox, query)
+        data = cache.get(chave, ignorar_ttl=offline)
+        if data is not None:
+            return data
+        if offline:
+            raise ConnectionError(f"Modo offline: bbox {tuple(bbox)} não está no cache")
+
+    response = request_with_retry(session or requests, url, query, retries, backoff, timeout)
+    data = response.json()
+
+    if use_cache and response.ok:
+        cache.put(chave, data)
+    return data
+
+def get_street_index(G):
+    """Retorna o índice nó -> nomes de rua gerado por build_graph (ou None)"""
+    attrs = getattr(G, "attrs", None)
+    if isinstance(attrs, dict):
+        return attrs.get("street_index")
+    return None
+
+def get_node_street_name(node_id, ways, street_index=None):
+    if street_index is not None:
+        nome = street_index.get(node_id)
+        return nome if nome is not None else f"rua sem nome (Node {node_id})"
 
-def get_node_street_name(node_id, ways):
     ruas = set()
     for way in ways:
         if node_id in way["nodes"]:
@@ -26,6 +92,7 @@ def get_node_street_name(node_id, ways):
 
 def print_crossings(G, nodes, vertices, ways, node_id_to_index, index_to_node_id, limit=None):
     count = 0
+    street_index = get_street_index(G)
     
     for vertex_id in vertices:
         if vertex_id not in node_id_to_index:
@@ -38,7 +105,7 @@ def print_crossings(G, nodes, vertices, ways, node_id_to_index, index_to_node_id
         except IndexError:
             continue
         
-        nome_cruzamento = get_node_street_name(vertex_id, ways)
+        nome_cruzamento = get_node_street_name(vertex_id, ways, street_index)
         lat, lon = nodes[vertex_id]
         
         print(f" \nNode ID: {vertex_id}\nCruzamento: {nome_cruzamento} ({lat:.6f}, {lon:.6f}) conecta para:")
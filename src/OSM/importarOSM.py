@@ -0,0 +1,166 @@
+import bz2
+import gzip
+import xml.etree.ElementTree as ET
+from array import array
+import numpy as np
+
+
+def _in_bbox(lat, lon, bbox):
+    return bbox[0] <= lat <= bbox[2] and bbox[1] <= lon <= bbox[3]
+
+
+def _is_named_highway(tags):
+    # Mesmo filtro de build_graph: ruas (highway) com nome
+    return "highway" in tags and "name" in tags
+
+
+def _sorted_refs(refs):
+    """IDs (array('q') com repetições) -> array NumPy ordenado e sem repetições"""
+    return np.unique(np.frombuffer(refs, dtype=np.int64)) if len(refs) else np.zeros(0, dtype=np.int64)
+
+
+def _referenced(ids_ordenados, nid):
+    k = np.searchsorted(ids_ordenados, nid)
+    return k < len(ids_ordenados) and ids_ordenados[k] == nid
+
+
+def _clip_way(way_id, refs, tags, coords):
+    """
+    Recorta o way na bbox: cada trecho contínuo de nós dentro da bbox (com 2+
+    nós) vira um way. Trechos além do primeiro recebem "part" para distingui-los.
+    """
+    trechos = []
+    atual = []
+    for ref in refs:
+        if ref in coords:
+            atual.append(ref)
+        else:
+            if len(atual) > 1:
+                trechos.append(atual)
+            atual = []
+    if len(atual) > 1:
+        trechos.append(atual)
+
+    ways = []
+    for k, trecho in enumerate(trechos):
+        way = {"type": "way", "id": way_id, "nodes": trecho, "tags": dict(tags)}
+        if k > 0:
+            way["part"] = k
+        ways.append(way)
+    return ways
+
+
+def _open_xml(path):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _iter_xml_end(path):
+    """Elementos de primeiro nível (node/way/relation) já completos; a árvore é esvaziada a cada um"""
+    with _open_xml(path) as f:
+        contexto = ET.iterparse(f, events=("start", "end"))
+        _, raiz = next(contexto)
+        for evento, elem in contexto:
+            if evento != "end" or elem.tag not in ("node", "way", "relation"):
+                # tag/nd são lidos junto com o elemento pai
+                continue
+            yield elem
+            raiz.clear()
+
+
+def _iter_xml(path, bbox):
+    """
+    Duas passadas pelo XML: a primeira junta (num array ordenado) os IDs dos
+    nós referenciados por ruas com nome; a segunda guarda as coordenadas só
+    desses nós que caem na bbox e recorta as ruas.
+    """
+    refs = array("q")
+    for elem in _iter_xml_end(path):
+        if elem.tag == "way":
+            tags = {t.get("k"): t.get("v") for t in elem.iter("tag")}
+            if _is_named_highway(tags):
+                refs.extend(int(nd.get("ref")) for nd in elem.iter("nd"))
+    referenciados = _sorted_refs(refs)
+    del refs
+
+    coords = {}        # nós de ruas dentro da bbox: id -> (lat, lon)
+    usados = set()     # nós referenciados por ruas emitidas
+    for elem in _iter_xml_end(path):
+        if elem.tag == "node":
+            nid = int(elem.get("id"))
+            if _referenced(referenciados, nid):
+                lat, lon = float(elem.get("lat")), float(elem.get("lon"))
+                if _in_bbox(lat, lon, bbox):
+                    coords[nid] = (lat, lon)
+        elif elem.tag == "way":
+            tags = {t.get("k"): t.get("v") for t in elem.iter("tag")}
+            if _is_named_highway(tags):
+                refs = [int(nd.get("ref")) for nd in elem.iter("nd")]
+                for way in _clip_way(int(elem.get("id")), refs, tags, coords):
+                    usados.update(way["nodes"])
+                    yield way
+
+    # Como na resposta da Overpass: ways primeiro, depois os nós que eles usam
+    for nid in usados:
+        lat, lon = coords[nid]
+        yield {"type": "node", "id": nid, "lat": lat, "lon": lon}
+
+
+def _iter_pbf(path, bbox):
+    try:
+        import osmium
+    except ImportError as e:
+        raise ImportError("Leitura de .osm.pbf requer o pacote opcional 'osmium' (pip install osmium)") from e
+
+    # Mesmas duas passadas de _iter_xml
+    refs = array("q")
+    for obj in osmium.FileProcessor(path, osmium.osm.WAY):
+        if _is_named_highway({t.k: t.v for t in obj.tags}):
+            refs.extend(nd.ref for nd in obj.nodes)
+    referenciados = _sorted_refs(refs)
+    del refs
+
+    coords = {}
+    usados = set()
+    for obj in osmium.FileProcessor(path, osmium.osm.NODE | osmium.osm.WAY):
+        if obj.is_node():
+            if obj.location.valid() and _referenced(referenciados, obj.id):
+                lat, lon = obj.location.lat, obj.location.lon
+                if _in_bbox(lat, lon, bbox):
+                    coords[obj.id] = (lat, lon)
+        elif obj.is_way():
+            tags = {t.k: t.v for t in obj.tags}
+            if _is_named_highway(tags):
+                refs = [nd.ref for nd in obj.nodes]
+                for way in _clip_way(obj.id, refs, tags, coords):
+                    usados.update(way["nodes"])
+                    yield way
+
+    for nid in usados:
+        lat, lon = coords[nid]
+        yield {"type": "node", "id": nid, "lat": lat, "lon": lon}
+
+
+def iter_extract_elements(path, bbox):
+    """
+    Lê um extrato OSM local (.osm / .osm.bz2 / .osm.gz em XML, ou .osm.pbf) em
+    duas passadas e gera elementos no mesmo formato da Overpass, já filtrados
+    (ruas com nome) e recortados na bbox [lat_min, lon_min, lat_max, lon_max].
+
+    Em memória ficam os IDs dos nós usados por ruas com nome (array NumPy
+    ordenado, 8 bytes por nó) e as coordenadas só dos que caem na bbox; os
+    demais nós do arquivo (prédios, áreas etc.) não são guardados. Pode ser
+    passado direto para build_graph.
+    """
+    bbox = tuple(float(c) for c in bbox)
+    if path.endswith(".pbf"):
+        return _iter_pbf(path, bbox)
+    return _iter_xml(path, bbox)
+
+
+def load_osm_extract(path, bbox):
+    """Mesmo formato de get_osm_data ({"elements": [...]}) a partir de um arquivo local"""
+    return {"elements": list(iter_extract_elements(path, bbox))}
@@ -0,0 +1,136 @@
+import codecs
+import gzip
+import json
+import re
+import requests
+from src.OSM.cache import cache_key, get_default_cache
+from src.OSM.consultaOSM import build_query, OVERPASS_URL
+
+CHUNK_SIZE = 64 * 1024
+_INICIO_ELEMENTS = re.compile(r'"elements"\s*:\s*\[')
+_ESPACOS = " \t\r\n"
+_decoder = json.JSONDecoder()
+
+
+def iter_elements(chunks):
+    """
+    Parser incremental da resposta Overpass: recebe pedaços (bytes ou str) do
+    JSON e gera cada objeto de "elements" assim que ele está completo.
+
+    Só o pedaço ainda não consumido fica em memória, nunca o corpo inteiro
+    nem a lista completa de elementos.
+    """
+    decodificador = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    dentro = False
+    fim_dos_dados = False
+    chunks = iter(chunks)
+
+    def ler():
+        nonlocal buffer, pos, fim_dos_dados
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            fim_dos_dados = True
+            buffer = buffer[pos:] + decodificador.decode(b"", final=True)
+        else:
+            if isinstance(chunk, bytes):
+                chunk = decodificador.decode(chunk)
+            buffer = buffer[pos:] + chunk
+        pos = 0
+
+    while True:
+        if not dentro:
+            achado = _INICIO_ELEMENTS.search(buffer, pos)
+            if achado is None:
+                if fim_dos_dados:
+                    return
+                # Mantém só o final (a chave pode estar dividida entre pedaços)
+                pos = max(pos, len(buffer) - 32)
+                ler()
+                continue
+            pos = achado.end()
+            dentro = True
+
+        # Pula espaços e vírgulas entre elementos
+        while pos < len(buffer) and (buffer[pos] in _ESPACOS or buffer[pos] == ","):
+            pos += 1
+        if pos >= len(buffer):
+            if fim_dos_dados:
+                raise ValueError("JSON da Overpass terminou antes do fim de 'elements'")
+            ler()
+            continue
+        if buffer[pos] == "]":
+            return
+
+        try:
+            elemento, fim = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Objeto incompleto: precisa de mais dados
+            if fim_dos_dados:
+                raise
+            ler()
+            continue
+        pos = fim
+        yield elemento
+
+
+def _tee(chunks, destino):
+    for chunk in chunks:
+        destino.write(chunk)
+        yield chunk
+
+
+def iter_file_chunks(f, chunk_size=CHUNK_SIZE):
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_elements_from_file(path, chunk_size=CHUNK_SIZE):
+    """Elementos de um arquivo JSON da Overpass (.json ou .json.gz)"""
+    abrir = gzip.open if path.endswith(".gz") else open
+    with abrir(path, "rb") as f:
+        yield from iter_elements(iter_file_chunks(f, chunk_size))
+
+
+def stream_osm_elements(bbox, cache=None, use_cache=True, offline=False,
+                        session=None, url=OVERPASS_URL, timeout=None, chunk_size=CHUNK_SIZE,
+                        restrictions=False):
+    """
+    Versão em streaming de get_osm_data: gera os elementos à medida que chegam.
+
+    Se a bbox estiver no cache em disco, lê direto do arquivo comprimido; caso
+    contrário, baixa com stream=True e grava os bytes recebidos no cache
+    enquanto os elementos são entregues ao consumidor (ex.: build_graph).
+    """
+    query = build_query(bbox, restrictions)
+
+    if use_cache or offline:
+        cache = cache or get_default_cache()
+        chave = cache_key(bbox, query)
+        f = cache.open(chave, ignorar_ttl=offline)
+        if f is not None:
+            with f:
+                yield from iter_elements(iter_file_chunks(f, chunk_size))
+            return
+        if offline:
+            raise ConnectionError(f"Modo offline: bbox {tuple(bbox)} não está no cache")
+
+    http = session or requests
+    with http.get(url, params={'data': query}, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        chunks = response.iter_content(chunk_size)
+        if not use_cache:
+            yield from iter_elements(chunks)
+            return
+
+        with cache.writer(chave) as destino:
+            copia = _tee(chunks, destino)
+            yield from iter_elements(copia)
+            # Grava o restante do corpo (fechamento do JSON) antes de confirmar
+            for _ in copia:
+                pass
@@ -0,0 +1,104 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from src.OSM.consultaOSM import get_osm_data, OVERPASS_URL
+
+DEFAULT_TILE_SIZE = 0.05  # graus (~5,5 km de latitude)
+
+
+def split_bbox(bbox, tile_size=DEFAULT_TILE_SIZE):
+    """
+    Divide [lat_min, lon_min, lat_max, lon_max] em uma grade de tiles de no
+    máximo tile_size graus de lado. Tiles vizinhos compartilham a borda.
+    """
+    lat_min, lon_min, lat_max, lon_max = (float(c) for c in bbox)
+    linhas = max(1, math.ceil((lat_max - lat_min) / tile_size))
+    colunas = max(1, math.ceil((lon_max - lon_min) / tile_size))
+    dlat = (lat_max - lat_min) / linhas
+    dlon = (lon_max - lon_min) / colunas
+
+    tiles = []
+    for i in range(linhas):
+        for j in range(colunas):
+            tiles.append((
+                round(lat_min + i * dlat, 7),
+                round(lon_min + j * dlon, 7),
+                lat_max if i == linhas - 1 else round(lat_min + (i + 1) * dlat, 7),
+                lon_max if j == colunas - 1 else round(lon_min + (j + 1) * dlon, 7),
+            ))
+    return tiles
+
+
+def bbox_difference(bbox, carregada):
+    """
+    Retângulos que cobrem bbox menos a área já carregada (até 4 faixas:
+    sul, norte, oeste e leste). Supõe que carregada está contida em bbox.
+    """
+    s, w, n, e = (float(c) for c in bbox)
+    cs, cw, cn, ce = (float(c) for c in carregada)
+    faixas = [
+        (s, w, cs, e),      # sul
+        (cn, w, n, e),      # norte
+        (cs, w, cn, cw),    # oeste
+        (cs, ce, cn, e),    # leste
+    ]
+    return [f for f in faixas if f[0] < f[2] and f[1] < f[3]]
+
+
+def merge_elements(respostas):
+    """
+    Junta as respostas dos tiles numa única lista de elementos, sem repetir
+    nós e ways que atravessam a borda entre tiles (deduplicação por tipo + id
+    + "part", que distingue os trechos de um way recortado por um extrato local).
+    """
+    vistos = set()
+    elements = []
+    for data in respostas:
+        for el in data.get("elements", []):
+            chave = (el["type"], el["id"], el.get("part"))
+            if chave in vistos:
+                continue
+            vistos.add(chave)
+            elements.append(el)
+    return {"elements": elements}
+
+
+def make_session(max_workers):
+    """requests.Session com pool de conexões do tamanho do pool de threads"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_osm_data_tiled(bbox, tile_size=DEFAULT_TILE_SIZE, max_workers=4, url=OVERPASS_URL,
+                       retries=3, backoff=1.0, timeout=180, session=None, **kwargs):
+    """
+    Baixa a bbox em tiles concorrentes (pool limitado a max_workers) e devolve
+    um único conjunto de elementos pronto para build_graph.
+
+    Cada tile passa por get_osm_data (cache em disco, modo offline, novas
+    tentativas com espera exponencial); kwargs são repassados a ela.
+    """
+    tiles = split_bbox(bbox, tile_size)
+    propria = session is None
+    if propria:
+        session = make_session(max_workers)
+
+    def baixar(tile):
+        return get_osm_data(tile, session=session, url=url, retries=retries,
+                            backoff=backoff, timeout=timeout, **kwargs)
+
+    try:
+        if len(tiles) == 1:
+            respostas = [baixar(tiles[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(tiles))) as pool:
+                respostas = list(pool.map(baixar, tiles))
+    finally:
+        if propria:
+            session.close()
+
+    return merge_elements(respostas)